@@ -0,0 +1,97 @@
+"""
+file_op on large logs: mmap tail/range reads and atomic chunked writes vs
+the previous whole-file read and in-place truncating write.
+
+    python benchmarks/bench_fileio.py --sizes 1MB,100MB,1GB
+    python benchmarks/bench_fileio.py --sizes 10GB --dir /mnt/scratch --legacy-limit 1GB
+
+The legacy read materializes the whole file as a str, so it is skipped
+above --legacy-limit. Peak RSS deltas are reported per operation.
+"""
+
+import argparse
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core import fileio
+
+UNITS = {"KB": 1024, "MB": 1024 ** 2, "GB": 1024 ** 3}
+LINE = b"2024-01-01T00:00:00 INFO gca.pilot routed intent=SQL strength=4.0 latency_ms=12.5\n"
+
+def parse_size(text):
+    text = text.strip().upper()
+    for unit, factor in UNITS.items():
+        if text.endswith(unit):
+            return int(float(text[:-len(unit)]) * factor)
+    return int(text)
+
+def make_log(path, size):
+    block = LINE * (fileio.CHUNK_SIZE // len(LINE))
+    with open(path, 'wb') as f:
+        written = 0
+        while written < size:
+            chunk = block[:size - written]
+            f.write(chunk)
+            written += len(chunk)
+
+def log_chunks(size):
+    block = LINE * (fileio.CHUNK_SIZE // len(LINE))
+    remaining = size
+    while remaining > 0:
+        yield block[:remaining]
+        remaining -= len(block)
+
+def peak_rss_mb():
+    # ru_maxrss is KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def timed(fn):
+    before = peak_rss_mb()
+    start = time.perf_counter()
+    fn()
+    return (time.perf_counter() - start) * 1000, peak_rss_mb() - before
+
+def legacy_tail(path, lines=100):
+    with open(path, 'r') as f:
+        return "".join(f.read().splitlines(keepends=True)[-lines:])
+
+def legacy_write(path, size):
+    with open(path, 'w') as f:
+        f.write(b"".join(log_chunks(size)).decode())
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="1MB,16MB,128MB")
+    parser.add_argument("--dir", default=None, help="Scratch directory (needs 2x the largest size free)")
+    parser.add_argument("--legacy-limit", default="1GB", help="Skip the whole-file baselines above this size")
+    args = parser.parse_args()
+    legacy_limit = parse_size(args.legacy_limit)
+
+    print(f"{'size':>8} {'op':>22} {'ms':>10} {'peak RSS +MB':>13}")
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for label in args.sizes.split(","):
+            size = parse_size(label)
+            path = os.path.join(tmp, "bench.log")
+            make_log(path, size)
+
+            rows = []
+            if size <= legacy_limit:
+                rows.append(("legacy READ + tail", timed(lambda: legacy_tail(path))))
+            rows.append(("mmap TAIL 100", timed(lambda: fileio.read_tail(path, 100))))
+            rows.append(("mmap READ_RANGE 64KB", timed(lambda: fileio.read_range(path, size // 2, 64 * 1024))))
+            rows.append(("iter_lines (count)", timed(lambda: sum(1 for _ in fileio.iter_lines(path)))))
+            if size <= legacy_limit:
+                rows.append(("legacy WRITE", timed(lambda: legacy_write(path, size))))
+            rows.append(("atomic chunked WRITE", timed(lambda: fileio.atomic_write(path, log_chunks(size)))))
+
+            for name, (ms, rss) in rows:
+                print(f"{label:>8} {name:>22} {ms:>10.2f} {rss:>13.1f}")
+            os.remove(path)
+
+if __name__ == "__main__":
+    main()
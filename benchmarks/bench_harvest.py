@@ -0,0 +1,62 @@
+"""
+Scaling benchmark for the parallel harvest engine.
+
+    python benchmarks/bench_harvest.py --max-workers 8 --prompts 2048
+    python benchmarks/bench_harvest.py --model gpt2      # real weights
+
+Prints prompts/sec and speedup over the single-process path for 1..N workers.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.cpu import available_cores
+from gca_core.harvest import ParallelHarvester
+
+def load(model_id):
+    if model_id == "tiny":
+        from gca_core.testing import tiny_model, tiny_tokenizer
+        return tiny_model(n_embd=256, n_head=4), tiny_tokenizer()
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+    tokenizer = AutoTokenizer.from_pretrained(model_id)
+    tokenizer.pad_token = tokenizer.eos_token
+    return AutoModelForCausalLM.from_pretrained(model_id).eval(), tokenizer
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="tiny", help="'tiny' (offline, random) or a HF model id")
+    parser.add_argument("--prompts", type=int, default=1024)
+    parser.add_argument("--max-workers", type=int, default=len(available_cores()))
+    parser.add_argument("--batch-size", type=int, default=8)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    model, tokenizer = load(args.model)
+    base = [
+        "select count(*) from sales group by region ;",
+        "we need to leverage our core competencies",
+        "write a python function to merge sort a list",
+        "the quick brown fox jumps over the lazy dog",
+    ]
+    prompts = [base[i % len(base)] + " " + str(i % 3) for i in range(args.prompts)]
+
+    print(f"{'workers':>8} {'threads':>8} {'seconds':>9} {'prompts/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in range(1, args.max_workers + 1):
+        with ParallelHarvester(model, tokenizer, num_workers=workers, batch_size=args.batch_size) as harvester:
+            harvester.harvest(prompts[: args.batch_size * workers * 2])  # Warm the pool
+            best = float("inf")
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                harvester.harvest(prompts)
+                best = min(best, time.perf_counter() - start)
+            threads = harvester.threads_per_worker if harvester.parallel else "default"
+        baseline = baseline or best
+        print(f"{workers:>8} {threads:>8} {best:>9.3f} {len(prompts) / best:>10.1f} {baseline / best:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
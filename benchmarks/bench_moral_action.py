@@ -0,0 +1,93 @@
+"""
+Memory and lookup benchmark for the slot-based Action.
+
+    python benchmarks/bench_moral_action.py --actions 1000000
+
+Compares the previous __dict__-based Action (hash rebuilt on every call)
+with gca_core.moral.Action (slots, precomputed hash).
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.moral import Action, EntropyClass, MoralKernel
+
+class DictAction:
+    """The previous Action implementation, kept here as the baseline."""
+    def __init__(self, type, description, harm, utility, uncertainty, scale, agents_affected, entropy_class):
+        self.type = type
+        self.description = description
+        self.harm = harm
+        self.utility = utility
+        self.uncertainty = uncertainty
+        self.scale = scale
+        self.agents_affected = agents_affected
+        self.entropy_class = entropy_class
+
+    def __hash__(self):
+        return hash((self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class))
+
+    def __eq__(self, other):
+        if not isinstance(other, DictAction):
+            return NotImplemented
+        return (self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class) == \
+               (other.type, other.description, other.harm, other.utility, other.uncertainty, other.scale, other.agents_affected, other.entropy_class)
+
+def build(cls, n, descriptions):
+    return [cls("execute_SQL", descriptions[i % len(descriptions)], 0.3, 0.9, 0.2, 1.0, 1 + (i % len(descriptions)) % 7,
+                EntropyClass.REVERSIBLE) for i in range(n)]
+
+def bytes_per_action(cls, n, descriptions):
+    gc.collect()
+    tracemalloc.start()
+    actions = build(cls, n, descriptions)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del actions
+    return current / n
+
+def lookup_seconds(actions, repeats):
+    table = {a: i for i, a in enumerate(actions[:1024])}
+    probe = actions[:1024] * (len(actions) // 1024)
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for a in probe:
+            table.get(a)
+        best = min(best, time.perf_counter() - start)
+    return best, len(probe)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--actions", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    # Shared description strings, as in a real plan log
+    descriptions = [f"SELECT name, active FROM users WHERE id = {i};" for i in range(1024)]
+
+    print(f"{'impl':>8} {'bytes/action':>13} {'lookups/s':>12}")
+    for name, cls in (("dict", DictAction), ("slots", Action)):
+        per_action = bytes_per_action(cls, args.actions, descriptions)
+        actions = build(cls, args.actions, descriptions)
+        seconds, count = lookup_seconds(actions, args.repeats)
+        print(f"{name:>8} {per_action:>13.1f} {count / seconds:>12,.0f}")
+        del actions
+
+    kernel = MoralKernel()
+    actions = build(Action, args.actions, descriptions)
+    start = time.perf_counter()
+    for a in actions:
+        kernel.calculate_moral_vector(a)
+    elapsed = time.perf_counter() - start
+    info = kernel.calculate_moral_vector.cache_info()
+    print(f"\nMoralKernel cache: {args.actions / elapsed:,.0f} calls/s, hits={info.hits} misses={info.misses} size={info.currsize}/{info.maxsize}")
+
+if __name__ == "__main__":
+    main()
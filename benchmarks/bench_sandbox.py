@@ -0,0 +1,53 @@
+"""
+Latency benchmark: subprocess-per-call vs the warm SandboxPool.
+
+    python benchmarks/bench_sandbox.py --calls 200 --pool-size 2
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.sandbox import SandboxPool
+from gca_core.tools import ToolBox
+
+SNIPPET = "print(sum(range(1000)))"
+
+def measure(tools, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        tools.execute_python(SNIPPET)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    return {
+        "p50_ms": statistics.median(latencies) * 1e3,
+        "p99_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1e3,
+        "calls_per_s": calls / sum(latencies),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=2)
+    parser.add_argument("--max-runs", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'path':>12} {'p50 ms':>8} {'p99 ms':>8} {'calls/s':>9}")
+    results = {"subprocess": measure(ToolBox(), args.calls)}
+    with SandboxPool(size=args.pool_size, max_runs=args.max_runs) as pool:
+        tools = ToolBox(sandbox=pool)
+        tools.execute_python("pass")  # Wait for the first worker to finish starting
+        results["pool"] = measure(tools, args.calls)
+        recycled = pool.stats()["recycled"]
+
+    for name, r in results.items():
+        print(f"{name:>12} {r['p50_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['calls_per_s']:>9.1f}")
+    print(f"\nspeedup (p50): {results['subprocess']['p50_ms'] / results['pool']['p50_ms']:.1f}x, workers recycled: {recycled}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Multi-threaded query_database throughput: pooled readers vs the previous
+single shared connection that committed after every statement.
+
+    python benchmarks/bench_sqlite_pool.py --threads 8 --queries 2000 [--wal]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.tools import ToolBox
+
+class LegacyToolBox:
+    """The previous query_database: one shared connection, commit after every statement."""
+    def __init__(self):
+        self._db_connections = {}
+
+    def query_database(self, query, db_path="demo.db"):
+        try:
+            if db_path not in self._db_connections:
+                self._db_connections[db_path] = sqlite3.connect(db_path, check_same_thread=False)
+            conn = self._db_connections[db_path]
+            cursor = conn.cursor()
+            cursor.execute(query)
+            rows = cursor.fetchall()
+            conn.commit()
+            return str(rows)
+        except Exception as e:
+            return f"DB Error: {str(e)}"
+
+def populate(path, rows):
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE users (id INTEGER PRIMARY KEY, name TEXT, active BOOLEAN, region TEXT)")
+    conn.executemany("INSERT INTO users (name, active, region) VALUES (?, ?, ?)",
+                     ((f"user{i}", i % 2, f"r{i % 16}") for i in range(rows)))
+    conn.commit()
+    conn.close()
+
+def run(tools, db_path, threads, queries):
+    query = "SELECT region, count(*) FROM users WHERE active = 1 GROUP BY region"
+    per_thread = queries // threads
+
+    def worker():
+        for _ in range(per_thread):
+            tools.query_database(query, db_path)
+
+    pool = [threading.Thread(target=worker) for _ in range(threads)]
+    start = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return per_thread * threads / (time.perf_counter() - start)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--rows", type=int, default=50_000)
+    parser.add_argument("--wal", action="store_true", help="switch the benchmark database to WAL")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "bench.db")
+        populate(db_path, args.rows)
+        legacy = run(LegacyToolBox(), db_path, args.threads, args.queries)
+        tools = ToolBox(db_readers=args.threads, db_wal=args.wal)
+        pooled = run(tools, db_path, args.threads, args.queries)
+        tools.close()
+
+    print(f"{'path':>8} {'queries/s':>10}")
+    print(f"{'legacy':>8} {legacy:>10.1f}")
+    print(f"{'pooled':>8} {pooled:>10.1f}")
+    print(f"\nspeedup: {pooled / legacy:.2f}x with {args.threads} threads")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+"""
+Load generator: queueing behavior of the pipeline under concurrency.
+
+    python benchmarks/loadgen.py --concurrency 4 --requests 64
+    python benchmarks/loadgen.py --sweep 1,2,4,8 --requests 48          # closed-loop saturation sweep
+    python benchmarks/loadgen.py --rate 5 --duration 20                  # open loop, Poisson arrivals
+    python benchmarks/loadgen.py --rate-sweep 2,4,8,16 --duration 10
+    python benchmarks/loadgen.py --target http --port 8080               # a local gca_server.py
+    python benchmarks/loadgen.py --target pilot --model gpt2             # real weights
+
+Closed loop: N clients, each sends its next request when the last one
+answers. Open loop: requests arrive at a fixed mean rate whether or not the
+pipeline keeps up, so queueing delay shows up in the latency.
+
+The in-process targets run model work on one thread, as gca_server does,
+and report end-to-end latency, queue wait, and p50/p95/p99 per stage
+(tokenize, route, tune, moral, generate, decode, tool) from
+gca_core.telemetry. The http target reads the stage histograms from the
+server's /metrics.json; those are cumulative since the server started.
+Prompts are drawn from the examples stored in the skill registry.
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from gca_core.telemetry import TELEMETRY, configure_logging
+
+REGISTRY_PATH = "skill_registry.json"
+# Used for skills that have no stored examples yet, and as the non-skill share of the mix
+FALLBACK_PROMPTS = {
+    "CODE": ["write a python function to merge sort a list", "write a script to print the first ten squares"],
+    "POETRY": ["write a poem about a broken server"],
+    "MATH": ["solve the equation for x", "calculate the sum of 1 to 100"],
+    "NONE": ["the quick brown fox jumps over the lazy dog", "what is the capital of france"],
+}
+SATURATION_GAIN = 0.10  # A level that adds less throughput than this is past saturation
+
+def load_mix(registry_path=REGISTRY_PATH, fallback=FALLBACK_PROMPTS):
+    """{skill: [prompts]} from the registry's stored examples, plus the fallback skills."""
+    mix = {skill: list(prompts) for skill, prompts in fallback.items()}
+    if os.path.exists(registry_path):
+        with open(registry_path, "r") as f:
+            registry = json.load(f)
+        for skill, data in registry.items():
+            if data.get("examples"):
+                mix[skill.upper()] = list(data["examples"])
+    return mix
+
+class PromptMix:
+    """Draws a skill uniformly (or by weight), then one of its prompts."""
+
+    def __init__(self, mix, weights=None, seed=0):
+        self.skills = sorted(mix)
+        self.mix = mix
+        self.weights = [weights.get(s, 1.0) for s in self.skills] if weights else None
+        self.rng = random.Random(seed)
+
+    def sample(self):
+        skill = self.rng.choices(self.skills, self.weights)[0]
+        return skill, self.rng.choice(self.mix[skill])
+
+def pct(values):
+    if not values:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0}
+    arr = np.array(values)
+    return {"p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95)),
+            "p99": float(np.percentile(arr, 99)), "max": float(arr.max())}
+
+# --- Targets ---
+
+class LocalTarget:
+    """An in-process pipeline callable behind one model thread (as gca_server runs it)."""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="gca-model")
+        self.busy = 0.0
+
+    def reset(self):
+        TELEMETRY.reset()
+        self.busy = 0.0
+
+    async def call(self, prompt):
+        """-> (queue_wait, service_seconds)"""
+        submitted = time.perf_counter()
+        timing = {}
+
+        def run():
+            timing["start"] = time.perf_counter()
+            try:
+                return self.fn(prompt)
+            finally:
+                timing["end"] = time.perf_counter()
+
+        await asyncio.get_running_loop().run_in_executor(self._executor, run)
+        service = timing["end"] - timing["start"]
+        self.busy += service
+        return timing["start"] - submitted, service
+
+    async def stages(self):
+        return TELEMETRY.to_json()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+class HTTPTarget:
+    """A running gca_server on a local TCP port or Unix socket."""
+
+    def __init__(self, host="127.0.0.1", port=8080, unix_path=None):
+        self.host, self.port, self.unix_path = host, port, unix_path
+        self.busy = None  # Not observable from outside the server
+        self.rejected = 0
+
+    def reset(self):
+        self.rejected = 0
+
+    async def _request(self, method, path, payload=None):
+        if self.unix_path:
+            reader, writer = await asyncio.open_unix_connection(self.unix_path)
+        else:
+            reader, writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            body = json.dumps(payload).encode("utf-8") if payload is not None else b""
+            writer.write((f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\nConnection: close\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            head = await reader.readuntil(b"\r\n\r\n")
+            status = int(head.split(b" ", 2)[1])
+            length = 0
+            for line in head.decode("latin-1").split("\r\n")[1:]:
+                if line.lower().startswith("content-length:"):
+                    length = int(line.split(":", 1)[1])
+            data = await reader.readexactly(length) if length else b""
+            return status, data
+        finally:
+            writer.close()
+
+    async def call(self, prompt):
+        status, data = await self._request("POST", "/v1/run", {"prompt": prompt})
+        if status == 503:
+            self.rejected += 1
+        if status != 200:
+            raise RuntimeError(f"HTTP {status}: {data[:200]!r}")
+        return 0.0, None  # Queue wait happens inside the server
+
+    async def stages(self):
+        status, data = await self._request("GET", "/metrics.json")
+        return json.loads(data)["stages"] if status == 200 else []
+
+    def close(self):
+        pass
+
+def tiny_pilot():
+    """GCAPilotV2 on the offline tiny model, with the skills from the registry."""
+    from gca_core.testing import tiny_basis, tiny_model, tiny_tokenizer
+    from gca_pilot_v2 import GCAPilotV2
+    model = tiny_model()
+    return GCAPilotV2.from_components(model, tiny_tokenizer(), tiny_basis(model.config.hidden_size), load_probe=False)
+
+def make_target(args):
+    if args.target == "http":
+        return HTTPTarget(args.host, args.port, args.unix)
+    if args.target == "agent":
+        from gca_agent_final import GCAAgent
+        agent = GCAAgent(max_tokens=args.max_tokens)
+        return LocalTarget(agent.run)
+    if args.model == "tiny":
+        pilot = tiny_pilot()
+    else:
+        from gca_pilot_v2 import GCAPilotV2
+        pilot = GCAPilotV2()
+    return LocalTarget(pilot.execute)
+
+# --- Load ---
+
+class Recorder:
+    def __init__(self):
+        self.latencies = []
+        self.queue_waits = []
+        self.errors = 0
+        self.by_skill = {}
+
+    async def send(self, target, skill, prompt, arrived=None):
+        start = arrived if arrived is not None else time.perf_counter()
+        try:
+            wait, _ = await target.call(prompt)
+        except Exception:
+            self.errors += 1
+            return
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        self.queue_waits.append(wait)
+        self.by_skill.setdefault(skill, []).append(latency)
+
+async def closed_loop(target, mix, concurrency, requests):
+    recorder = Recorder()
+    remaining = [requests]
+
+    async def client():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            skill, prompt = mix.sample()
+            await recorder.send(target, skill, prompt)
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return recorder
+
+async def open_loop(target, mix, rate, duration=None, requests=None, seed=0):
+    """Poisson arrivals at `rate`/s for `duration` seconds (or `requests` arrivals)."""
+    recorder = Recorder()
+    rng = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+    next_arrival = start
+    while True:
+        if requests is not None and len(tasks) >= requests:
+            break
+        if duration is not None and next_arrival - start >= duration:
+            break
+        delay = next_arrival - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        skill, prompt = mix.sample()
+        # Latency counts from the scheduled arrival, so a late loop does not hide queueing
+        tasks.append(asyncio.ensure_future(recorder.send(target, skill, prompt, arrived=next_arrival)))
+        next_arrival += rng.expovariate(rate)
+    await asyncio.gather(*tasks)
+    return recorder
+
+async def run_level(target, mix, concurrency=None, rate=None, requests=None, duration=None):
+    """One load level -> report dict."""
+    target.reset()
+    start = time.perf_counter()
+    if rate is not None:
+        recorder = await open_loop(target, mix, rate, duration, requests)
+    else:
+        recorder = await closed_loop(target, mix, concurrency, requests)
+    wall = time.perf_counter() - start
+    stages = {s["stage"] + "".join(f"[{k}={v}]" for k, v in sorted(s["labels"].items())):
+              {q: s[q] for q in ("count", "p50", "p95", "p99")} for s in await target.stages()}
+    done = len(recorder.latencies)
+    report = {
+        "mode": "open" if rate is not None else "closed",
+        "concurrency": concurrency,
+        "offered_rate": rate,
+        "completed": done,
+        "errors": recorder.errors,
+        "rejected": getattr(target, "rejected", 0),
+        "wall_seconds": wall,
+        "throughput": done / wall if wall > 0 else 0.0,
+        "latency": pct(recorder.latencies),
+        "queue_wait": pct(recorder.queue_waits),
+        "stages": stages,
+        "by_skill": {skill: pct(values) for skill, values in sorted(recorder.by_skill.items())},
+    }
+    if target.busy is not None:
+        report["utilization"] = min(1.0, target.busy / wall) if wall > 0 else 0.0
+    return report
+
+def saturation(levels, gain=SATURATION_GAIN):
+    """
+    The first level past saturation, or None. Closed loop: more clients
+    added less than `gain` throughput. Open loop: completed throughput fell
+    more than `gain` short of the offered rate.
+    """
+    for prev, level in zip([None] + levels[:-1], levels):
+        if level["mode"] == "open":
+            if level["throughput"] < (1 - gain) * level["offered_rate"]:
+                return level
+        elif prev is not None and level["throughput"] < (1 + gain) * prev["throughput"]:
+            return level
+    return None
+
+def print_level(report):
+    label = f"rate={report['offered_rate']}/s" if report["mode"] == "open" else f"clients={report['concurrency']}"
+    lat, wait = report["latency"], report["queue_wait"]
+    util = f" util={report['utilization']:.0%}" if "utilization" in report else ""
+    print(f"\n[📈] {label}: {report['completed']} ok, {report['errors']} errors "
+          f"({report['rejected']} rejected), {report['throughput']:.2f} req/s{util}")
+    print(f"    latency   p50={lat['p50'] * 1e3:8.1f}ms p95={lat['p95'] * 1e3:8.1f}ms p99={lat['p99'] * 1e3:8.1f}ms")
+    print(f"    queue     p50={wait['p50'] * 1e3:8.1f}ms p95={wait['p95'] * 1e3:8.1f}ms p99={wait['p99'] * 1e3:8.1f}ms")
+    for stage, s in report["stages"].items():
+        print(f"    {stage:<9} p50={s['p50'] * 1e3:8.1f}ms p95={s['p95'] * 1e3:8.1f}ms "
+              f"p99={s['p99'] * 1e3:8.1f}ms (n={s['count']})")
+
+async def run(args):
+    target = make_target(args)
+    mix = PromptMix(load_mix(args.registry), seed=args.seed)
+    levels = []
+    try:
+        if args.rate_sweep or args.rate:
+            for rate in args.rate_sweep or [args.rate]:
+                levels.append(await run_level(target, mix, rate=rate, duration=args.duration,
+                                              requests=None if args.duration else args.requests))
+                print_level(levels[-1])
+        else:
+            for concurrency in args.sweep or [args.concurrency]:
+                levels.append(await run_level(target, mix, concurrency=concurrency, requests=args.requests))
+                print_level(levels[-1])
+    finally:
+        target.close()
+
+    if len(levels) > 1:
+        saturated = saturation(levels)
+        if saturated is None:
+            print("\n[🟢] No saturation within the sweep.")
+        else:
+            label = (f"{saturated['offered_rate']}/s offered" if saturated["mode"] == "open"
+                     else f"{saturated['concurrency']} clients")
+            print(f"\n[🔴] Saturated at {label}: {saturated['throughput']:.2f} req/s, "
+                  f"p99 {saturated['latency']['p99'] * 1e3:.1f}ms")
+    return levels
+
+def parse_list(kind):
+    return lambda text: [kind(x) for x in text.split(",") if x]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", choices=("pilot", "agent", "http"), default="pilot")
+    parser.add_argument("--model", default="tiny", help="pilot target: 'tiny' (offline, random) or 'gpt2'")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed-loop clients")
+    parser.add_argument("--sweep", type=parse_list(int), default=None, help="Closed-loop client counts, e.g. 1,2,4,8")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop arrivals per second")
+    parser.add_argument("--rate-sweep", type=parse_list(float), default=None, help="Open-loop rates, e.g. 2,4,8")
+    parser.add_argument("--requests", type=int, default=32, help="Requests per level")
+    parser.add_argument("--duration", type=float, default=None, help="Open loop: seconds per level (overrides --requests)")
+    parser.add_argument("--max-tokens", type=int, default=None, help="agent target: decode budget")
+    parser.add_argument("--registry", default=REGISTRY_PATH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="http target: Unix socket path")
+    parser.add_argument("--json", default=None, help="Also write the per-level reports here")
+    args = parser.parse_args(argv)
+
+    configure_logging("OFF")  # Per-request console output would dominate the timings
+    levels = asyncio.run(run(args))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(levels, f, indent=2)
+    return levels
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,321 @@
+"""
+Offline benchmark suite for the GCA hot paths.
+
+    python benchmarks/suite.py run --save benchmarks/baselines/local.json
+    python benchmarks/suite.py compare benchmarks/baselines/local.json --tolerance 0.15
+    python benchmarks/suite.py compare old.json new.json
+    python benchmarks/suite.py list
+
+Every benchmark runs on the tiny randomly initialized GPT-2 from
+gca_core.testing, so the suite needs no downloads and finishes in about a
+minute on one CPU core. `run` writes a JSON baseline (median / min / mean
+seconds per call, plus the environment). `compare` re-runs the suite (or
+reads a second file) and exits 1 if any benchmark's median is slower than
+the baseline by more than the tolerance. Baselines only compare on the
+same machine and thread count.
+"""
+
+import argparse
+import contextlib
+import fnmatch
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from unittest import mock
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import torch
+
+from gca_core.telemetry import configure_logging
+from gca_core.testing import tiny_basis, tiny_model, tiny_tokenizer
+
+PROMPTS = [
+    "select count(*) from sales group by region ;",
+    "we need to leverage our core competencies",
+    "write a python function to merge sort a list",
+    "write a poem about a broken server",
+    "solve the equation for x",
+    "the quick brown fox jumps over the lazy dog",
+    "pull all the customer names from the database",
+    "delete all the logs permanently",
+]
+SKILL_COUNTS = (4, 64, 1024)
+TOLERANCE = 0.10
+MIN_DELTA = 0.0005  # Seconds; smaller differences are timer noise
+
+class Fixture:
+    """The tiny model, tokenizer and basis, built once and shared by every benchmark."""
+
+    def __init__(self):
+        self.tokenizer = tiny_tokenizer()
+        self.tokenizer.pad_token = self.tokenizer.eos_token
+        self.model = tiny_model()
+        self.basis = tiny_basis(self.model.config.hidden_size)
+        self.basis_meta = {"version": 0, "hash": None}
+        self.tmp = tempfile.TemporaryDirectory()
+        self._patches = contextlib.ExitStack()  # Module globals redirected for the run
+
+    def close(self):
+        """Restores the patched module globals and removes the temp dir."""
+        self._patches.close()
+        self.tmp.cleanup()
+
+    def optimizer(self, num_skills=4):
+        from gca_optimizer import GCAOptimizer, DEVICE
+        optimizer = GCAOptimizer.__new__(GCAOptimizer)  # Skips the on-disk registry
+        optimizer.model, optimizer.tokenizer, optimizer.basis = self.model, self.tokenizer, self.basis
+        optimizer.layer_idx = 6
+        optimizer.registry = {}
+        optimizer.skill_names = [f"SKILL_{i}" for i in range(num_skills)]
+        generator = torch.Generator().manual_seed(num_skills)
+        coeffs = torch.randn(num_skills, self.basis.shape[0], generator=generator)
+        optimizer.skill_matrix = torch.nn.functional.normalize(coeffs, dim=1).to(DEVICE)
+        return optimizer
+
+    def skill_vec(self):
+        return self.basis[2]
+
+    def glassbox(self):
+        from gca_core.glassbox import GlassBox
+        gb = GlassBox.__new__(GlassBox)
+        gb.tokenizer, gb.model, gb.layer_idx = self.tokenizer, self.model, 6
+        return gb
+
+    def pilot(self):
+        from gca_pilot_v2 import GCAPilotV2
+        skills = {
+            "SQL": {"vector_idx": 0, "strength": 5.0},
+            "CODE": {"vector_idx": 2, "strength": 8.0},
+            "POETRY": {"vector_idx": 7, "strength": 5.0},
+            "MATH": {"vector_idx": 5, "strength": 6.0},
+            "NONE": {"vector_idx": None, "strength": 0.0},
+        }
+        return GCAPilotV2.from_components(self.model, self.tokenizer, self.basis, self.basis_meta,
+                                          optimizer=self.optimizer(), load_probe=False, skills=skills)
+
+    def school(self):
+        import gca_school
+        self._patches.enter_context(
+            mock.patch.object(gca_school, "REGISTRY_PATH", os.path.join(self.tmp.name, "skill_registry.json")))
+        school = gca_school.GCASchool.__new__(gca_school.GCASchool)
+        school.tokenizer, school.model = self.tokenizer, self.model
+        school.basis, school.basis_meta = self.basis, self.basis_meta
+        school._harvesters = {}
+        return school
+
+    def cartographer(self):
+        from gca_cartographer import GCACartographer
+        cart = GCACartographer.__new__(GCACartographer)
+        cart.tokenizer, cart.model = self.tokenizer, self.model
+        cart._harvesters = {}
+        return cart
+
+# --- Benchmarks: each takes the fixture and returns the zero-argument callable to time ---
+
+def bench_geometry(fx):
+    optimizer = fx.optimizer()
+    return lambda: optimizer.get_prompt_geometry(PROMPTS)
+
+def bench_route_intent(num_skills):
+    def setup(fx):
+        optimizer = fx.optimizer(num_skills)
+        return lambda: optimizer.route_intent(PROMPTS)
+    return setup
+
+def bench_auto_tune(fx):
+    optimizer, vec = fx.optimizer(), fx.skill_vec()
+    return lambda: optimizer.auto_tune_strength(PROMPTS[2], vec)
+
+def bench_generate_steered(fx):
+    gb, vec = fx.glassbox(), fx.skill_vec()
+    return lambda: gb.generate_steered(PROMPTS[0], vec, 4.0, max_tokens=32)
+
+def bench_execute_batch(fx):
+    pilot = fx.pilot()
+    return lambda: pilot.execute_batch(PROMPTS)
+
+def bench_harvest_states(fx):
+    cart = fx.cartographer()
+    prompts = PROMPTS * 8
+    return lambda: cart.harvest_states(prompts, batch_size=8)
+
+def bench_learn_skill(fx):
+    school = fx.school()
+    return lambda: school.learn_skill("BENCH", PROMPTS * 4)
+
+def bench_moral_evaluate(fx):
+    from gca_moral import Action, EntropyClass, MoralCalculator
+    kernel = MoralCalculator()
+    plans = [[Action("execute_SQL", f"step {i % 97}", 0.1 + (i % 7) / 10, 0.9, 0.2, 1.0, 1 + i % 5,
+                     EntropyClass.IRREVERSIBLE if i % 11 == 0 else EntropyClass.REVERSIBLE)
+              for i in range(p, p + 4)] for p in range(2048)]
+    return lambda: kernel.evaluate_many(plans)
+
+def bench_moral_plan(fx):
+    from gca_moral import Action, EntropyClass, MoralCalculator
+    kernel = MoralCalculator()
+    plan = [Action("execute_PYTHON", f"step {i}", 0.05, 0.9, 0.1, 1.0, 1, EntropyClass.REVERSIBLE) for i in range(8)]
+    return lambda: kernel.evaluate_plan(plan)
+
+BENCHMARKS = [
+    ("get_prompt_geometry", bench_geometry),
+    *((f"route_intent[skills={n}]", bench_route_intent(n)) for n in SKILL_COUNTS),
+    ("auto_tune_strength", bench_auto_tune),
+    ("generate_steered", bench_generate_steered),
+    ("execute_batch", bench_execute_batch),
+    ("harvest_states", bench_harvest_states),
+    ("learn_skill", bench_learn_skill),
+    ("moral_evaluate_many", bench_moral_evaluate),
+    ("moral_evaluate_plan", bench_moral_plan),
+]
+
+def measure(fn, repeats, warmup, min_time=0.05):
+    """Per-call seconds over `repeats` samples; fast calls are looped until a sample takes min_time."""
+    for _ in range(warmup):
+        fn()
+    start = time.perf_counter()
+    fn()
+    once = time.perf_counter() - start
+    loops = max(1, int(min_time / once)) if once > 0 else 1
+
+    samples = []
+    for _ in range(repeats):
+        torch.manual_seed(0)  # Same sampled tokens every repeat
+        start = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        samples.append((time.perf_counter() - start) / loops)
+    return {
+        "median": statistics.median(samples),
+        "min": min(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeats": repeats,
+        "loops": loops,
+    }
+
+def run_suite(pattern="*", repeats=5, warmup=1, threads=1, verbose=True):
+    from transformers.utils import logging as hf_logging
+    previous_threads = torch.get_num_threads()
+    torch.set_num_threads(threads)
+    configure_logging("OFF")
+    hf_logging.set_verbosity_error()  # execute_batch pads on the right on purpose
+    fx = Fixture()
+    results = {}
+    try:
+        for name, setup in BENCHMARKS:
+            if not fnmatch.fnmatch(name, pattern):
+                continue
+            # The pipeline still prints status lines in places; keep them out of the timings' output
+            with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull), torch.no_grad():
+                results[name] = measure(setup(fx), repeats, warmup)
+            if verbose:
+                print(f"{name:<28} {results[name]['median'] * 1e3:10.3f} ms  (min {results[name]['min'] * 1e3:.3f})")
+    finally:
+        fx.close()
+        configure_logging()
+        torch.set_num_threads(previous_threads)
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "torch": torch.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "threads": threads,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+def compare(baseline, current, tolerance=TOLERANCE, min_delta=MIN_DELTA):
+    """
+    Rows of (name, baseline_median, current_median, ratio, status) for every
+    benchmark in the baseline. status: "regression", "improvement", "ok" or
+    "missing" (not in the current run).
+    """
+    rows = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name)
+        if now is None:
+            rows.append((name, base["median"], None, None, "missing"))
+            continue
+        ratio = now["median"] / base["median"] if base["median"] > 0 else float("inf")
+        delta = now["median"] - base["median"]
+        status = "ok"
+        if ratio > 1 + tolerance and delta > min_delta:
+            status = "regression"
+        elif ratio < 1 - tolerance and -delta > min_delta:
+            status = "improvement"
+        rows.append((name, base["median"], now["median"], ratio, status))
+    return rows
+
+def load(path):
+    with open(path, "r") as f:
+        return json.load(f)
+
+def save(report, path):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=2)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="Run the suite and optionally save a baseline")
+    cmp_p = sub.add_parser("compare", help="Compare against a baseline; exit 1 on regressions")
+    sub.add_parser("list", help="List benchmark names")
+    for p in (run_p, cmp_p):
+        p.add_argument("--filter", default="*", help="fnmatch pattern over benchmark names")
+        p.add_argument("--repeats", type=int, default=5)
+        p.add_argument("--warmup", type=int, default=1)
+        p.add_argument("--threads", type=int, default=1, help="torch threads (keep equal to the baseline's)")
+    run_p.add_argument("--save", default=None, help="Write the results as a JSON baseline")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current", nargs="?", default=None, help="Results file (default: run the suite now)")
+    cmp_p.add_argument("--tolerance", type=float, default=TOLERANCE, help="Allowed slowdown of the median (0.10 = 10%%)")
+    cmp_p.add_argument("--min-delta", type=float, default=MIN_DELTA, help="Ignore differences below this many seconds")
+    cmp_p.add_argument("--save", default=None, help="Also write the current results")
+    args = parser.parse_args(argv)
+
+    if args.command == "list":
+        for name, _ in BENCHMARKS:
+            print(name)
+        return 0
+
+    if args.command == "run":
+        report = run_suite(args.filter, args.repeats, args.warmup, args.threads)
+        if args.save:
+            save(report, args.save)
+            print(f"[💾] Baseline saved to {args.save}")
+        return 0
+
+    baseline = load(args.baseline)
+    if args.current:
+        current = load(args.current)
+    else:
+        pattern = args.filter
+        current = run_suite(pattern, args.repeats, args.warmup, baseline["meta"].get("threads", args.threads))
+    if args.save:
+        save(current, args.save)
+
+    rows = compare(baseline, current, args.tolerance, args.min_delta)
+    print(f"\n{'benchmark':<28} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}  status")
+    for name, base, now, ratio, status in rows:
+        now_text = f"{now * 1e3:12.3f}" if now is not None else f"{'-':>12}"
+        ratio_text = f"{ratio:7.2f}" if ratio is not None else f"{'-':>7}"
+        print(f"{name:<28} {base * 1e3:12.3f} {now_text} {ratio_text}  {status}")
+    regressions = [row[0] for row in rows if row[4] == "regression"]
+    if regressions:
+        print(f"\n[❌] {len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1
+    print(f"\n[✅] No regressions beyond {args.tolerance:.0%}.")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,17 +1,23 @@
+from gca_core.audit import AuditSink
 from gca_core.glassbox import GlassBox
 from gca_core.memory import IsotropicMemory
 from gca_core.optimizer import GCAOptimizer
-from gca_core.moral import MoralKernel, Action, EntropyClass
+from gca_core.moral import MoralKernel, Action, EntropyClass, REASONS, REASON_BELOW_THRESHOLD, REASON_EXCEEDS_THRESHOLD
 from gca_core.tools import ToolBox
+from gca_core.probe import MoralProbe
+from gca_core.detector import ToolCallDetector, ToolCallStoppingCriteria
+from gca_core.telemetry import span
 import re
 
 def parse_tool_call(response):
     """
     Extracts code blocks or tool commands from the model's text output.
     Regex looks for: ```python ... ``` or SQL queries.
+    Fallback for responses the streaming ToolCallDetector did not resolve.
     """
     # SQL Detection
-    if "SELECT" in response.upper() and "FROM" in response.upper():
+    upper = response.upper()
+    if "SELECT" in upper and "FROM" in upper:
         return "SQL", response.strip()
 
     # Python Detection
@@ -21,18 +27,147 @@ def parse_tool_call(response):
 
     return "TEXT", response
 
-def main():
-    print("="*60)
-    print("GCA v1.2: The Autonomous Agent")
-    print("="*60)
-
-    # 1. Init System
-    gb = GlassBox()
-    mem = IsotropicMemory()
-    opt = GCAOptimizer(gb, mem)
-    moral = MoralKernel()
-    tools = ToolBox()
+class GCAAgent:
+    """
+    The route -> tune -> generate -> moral -> tool pipeline with everything
+    loaded once, so a resident process (gca_server) can serve many prompts.
+    Each stage is its own method; run() chains them for one prompt.
+    """
 
+    def __init__(self, glassbox=None, memory=None, optimizer=None, moral=None, tools=None,
+                 probe=None, max_tokens=150, preview_rows=20, audit=None):
+        # 1. Init System
+        self.gb = glassbox or GlassBox()
+        self.mem = memory or IsotropicMemory()
+        self.opt = optimizer or GCAOptimizer(self.gb, self.mem)
+        self.audit_sink = audit  # Optional gca_core.audit.AuditSink for the default kernel
+        self.moral = moral or MoralKernel(audit=audit)
+        self.tools = tools or ToolBox()
+        self.probe = probe if probe is not None else MoralProbe.load()
+        self.max_tokens = max_tokens
+        self.preview_rows = preview_rows
+
+    def close(self):
+        """Flushes and closes the audit trail."""
+        if self.audit_sink is not None:
+            self.audit_sink.close()
+
+    def think(self, prompt):
+        """Geometric routing and tuning -> (skill, vec, strength, latent)."""
+        # The geometric router detects 'SQL' intent from the prompt shape
+        # The same forward pass also yields the pooled state for the latent moral probe
+        with span("route"):
+            geometry, state = self.opt.get_prompt_geometry(prompt, return_state=True)
+            skill = self.opt.route_geometry(prompt, geometry)
+        with span("moral"):
+            latent = self.probe.score(state) if self.probe is not None else None
+        if skill == "NONE":
+            return skill, None, 0.0, latent
+
+        vec = self.mem.get_skill_vector(skill)
+        strength = self.opt.auto_tune(prompt, vec)
+        return skill, vec, strength, latent
+
+    def generate(self, prompt, vec, strength, max_tokens=None):
+        """Steered generation -> (response, tool_type, content)."""
+        # The model generates the PLAN/CODE while steered by the vector;
+        # decoding stops as soon as the detector sees a complete tool call
+        detector = ToolCallDetector()
+        response = self.gb.generate_steered(prompt, vec, strength, max_tokens=max_tokens or self.max_tokens,
+                                            stopping_criteria=[ToolCallStoppingCriteria(self.gb.tokenizer, detector)])
+        tool_type, content = detector.call or parse_tool_call(response)
+        return response, tool_type, content
+
+    def audit(self, tool_type, content, latent, plan=None):
+        """
+        Moral check of one tool call -> (ok, reason). Pass a PlanEvaluator
+        to score the call as the next step of a longer plan; the caller then
+        calls plan.result() once at the end (one audit record per plan).
+        """
+        with span("moral"):
+            return self._audit(tool_type, content, latent, plan)
+
+    def _audit(self, tool_type, content, latent, plan):
+        # CLASSIFY ENTROPY
+        # We map the tool request to the Thermodynamic Entropy Classes
+        entropy = EntropyClass.REVERSIBLE
+        if tool_type == "PYTHON":
+            entropy = EntropyClass.BOUNDED # Code execution is risky but contained
+        if latent is not None and latent["irreversibility"].item() > 0.5:
+            entropy = EntropyClass.IRREVERSIBLE # Latent probe on the prompt state
+        content_upper = content.upper()
+        if "DELETE" in content_upper or "DROP" in content_upper:
+            entropy = EntropyClass.IRREVERSIBLE # Generated content the probe never saw
+
+        # MORAL CHECK
+        # Added agents_affected=1 to match Action definition
+        # Harm comes from the latent probe; without one, 0.3 allows REVERSIBLE actions but blocks IRREVERSIBLE ones
+        harm = latent["harm"].item() if latent is not None else 0.3
+        action = Action(f"execute_{tool_type}", content[:50], harm, 0.9, 0.2, 1.0, 1, entropy)
+        # Streaming evaluation: each planned step is scored as it is produced,
+        # and a rejection stops the plan before anything else runs
+        if plan is None:
+            plan = self.moral.plan_evaluator()
+            plan.add(action)
+            return plan.result()
+        ok = plan.add(action)
+        return ok, REASONS[REASON_BELOW_THRESHOLD if ok else REASON_EXCEEDS_THRESHOLD]
+
+    def act(self, tool_type, content, db_path="demo.db"):
+        """Runs an approved tool call and returns its output."""
+        with span("tool", tool=tool_type):
+            if tool_type == "SQL":
+                # Only a bounded preview goes back into the context
+                return self.tools.query_database(content, db_path, max_rows=self.preview_rows)
+            elif tool_type == "PYTHON":
+                return self.tools.execute_python(content)
+        return ""
+
+    async def aact(self, tool_type, content, db_path="demo.db", timeout=5):
+        """act() on the event loop: the tool runs while the model serves other sessions."""
+        if tool_type == "SQL":
+            call = ("SQL", content, db_path, self.preview_rows)
+        elif tool_type == "PYTHON":
+            call = ("PYTHON", content)
+        else:
+            return ""
+        with span("tool", tool=tool_type):
+            return (await self.tools.agather([call], timeout=timeout))[0]
+
+    def run(self, prompt, max_tokens=None, db_path="demo.db"):
+        """One think -> act step; returns a JSON-serializable dict."""
+        result = {"prompt": prompt, "skill": "NONE", "strength": 0.0, "response": None,
+                  "tool": None, "approved": None, "reason": None, "output": None}
+
+        skill, vec, strength, latent = self.think(prompt)
+        result["skill"] = skill
+        if skill == "NONE":
+            return result
+        result["strength"] = float(strength)
+
+        response, tool_type, content = self.generate(prompt, vec, strength, max_tokens)
+        result["response"] = response
+        result["tool"] = tool_type
+        if tool_type == "TEXT":
+            return result
+
+        ok, reason = self.audit(tool_type, content, latent)
+        result["approved"] = bool(ok)
+        result["reason"] = reason
+        if ok:
+            result["output"] = self.act(tool_type, content, db_path)
+        return result
+
+def seed_demo_db(db_path="demo.db"):
+    # For demo, create a dummy DB if missing
+    import sqlite3
+    conn = sqlite3.connect(db_path)
+    conn.execute("CREATE TABLE IF NOT EXISTS users (name TEXT, active BOOLEAN)")
+    conn.execute("INSERT INTO users VALUES ('Alice', 1), ('Bob', 0)")
+    conn.commit()
+    conn.close()
+
+def run_demo(agent):
     # 2. User Input
     # This prompt implies a tool (SQL) is needed
     # Using a more explicit SQL prompt to ensure routing works with the basic SVD basis
@@ -40,47 +175,27 @@ def main():
     print(f"\nUSER: {prompt}")
 
     # 3. Geometric Routing (Think)
-    # The geometric router detects 'SQL' intent from the prompt shape
-    detected_skill = opt.route(prompt)
-    print(f"[🧭] Geometric Intent: {detected_skill}")
+    skill, vec, strength, latent = agent.think(prompt)
+    print(f"[🧭] Geometric Intent: {skill}")
 
-    if detected_skill == "NONE":
+    if skill == "NONE":
         print("No skill detected. Exiting.")
         return
 
     # 4. Vector Loading & Tuning
-    vec = mem.get_skill_vector(detected_skill)
-    strength = opt.auto_tune(prompt, vec)
     print(f"[🔧] Latent Pressure: {strength}")
 
     # 5. Steered Generation (Reasoning)
-    # The model generates the PLAN/CODE while steered by the vector
-    response = gb.generate_steered(prompt, vec, strength, max_tokens=150)
+    response, tool_type, content = agent.generate(prompt, vec, strength)
     print(f"\n[🧠] Model Thought:\n{response}")
 
     # 6. Tool Parsing & Moral Audit (The Filter)
-    tool_type, content = parse_tool_call(response)
-
     if tool_type == "TEXT":
         print("[📢] Result: Just text, no action taken.")
         return
 
     print(f"\n[🛠️] Tool Request: {tool_type}")
-
-    # CLASSIFY ENTROPY
-    # We map the tool request to the Thermodynamic Entropy Classes
-    entropy = EntropyClass.REVERSIBLE
-    if tool_type == "PYTHON":
-        entropy = EntropyClass.BOUNDED # Code execution is risky but contained
-    if "DELETE" in content.upper() or "DROP" in content.upper():
-        entropy = EntropyClass.IRREVERSIBLE # Data loss is high entropy
-
-    # MORAL CHECK
-    # Added agents_affected=1 to match Action definition
-    # Lowered harm to 0.3 to allow REVERSIBLE actions but potentially block IRREVERSIBLE ones
-    action = Action(f"execute_{tool_type}", content[:50], 0.3, 0.9, 0.2, 1.0, 1, entropy)
-    # evaluate returns (approved, reason)
-    ok, reason = moral.evaluate([action])
+    ok, reason = agent.audit(tool_type, content, latent)
 
     if not ok:
         print(f"[🛡️] BLOCKED by Moral Kernel: {reason}")
@@ -89,22 +204,22 @@ def main():
     # 7. Execution (The Hands)
     print(f"[✅] Moral Check Passed. Executing...")
 
-    result = ""
     if tool_type == "SQL":
-        # For demo, create a dummy DB if missing
-        import sqlite3
-        conn = sqlite3.connect("demo.db")
-        conn.execute("CREATE TABLE IF NOT EXISTS users (name TEXT, active BOOLEAN)")
-        conn.execute("INSERT INTO users VALUES ('Alice', 1), ('Bob', 0)")
-        conn.commit()
-        conn.close()
+        seed_demo_db()
+    result = agent.act(tool_type, content)
 
-        result = tools.query_database(content)
+    print(f"\n[💻] SYSTEM OUTPUT:\n{result}")
 
-    elif tool_type == "PYTHON":
-        result = tools.execute_python(content)
+def main():
+    print("="*60)
+    print("GCA v1.2: The Autonomous Agent")
+    print("="*60)
 
-    print(f"\n[💻] SYSTEM OUTPUT:\n{result}")
+    agent = GCAAgent(audit=AuditSink.from_env())
+    try:
+        run_demo(agent)
+    finally:
+        agent.close()
 
 if __name__ == "__main__":
     main()
@@ -8,6 +8,8 @@ import torch
 from transformers import AutoModelForCausalLM, AutoTokenizer
 import torch.nn.functional as F
 from torch.linalg import svd
+from gca_core.basis import save_basis
+from gca_core.harvest import ParallelHarvester
 
 MODEL_ID = "gpt2"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
@@ -20,57 +22,41 @@ class GCACartographer:
         if self.tokenizer.pad_token is None:
             self.tokenizer.pad_token = self.tokenizer.eos_token
         self.model = AutoModelForCausalLM.from_pretrained(MODEL_ID).to(DEVICE)
-
-    def harvest_states(self, prompts, batch_size=8):
-        harvested = []
-        # Store current batch mask for use in hook
-        current_mask = None
-
-        def hook(module, input, output):
-            # output[0] shape: (batch_size, seq_len, hidden_dim)
-            hidden_states = output[0]
-
-            if current_mask is not None:
-                # Use mask to ignore padding tokens
-                # mask shape: (batch_size, seq_len)
-                mask = current_mask.unsqueeze(-1).to(hidden_states.device) # (batch_size, seq_len, 1)
-
-                masked_hidden_states = hidden_states * mask
-                sum_states = torch.sum(masked_hidden_states, dim=1) # (batch_size, hidden_dim)
-
-                lengths = torch.sum(mask, dim=1) # (batch_size, 1)
-                # Avoid division by zero
-                lengths = torch.clamp(lengths, min=1e-9)
-
-                mean_states = sum_states / lengths
-            else:
-                # Fallback if no mask (should not happen with batch processing as implemented)
-                mean_states = torch.mean(hidden_states, dim=1)
-
-            harvested.append(mean_states.detach())
-
-        handle = self.model.transformer.h[6].register_forward_hook(hook)  # Layer 6
-
-        try:
-            for i in range(0, len(prompts), batch_size):
-                batch_prompts = prompts[i : i + batch_size]
-                # Tokenize batch with padding
-                inputs = self.tokenizer(batch_prompts, return_tensors="pt", padding=True, truncation=True).to(DEVICE)
-
-                # Update mask for hook
-                current_mask = inputs['attention_mask']
-
-                with torch.no_grad():
-                    self.model(**inputs)
-        finally:
-            handle.remove()
-
-        return torch.cat(harvested, dim=0)  # (num_prompts, hidden_dim)
-
-    def compute_basis(self, states, num_components=16):
+        self._harvesters = {}
+
+    def harvest_states(self, prompts, batch_size=8, num_workers=1):
+        """
+        Mean-pooled layer-6 states for each prompt, (num_prompts, hidden_dim).
+        With num_workers > 1 the corpus is sharded across CPU worker processes.
+        """
+        key = (num_workers, batch_size)
+        if key not in self._harvesters:
+            # Keep the worker pool warm across calls
+            self._harvesters[key] = ParallelHarvester(self.model, self.tokenizer, num_workers=num_workers,
+                                                      layer_idx=6, batch_size=batch_size)
+        return self._harvesters[key].harvest(prompts)
+
+    def close(self):
+        """Shuts down the cached harvest worker pools."""
+        for harvester in self._harvesters.values():
+            harvester.close()
+        self._harvesters = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def compute_basis(self, states, num_components=16, force=False):
+        """
+        Computes the SVD basis and saves it with a version and content hash.
+        An existing basis is kept unless force=True; after a rebuild, run
+        GCASchool.reproject_skills() to move the registry onto the new basis.
+        """
         import os
-        if os.path.exists(BASIS_PATH):
-            print(f"[🗺️] Found existing basis at {BASIS_PATH}, skipping computation...")
+        if os.path.exists(BASIS_PATH) and not force:
+            print(f"[🗺️] Found existing basis at {BASIS_PATH}, skipping computation (force=True to rebuild)...")
             return
 
         # Center states
@@ -84,8 +70,8 @@ class GCACartographer:
         # Transpose V to get components as rows and select top components
         basis = V.T[:num_components]  # (num_components, hidden_dim)
 
-        torch.save(basis, BASIS_PATH)
-        print(f"[🗺️] Basis saved to {BASIS_PATH}")
+        meta = save_basis(basis, BASIS_PATH)
+        print(f"[🗺️] Basis v{meta['version']} ({meta['hash']}) saved to {BASIS_PATH}")
 
 # Diverse prompts for basis
 prompts = [
@@ -112,6 +98,7 @@ prompts = [
 ]
 
 if __name__ == "__main__":
-    cart = GCACartographer()
-    states = cart.harvest_states(prompts)
-    cart.compute_basis(states)
+    import sys
+    with GCACartographer() as cart:
+        states = cart.harvest_states(prompts)
+        cart.compute_basis(states, force="--rebuild" in sys.argv)
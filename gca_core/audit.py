@@ -0,0 +1,220 @@
+"""
+GCA Audit Trail
+---------------
+Durable record of every moral approve/block decision, kept off the request path.
+1. `record` appends to a bounded in-memory ring (no lock, GIL-atomic deque ops).
+2. A background thread drains it in batches to SQLite (WAL) or rotating JSONL.
+3. A full ring drops the new record and counts it (back-pressure metric).
+4. `close` (also registered with atexit) flushes everything still buffered.
+5. `AuditSink.from_env` builds the sink the entry points use: $GCA_AUDIT
+   picks sqlite (default), jsonl or off; $GCA_AUDIT_PATH the file.
+"""
+
+import atexit
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+
+AUDIT_PATHS = {"sqlite": "moral_audit.db", "jsonl": "moral_audit.jsonl"}
+
+def _action_fields(action):
+    return {
+        "type": action.type,
+        "description": action.description,
+        "harm": action.harm,
+        "utility": action.utility,
+        "uncertainty": action.uncertainty,
+        "scale": action.scale,
+        "agents_affected": action.agents_affected,
+        "entropy_class": action.entropy_class.name,
+    }
+
+def _serialize(record):
+    ts, kernel, approved, score, threshold, reason, actions = record
+    return {
+        "ts": ts,
+        "kernel": kernel,
+        "approved": bool(approved),
+        "score": float(score),
+        "threshold": float(threshold),
+        "reason": reason,
+        "actions": [_action_fields(a) for a in actions] if actions is not None else None,
+    }
+
+class SQLiteAuditWriter:
+    """Batched inserts into an `audit` table, WAL journal."""
+
+    def __init__(self, path="moral_audit.db"):
+        self.path = path
+        # Used from the writer thread and from flush()/close(), always under the sink's lock
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS audit ("
+            "id INTEGER PRIMARY KEY, ts REAL, kernel TEXT, approved INTEGER, "
+            "score REAL, threshold REAL, reason TEXT, actions TEXT)"
+        )
+        self.conn.commit()
+
+    def write(self, records):
+        rows = []
+        for record in records:
+            r = _serialize(record)
+            rows.append((r["ts"], r["kernel"], int(r["approved"]), r["score"], r["threshold"],
+                         r["reason"], json.dumps(r["actions"])))
+        with self.conn:
+            self.conn.executemany(
+                "INSERT INTO audit (ts, kernel, approved, score, threshold, reason, actions) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def close(self):
+        self.conn.close()
+
+class JSONLAuditWriter:
+    """Appends one JSON object per line; rotates to path.1 .. path.N by size."""
+
+    def __init__(self, path="moral_audit.jsonl", max_bytes=64 * 1024 * 1024, backups=5):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.f = open(path, "a", encoding="utf-8")
+
+    def _rotate(self):
+        self.f.close()
+        for i in range(self.backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self.backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.f = open(self.path, "a", encoding="utf-8")
+
+    def write(self, records):
+        self.f.write("".join(json.dumps(_serialize(r)) + "\n" for r in records))
+        self.f.flush()
+        if self.f.tell() >= self.max_bytes:
+            self._rotate()
+
+    def close(self):
+        self.f.close()
+
+class AuditSink:
+    def __init__(self, writer, capacity=65536, batch_size=512, flush_interval=0.5):
+        self.writer = writer
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self._buffer = collections.deque()
+        self._wake = threading.Event()
+        self._write_lock = threading.Lock()
+        self._closed = False
+
+        # Metrics; plain ints, so exact for a single producer and approximate under contention
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.flushes = 0
+        self.write_errors = 0
+        self.high_watermark = 0
+
+        self._thread = threading.Thread(target=self._run, name="gca-audit-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    @classmethod
+    def sqlite(cls, path="moral_audit.db", **kwargs):
+        return cls(SQLiteAuditWriter(path), **kwargs)
+
+    @classmethod
+    def jsonl(cls, path="moral_audit.jsonl", max_bytes=64 * 1024 * 1024, backups=5, **kwargs):
+        return cls(JSONLAuditWriter(path, max_bytes=max_bytes, backups=backups), **kwargs)
+
+    @classmethod
+    def from_env(cls, suffix="", **kwargs):
+        """
+        Sink configured by $GCA_AUDIT / $GCA_AUDIT_PATH, or None when auditing
+        is off. `suffix` goes before the extension, so processes that audit
+        side by side (replicas) each get their own file.
+        """
+        backend = os.environ.get("GCA_AUDIT", "sqlite").strip().lower()
+        if backend in ("off", "0", "none", ""):
+            return None
+        if backend not in AUDIT_PATHS:
+            raise ValueError(f"GCA_AUDIT must be one of sqlite, jsonl, off (got {backend!r})")
+        root, ext = os.path.splitext(os.environ.get("GCA_AUDIT_PATH") or AUDIT_PATHS[backend])
+        path = root + suffix + ext
+        if backend == "sqlite":
+            return cls.sqlite(path, **kwargs)
+        return cls.jsonl(path, **kwargs)
+
+    def record(self, actions, score, threshold, approved, reason, kernel="MoralKernel"):
+        """
+        Enqueues one decision without blocking. Returns False (and counts a
+        drop) if the ring is full or the sink is closed.
+        """
+        pending = len(self._buffer)
+        if self._closed or pending >= self.capacity:
+            self.dropped += 1
+            return False
+        self._buffer.append((time.time(), kernel, approved, score, threshold, reason,
+                             tuple(actions) if actions is not None else None))
+        self.enqueued += 1
+        if pending >= self.high_watermark:
+            self.high_watermark = pending + 1
+        if pending + 1 >= self.batch_size:
+            self._wake.set()
+        return True
+
+    def _drain(self):
+        with self._write_lock:
+            while self._buffer:
+                batch = []
+                while self._buffer and len(batch) < self.batch_size:
+                    batch.append(self._buffer.popleft())
+                try:
+                    self.writer.write(batch)
+                    self.written += len(batch)
+                except Exception as e:
+                    self.write_errors += 1
+                    print(f"[⚠️] Audit write failed ({len(batch)} records lost): {e}")
+                self.flushes += 1
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self._drain()
+
+    def flush(self):
+        """Synchronously writes everything buffered so far."""
+        self._drain()
+
+    def close(self):
+        """Stops the writer thread after a final flush. Safe to call twice."""
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self._drain()
+        self.writer.close()
+        atexit.unregister(self.close)
+
+    def stats(self):
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "dropped": self.dropped,
+            "pending": len(self._buffer),
+            "high_watermark": self.high_watermark,
+            "capacity": self.capacity,
+            "flushes": self.flushes,
+            "write_errors": self.write_errors,
+        }
@@ -0,0 +1,78 @@
+"""
+GCA Basis Store
+---------------
+1. Saves the Universal Basis with a version counter and content hash.
+2. Loads both the versioned format and legacy raw-tensor files.
+3. Re-projects every skill's raw mean onto a rebuilt basis in one matmul.
+"""
+
+import hashlib
+import os
+
+import torch
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+LEGACY_VERSION = 0
+
+def basis_hash(basis):
+    """Short content hash identifying a basis independent of its file."""
+    data = basis.detach().to("cpu", torch.float32).contiguous().numpy().tobytes()
+    return hashlib.sha256(data).hexdigest()[:16]
+
+def unpack_basis(payload):
+    """
+    Splits a loaded basis file into (basis, meta).
+    Legacy files hold a bare tensor and get version 0 and no hash.
+    """
+    if isinstance(payload, dict) and "basis" in payload:
+        return payload["basis"], {"version": payload.get("version", LEGACY_VERSION),
+                                  "hash": payload.get("hash")}
+    return payload, {"version": LEGACY_VERSION, "hash": None}
+
+def load_basis(path, map_location=DEVICE):
+    """Returns (basis, meta); legacy files get their hash computed on load."""
+    basis, meta = unpack_basis(torch.load(path, map_location=map_location))
+    if meta["hash"] is None:
+        meta["hash"] = basis_hash(basis)
+    return basis, meta
+
+def save_basis(basis, path):
+    """Writes a versioned basis file, bumping the version of any existing one."""
+    version = LEGACY_VERSION
+    if os.path.exists(path):
+        _, previous = unpack_basis(torch.load(path, map_location="cpu"))
+        version = previous["version"]
+    meta = {"version": version + 1, "hash": basis_hash(basis)}
+    torch.save({"basis": basis, **meta}, path)
+    return meta
+
+def project(raw_means, basis):
+    """(..., hidden) raw means -> L2-normalized (..., num_components) coefficients."""
+    coeffs = torch.matmul(raw_means, basis.T)
+    return torch.nn.functional.normalize(coeffs, p=2, dim=-1)
+
+def is_stale(entry, meta):
+    """True if a registry entry was projected onto a different basis."""
+    return entry.get("basis_hash") != meta["hash"]
+
+def reproject_registry(registry, basis, meta):
+    """
+    Re-projects every stale skill that kept its raw mean, in place.
+    Returns (reprojected_names, unrecoverable_names); the latter were learned
+    before raw means were stored and must be harvested again.
+    """
+    stale = [name for name, entry in registry.items() if is_stale(entry, meta)]
+    names = [name for name in stale if "raw_mean" in registry[name]]
+    missing = [name for name in stale if "raw_mean" not in registry[name]]
+
+    if names:
+        raw_means = torch.tensor([registry[name]["raw_mean"] for name in names],
+                                 device=basis.device, dtype=basis.dtype)
+        # One batched matmul: (N, hidden) @ (hidden, K) -> (N, K)
+        coeffs = project(raw_means, basis).tolist()
+        for name, row in zip(names, coeffs):
+            registry[name]["vector_coeffs"] = row
+            registry[name]["basis_version"] = meta["version"]
+            registry[name]["basis_hash"] = meta["hash"]
+
+    return names, missing
@@ -0,0 +1,254 @@
+"""
+GCA Memory Budget
+-----------------
+Per-request memory accounting and admission control for batched generation.
+1. MemoryModel estimates a generate() call's peak from batch size, padded
+   prompt length and max_new_tokens: the KV cache at full length, the
+   largest prefill activations (hidden states, MLP, attention scores) and
+   the per-step logits. Weights are resident and not counted.
+2. measure() records what a call really used: the peak RSS growth (Linux
+   VmHWM, reset per call) and, on CUDA, the peak tensor allocation. Both
+   are process-wide, so a call that overlaps another is flagged approximate.
+3. AdmissionController keeps work inside a byte budget. plan() splits a
+   batch into length-sorted chunks that each fit; reserve() makes a chunk
+   wait while concurrent work holds the budget; a single request that
+   cannot fit even alone is rejected instead of OOM-killing the worker.
+"""
+
+import contextlib
+import os
+import resource
+import threading
+import time
+
+import torch
+
+DTYPE_BYTES = 4
+OVERHEAD = 1.25  # Allocator slack and transient copies (cache growth, softmax)
+
+# The peak counters are process-wide: only a measurement that starts alone may reset them
+_measure_lock = threading.Lock()
+_measuring = 0
+_measure_starts = 0
+_peak_resets = False  # Whether the last reset of VmHWM worked
+
+class MemoryBudgetExceeded(RuntimeError):
+    pass
+
+def _status_kb(field):
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+def rss_bytes():
+    kb = _status_kb("VmRSS")
+    return kb * 1024 if kb is not None else None
+
+def peak_rss_bytes():
+    """High-water RSS: VmHWM (resettable) or ru_maxrss (process lifetime)."""
+    kb = _status_kb("VmHWM")
+    if kb is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return kb * 1024
+
+def _reset_peak_rss():
+    global _peak_resets
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")  # Resets VmHWM to the current RSS (Linux >= 4.0)
+        _peak_resets = True
+    except OSError:
+        _peak_resets = False
+    return _peak_resets
+
+def available_memory_bytes(device="cpu"):
+    if torch.device(device).type == "cuda":
+        free, _ = torch.cuda.mem_get_info()
+        return free
+    kb = None
+    try:
+        with open("/proc/meminfo", "r") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    kb = int(line.split()[1])
+    except OSError:
+        pass
+    if kb is not None:
+        return kb * 1024
+    return os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_AVPHYS_PAGES")
+
+@contextlib.contextmanager
+def measure(device="cpu"):
+    """
+    Yields a dict filled in on exit with "seconds", "rss_peak_delta" (peak RSS
+    above the RSS at entry; None where VmHWM cannot be reset), "tensor_peak"
+    (CUDA peak allocation, else None) and "approximate". The counters are
+    only reset when no other measurement is running; if one overlaps, the
+    peaks include its memory too and "approximate" is True.
+    """
+    global _measuring, _measure_starts
+    cuda = torch.device(device).type == "cuda"
+    result = {"seconds": None, "rss_peak_delta": None, "tensor_peak": None, "approximate": False}
+    with _measure_lock:
+        alone = _measuring == 0
+        _measuring += 1
+        _measure_starts += 1
+        starts = _measure_starts
+        # Overlapping calls read the peak since the first one's reset
+        resettable = _reset_peak_rss() if alone else _peak_resets
+        rss_start = rss_bytes()
+        if cuda:
+            if alone:
+                torch.cuda.reset_peak_memory_stats()
+            tensor_start = torch.cuda.memory_allocated()
+    start = time.perf_counter()
+    try:
+        yield result
+    finally:
+        result["seconds"] = time.perf_counter() - start
+        with _measure_lock:
+            _measuring -= 1
+            result["approximate"] = not alone or _measure_starts != starts
+            if resettable and rss_start is not None:
+                result["rss_peak_delta"] = max(0, peak_rss_bytes() - rss_start)
+            if cuda:
+                result["tensor_peak"] = torch.cuda.max_memory_allocated() - tensor_start
+
+class MemoryModel:
+    def __init__(self, n_layer, n_embd, n_head, vocab_size, dtype_bytes=DTYPE_BYTES, overhead=OVERHEAD):
+        self.n_layer = n_layer
+        self.n_embd = n_embd
+        self.n_head = n_head
+        self.vocab_size = vocab_size
+        self.dtype_bytes = dtype_bytes
+        self.overhead = overhead
+
+    @classmethod
+    def from_model(cls, model):
+        config = model.config
+        dtype = next(model.parameters()).dtype
+        return cls(config.n_layer, config.n_embd, config.n_head, config.vocab_size,
+                   dtype_bytes=torch.finfo(dtype).bits // 8)
+
+    def estimate(self, batch_size, prompt_len, max_new_tokens):
+        """Peak bytes of one generate() call -> {"kv", "activations", "logits", "total"}."""
+        total_len = prompt_len + max_new_tokens
+        kv = 2 * self.n_layer * batch_size * total_len * self.n_embd * self.dtype_bytes
+        # Prefill is the activation peak: per token ~14 hidden-size buffers (qkv, attention
+        # out, MLP in/out, norms, residual) plus two copies of the attention scores
+        per_token = 14 * self.n_embd + 2 * self.n_head * prompt_len
+        activations = batch_size * prompt_len * per_token * self.dtype_bytes
+        # Last-position logits, processed scores and probabilities every step
+        logits = 3 * batch_size * self.vocab_size * self.dtype_bytes
+        total = int((kv + activations + logits) * self.overhead)
+        return {"kv": kv, "activations": activations, "logits": logits, "total": total}
+
+class AdmissionController:
+    def __init__(self, memory_model, budget_bytes, max_wait=30.0):
+        """
+        `budget_bytes` bounds the estimated peak of all generation admitted at
+        once (on top of the resident weights). `max_wait` is how long reserve()
+        delays a chunk before giving up.
+        """
+        self.memory_model = memory_model
+        self.budget_bytes = int(budget_bytes)
+        self.max_wait = max_wait
+        self._reserved = 0
+        self._cond = threading.Condition()
+
+        self.admitted = 0
+        self.splits = 0
+        self.delayed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.peak_reserved = 0
+
+    @classmethod
+    def for_model(cls, model, budget_bytes=None, fraction=0.5, **kwargs):
+        """
+        Budget from `budget_bytes`, else $GCA_MEMORY_BUDGET_MB, else `fraction`
+        of the memory available on the model's device right now.
+        """
+        if budget_bytes is None and os.environ.get("GCA_MEMORY_BUDGET_MB"):
+            budget_bytes = float(os.environ["GCA_MEMORY_BUDGET_MB"]) * 1024 * 1024
+        if budget_bytes is None:
+            budget_bytes = fraction * available_memory_bytes(next(model.parameters()).device)
+        return cls(MemoryModel.from_model(model), budget_bytes, **kwargs)
+
+    def estimate(self, batch_size, prompt_len, max_new_tokens):
+        return self.memory_model.estimate(batch_size, prompt_len, max_new_tokens)["total"]
+
+    def plan(self, prompt_lens, max_new_tokens):
+        """
+        Splits row indices into chunks that each fit the budget -> (chunks,
+        rejected). Rows are sorted by length so a chunk pads to similar
+        lengths; a row that does not fit alone is rejected.
+        """
+        order = sorted(range(len(prompt_lens)), key=lambda i: prompt_lens[i])
+        chunks, rejected = [], []
+        current, current_len = [], 0
+        for i in order:
+            length = max(current_len, prompt_lens[i])
+            if current and self.estimate(len(current) + 1, length, max_new_tokens) <= self.budget_bytes:
+                current.append(i)
+                current_len = length
+                continue
+            if current:
+                chunks.append(current)
+            if self.estimate(1, prompt_lens[i], max_new_tokens) > self.budget_bytes:
+                rejected.append(i)
+                current, current_len = [], 0
+            else:
+                current, current_len = [i], prompt_lens[i]
+        if current:
+            chunks.append(current)
+        with self._cond:  # Counters are shared with reserve() on other threads
+            if len(chunks) > 1:
+                self.splits += 1
+            self.rejected += len(rejected)
+        return chunks, rejected
+
+    @contextlib.contextmanager
+    def reserve(self, nbytes, timeout=None):
+        """Holds `nbytes` of the budget for the block, waiting while others hold it."""
+        if nbytes > self.budget_bytes:
+            with self._cond:
+                self.rejected += 1
+            raise MemoryBudgetExceeded(f"needs {nbytes} bytes, budget is {self.budget_bytes}")
+        timeout = self.max_wait if timeout is None else timeout
+        with self._cond:
+            if self._reserved + nbytes > self.budget_bytes:
+                self.delayed += 1
+                start = time.perf_counter()
+                fits = self._cond.wait_for(lambda: self._reserved + nbytes <= self.budget_bytes, timeout)
+                self.wait_seconds += time.perf_counter() - start
+                if not fits:
+                    self.rejected += 1
+                    raise MemoryBudgetExceeded(f"waited {timeout}s for {nbytes} bytes of budget")
+            self._reserved += nbytes
+            self.admitted += 1
+            self.peak_reserved = max(self.peak_reserved, self._reserved)
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._reserved -= nbytes
+                self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "reserved_bytes": self._reserved,
+                "peak_reserved_bytes": self.peak_reserved,
+                "admitted": self.admitted,
+                "splits": self.splits,
+                "delayed": self.delayed,
+                "rejected": self.rejected,
+                "wait_seconds": self.wait_seconds,
+            }
@@ -0,0 +1,46 @@
+import os
+
+import torch
+
+def available_cores():
+    """CPU ids this process may run on (respects taskset/cgroup affinity)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def partition_cores(num_workers, cores=None):
+    """
+    Splits the available cores into `num_workers` contiguous, disjoint slices.
+    When there are fewer cores than workers, slices wrap around and share.
+    """
+    cores = list(cores) if cores is not None else available_cores()
+    num_workers = max(1, int(num_workers))
+    if len(cores) < num_workers:
+        return [[cores[i % len(cores)]] for i in range(num_workers)]
+
+    per_worker, extra = divmod(len(cores), num_workers)
+    slices = []
+    start = 0
+    for rank in range(num_workers):
+        size = per_worker + (1 if rank < extra else 0)
+        slices.append(cores[start : start + size])
+        start += size
+    return slices
+
+def pin_worker(cores, num_threads=None):
+    """
+    Binds the calling process to `cores` and caps torch intra-op threads.
+    Must run inside the worker before its first torch op.
+    """
+    num_threads = num_threads or max(1, len(cores))
+    if hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, set(cores))
+        except OSError:
+            pass  # Affinity is best-effort (containers may forbid it)
+    torch.set_num_threads(num_threads)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # Already set once parallel work started
+    return num_threads
@@ -0,0 +1,191 @@
+"""
+GCA SQLite Pool
+---------------
+Thread-safe access to one SQLite database for ToolBox.query_database.
+1. One writer connection, serialized by a lock, commits writes only.
+2. Up to N read-only connections for SELECTs. With wal=True they also run
+   concurrently with the writer; WAL is opt-in because it changes the
+   database file for every other user (-wal/-shm files, no network FS).
+3. Per-connection statement cache and configurable pragmas (mmap_size, cache_size, ...).
+4. Cursor-backed streaming of large result sets (materialized for :memory:).
+"""
+
+import contextlib
+import os
+import queue
+import re
+import sqlite3
+import threading
+import urllib.parse
+
+DEFAULT_PRAGMAS = {
+    "mmap_size": 256 * 1024 * 1024,
+    "cache_size": -64 * 1024,  # Negative = KiB, i.e. 64 MiB
+    "busy_timeout": 5000,
+}
+
+_LEADING_COMMENTS = re.compile(r"^\s*(?:(?:--[^\n]*\n|/\*.*?\*/)\s*)*", re.DOTALL)
+_READ_KEYWORDS = ("SELECT", "WITH", "EXPLAIN", "VALUES")
+
+def is_read_only(query):
+    """True if the statement starts like a read; the read-only connection enforces it."""
+    body = _LEADING_COMMENTS.sub("", query, count=1)
+    return body[:7].upper().startswith(_READ_KEYWORDS)
+
+class SQLitePool:
+    def __init__(self, path, readers=4, pragmas=None, cached_statements=256, wal=False):
+        self.path = path
+        self.cached_statements = cached_statements
+        self.pragmas = dict(DEFAULT_PRAGMAS, **(pragmas or {}))
+        # A private in-memory database cannot be opened by a second connection
+        self.max_readers = 0 if path == ":memory:" or path.startswith("file::memory:") else readers
+
+        self._write_lock = threading.Lock()
+        self.writer = sqlite3.connect(path, check_same_thread=False, cached_statements=cached_statements)
+        if wal:
+            self.writer.execute("PRAGMA journal_mode=WAL")
+        self._apply_pragmas(self.writer)
+
+        self._readers = queue.LifoQueue()
+        self._reader_count = 0
+        self._reader_lock = threading.Lock()
+        self._all_readers = set()  # Idle and checked out, so close() reaches both
+
+        # Dedicated connection for change detection, opened on first use
+        self._probe = None
+        self._probe_lock = threading.Lock()
+
+    def _apply_pragmas(self, conn):
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={int(value)}")
+
+    def _open_reader(self):
+        uri = "file:" + urllib.parse.quote(os.path.abspath(self.path)) + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, check_same_thread=False,
+                               cached_statements=self.cached_statements)
+        self._apply_pragmas(conn)
+        return conn
+
+    @contextlib.contextmanager
+    def reader(self):
+        """Checks out a read-only connection (blocks if all N are busy)."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            with self._reader_lock:
+                grow = self._reader_count < self.max_readers
+                if grow:
+                    self._reader_count += 1
+            if grow:
+                try:
+                    conn = self._open_reader()
+                except Exception:
+                    with self._reader_lock:
+                        self._reader_count -= 1
+                    raise
+                with self._reader_lock:
+                    self._all_readers.add(conn)
+            else:
+                conn = self._readers.get()
+        try:
+            yield conn
+        finally:
+            self._readers.put(conn)
+
+    @contextlib.contextmanager
+    def write_connection(self):
+        """The writer connection, held under the write lock."""
+        with self._write_lock:
+            yield self.writer
+
+    @contextlib.contextmanager
+    def read_connection(self):
+        """A reader, or the locked writer when readers are unavailable (:memory:)."""
+        if self.max_readers:
+            with self.reader() as conn:
+                yield conn
+        else:
+            with self.write_connection() as conn:
+                yield conn
+
+    def stream(self, query, params=(), batch_size=256):
+        """
+        Yields rows lazily via fetchmany, holding one read connection until
+        the generator is exhausted or closed (use contextlib.closing to stop early).
+        Yields the column names first. Without readers (:memory:) the result
+        is fetched up front, so the write lock is not held between yields.
+        """
+        if not self.max_readers:
+            with self.write_connection() as conn:
+                cursor = conn.execute(query, params)
+                try:
+                    columns = [d[0] for d in cursor.description or ()]
+                    rows = cursor.fetchall()
+                finally:
+                    cursor.close()
+            yield columns
+            yield from rows
+            return
+
+        with self.read_connection() as conn:
+            cursor = conn.execute(query, params)
+            try:
+                yield [d[0] for d in cursor.description or ()]
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        return
+                    yield from rows
+            finally:
+                cursor.close()
+
+    def data_version(self):
+        """
+        Changes whenever any connection, in this process or another, commits
+        (the probe itself never writes). None for :memory:, which only its
+        writer can change.
+        """
+        if not self.max_readers:
+            return None
+        with self._probe_lock:
+            if self._probe is None:
+                self._probe = self._open_reader()
+            return self._probe.execute("PRAGMA data_version").fetchone()[0]
+
+    def execute(self, query, params=()):
+        """Runs one statement and returns all rows. Reads never commit."""
+        if self.max_readers and is_read_only(query):
+            try:
+                with self.reader() as conn:
+                    return conn.execute(query, params).fetchall()
+            except sqlite3.OperationalError as e:
+                # e.g. WITH ... INSERT: retry on the writer
+                if "readonly" not in str(e):
+                    raise
+
+        with self._write_lock:
+            try:
+                rows = self.writer.execute(query, params).fetchall()
+                if self.writer.in_transaction:
+                    self.writer.commit()
+                return rows
+            except Exception:
+                self.writer.rollback()
+                raise
+
+    def close(self):
+        with self._write_lock:
+            self.writer.close()
+        with self._probe_lock:
+            if self._probe is not None:
+                self._probe.close()
+                self._probe = None
+        with self._reader_lock:
+            readers, self._all_readers = self._all_readers, set()
+        for conn in readers:
+            conn.close()  # A reader still checked out fails on its next statement
+        while True:
+            try:
+                self._readers.get_nowait()
+            except queue.Empty:
+                break
@@ -0,0 +1,115 @@
+"""
+GCA Tool-Call Detector
+----------------------
+Recognizes a complete tool call while tokens are still being generated,
+so decoding can stop as soon as the call is closed.
+1. PYTHON: a ```python fence followed by a closing ```.
+2. SQL: a SELECT ... FROM ... statement terminated by ';' (outside a code block).
+Each feed() only scans the new text (plus a small overlap for markers
+split across tokens), so detection is linear in the response length.
+"""
+
+import re
+
+import torch
+from transformers import StoppingCriteria
+
+PY_OPEN = "```python"
+FENCE = "```"
+
+_SELECT = re.compile(r"\bSELECT\b", re.IGNORECASE)
+_FROM = re.compile(r"\bFROM\b", re.IGNORECASE)
+
+class ToolCallDetector:
+    def __init__(self):
+        self.text = ""
+        self.call = None  # (tool_type, content) once detected
+
+        self._py_start = -1   # Index just past the opening fence
+        self._py_scan = 0     # Where to resume searching for the fences
+        self._sql_start = -1  # Index of the current SELECT
+        self._sql_scan = 0    # Where to resume searching for SELECT / ';'
+
+    @property
+    def done(self):
+        return self.call is not None
+
+    def feed(self, delta):
+        """Appends generated text; returns the (tool_type, content) call once complete."""
+        if self.call is not None or not delta:
+            return self.call
+        self.text += delta
+        self.call = self._scan_python()
+        if self.call is None and self._py_start < 0:
+            # SQL inside an open code block belongs to the code
+            self.call = self._scan_sql()
+        return self.call
+
+    def _scan_python(self):
+        text = self.text
+        if self._py_start < 0:
+            i = text.find(PY_OPEN, self._py_scan)
+            if i < 0:
+                self._py_scan = max(0, len(text) - len(PY_OPEN) + 1)
+                return None
+            self._py_start = self._py_scan = i + len(PY_OPEN)
+        j = text.find(FENCE, self._py_scan)
+        if j < 0:
+            self._py_scan = max(self._py_start, len(text) - len(FENCE) + 1)
+            return None
+        return "PYTHON", text[self._py_start:j].strip()
+
+    def _scan_sql(self):
+        text = self.text
+        while True:
+            if self._sql_start < 0:
+                # Back off so a keyword split across tokens is still whole next time
+                m = _SELECT.search(text, self._sql_scan)
+                if m is None or m.end() == len(text):
+                    self._sql_scan = max(self._sql_scan, len(text) - len("SELECT"))
+                    return None
+                self._sql_start = self._sql_scan = m.start()
+            end = text.find(";", self._sql_scan)
+            if end < 0:
+                self._sql_scan = len(text)
+                return None
+            statement = text[self._sql_start:end + 1]
+            if _FROM.search(statement):
+                return "SQL", statement.strip()
+            # Terminated without FROM: not a query, look for the next SELECT
+            self._sql_start = -1
+            self._sql_scan = end + 1
+
+class ToolCallStoppingCriteria(StoppingCriteria):
+    """
+    Feeds each newly generated token to one detector per batch row and
+    stops a row once its detector has a complete call. Only generated
+    tokens are seen, never the prompt.
+    """
+
+    def __init__(self, tokenizer, detectors):
+        self.tokenizer = tokenizer
+        self.detectors = detectors if isinstance(detectors, (list, tuple)) else [detectors]
+        self._ids = [[] for _ in self.detectors]
+        # Per row: decode a small window [prefix, end) and emit what lies past
+        # [prefix, read), so word boundaries and multi-byte characters come out right
+        self._prefix = [0] * len(self.detectors)
+        self._read = [0] * len(self.detectors)
+
+    def _delta(self, row):
+        ids, prefix, read = self._ids[row], self._prefix[row], self._read[row]
+        before = self.tokenizer.decode(ids[prefix:read], skip_special_tokens=True)
+        after = self.tokenizer.decode(ids[prefix:], skip_special_tokens=True)
+        if len(after) <= len(before) or after.endswith("\ufffd"):
+            return ""  # Nothing printable yet (special token or partial character)
+        self._prefix[row], self._read[row] = read, len(ids)
+        return after[len(before):]
+
+    def __call__(self, input_ids, scores, **kwargs):
+        done = []
+        for row, detector in enumerate(self.detectors):
+            if not detector.done:
+                self._ids[row].append(int(input_ids[row, -1]))
+                detector.feed(self._delta(row))
+            done.append(detector.done)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
@@ -0,0 +1,125 @@
+"""
+GCA File I/O
+------------
+Large-file primitives for ToolBox.file_op.
+1. Range and tail reads through mmap: only the touched pages are read.
+2. Lazy line iteration with a bounded buffer.
+3. Atomic writes: chunks go to a temp file in the same directory, which is
+   fsynced and then renamed over the target. A crash leaves either the old
+   file or the new one, never a torn mix. Symlinks are followed, so the
+   link survives and its target is replaced.
+"""
+
+import mmap
+import os
+import tempfile
+
+CHUNK_SIZE = 1024 * 1024
+
+def _umask():
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+# Read once: os.umask is process-wide, so probing it per write would race other threads
+_UMASK = _umask()
+
+def read_range(path, offset=0, length=None):
+    """Bytes [offset, offset + length) of the file; length=None reads to the end."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        offset = max(0, min(offset, size))
+        end = size if length is None else min(size, offset + max(0, length))
+        if end <= offset:
+            return b""  # Also covers empty files, which cannot be mapped
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            return m[offset:end]
+
+def read_tail(path, num_lines=100):
+    """The last `num_lines` lines as bytes, found by scanning backwards for newlines."""
+    with open(path, 'rb') as f:
+        size = os.fstat(f.fileno()).st_size
+        if size == 0 or num_lines <= 0:
+            return b""
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+            end = size
+            if m[size - 1:size] == b"\n":
+                end -= 1  # A trailing newline does not start another line
+            start = end
+            for _ in range(num_lines):
+                start = m.rfind(b"\n", 0, start)
+                if start < 0:
+                    break
+            return m[start + 1:size]
+
+def iter_lines(path, encoding="utf-8", errors="replace"):
+    """Yields lines (with their endings) without loading the file."""
+    with open(path, 'r', encoding=encoding, errors=errors, newline='') as f:
+        yield from f
+
+def _chunks(data, chunk_size):
+    if isinstance(data, (str, bytes, bytearray, memoryview)):
+        for i in range(0, len(data), chunk_size):
+            yield data[i:i + chunk_size]
+    else:
+        yield from data
+
+def atomic_write(path, data, encoding="utf-8", chunk_size=CHUNK_SIZE, fsync=True):
+    """
+    Writes `data` (str, bytes, or an iterable of either) to a temp file next
+    to `path`, then renames it into place. Keeps the old file's permissions
+    and, where the process may set it, its owner and group.
+    Returns the number of bytes written.
+    """
+    # Replace the symlink's target, not the link itself
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+    try:
+        old = os.stat(path)
+    except FileNotFoundError:
+        old = None
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+    written = 0
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in _chunks(data, chunk_size):
+                if isinstance(chunk, str):
+                    chunk = chunk.encode(encoding)
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            if fsync:
+                os.fsync(f.fileno())
+        if old is None:
+            os.chmod(tmp_path, 0o666 & ~_UMASK)  # What open(path, 'w') would have created
+        else:
+            tmp_stat = os.stat(tmp_path)
+            if hasattr(os, "chown") and (tmp_stat.st_uid, tmp_stat.st_gid) != (old.st_uid, old.st_gid):
+                try:
+                    os.chown(tmp_path, old.st_uid, old.st_gid)  # Before chmod: chown clears setuid bits
+                except PermissionError:
+                    pass  # Only root may give a file away; the new file stays ours
+            os.chmod(tmp_path, old.st_mode & 0o7777)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except FileNotFoundError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(directory)
+    return written
+
+def _fsync_dir(directory):
+    # Makes the rename itself durable; not supported on every platform
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
@@ -1,40 +1,108 @@
+import contextlib
+
 import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import AutoModelForCausalLM, AutoTokenizer, StoppingCriteriaList
+
+from gca_core.profiling import hook_scope, profiled
+from gca_core.sessions import SessionStore, steering_key
+from gca_core.telemetry import log, span
 
 MODEL_ID = "gpt2"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
 class GlassBox:
     def __init__(self):
-        print(f"[🔮] Initializing GlassBox ({MODEL_ID})...")
+        log.info("[🔮] Initializing GlassBox (%s)...", MODEL_ID)
         self.tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
         self.model = AutoModelForCausalLM.from_pretrained(MODEL_ID).to(DEVICE)
         self.layer_idx = 6 # Default for GPT2
+        self.sessions = SessionStore()
 
-    def generate_steered(self, prompt, steering_vec, strength, max_tokens=150):
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(DEVICE)
-
+    @contextlib.contextmanager
+    def _steering(self, steering_vec, strength):
         hook_handle = None
         if steering_vec is not None and strength != 0:
             steering_vec = steering_vec.to(DEVICE)
             def steer_hook(module, input, output):
-                output[0][:, :, :] += steering_vec * strength
+                # Blocks return a tuple in older transformers, a bare tensor in newer ones
+                with hook_scope("gca::steer_hook"):
+                    hidden = output[0] if isinstance(output, tuple) else output
+                    hidden[:, :, :] += steering_vec * strength
                 return output
 
             layer = self.model.transformer.h[self.layer_idx]
             hook_handle = layer.register_forward_hook(steer_hook)
-
         try:
+            yield
+        finally:
+            if hook_handle:
+                hook_handle.remove()
+
+    @profiled("generate_steered")
+    def generate_steered(self, prompt, steering_vec, strength, max_tokens=150, stopping_criteria=None):
+        """
+        Samples up to `max_tokens` with the steering hook on layer_idx.
+        `stopping_criteria` (e.g. a detector.ToolCallStoppingCriteria) can end decoding early.
+        """
+        with span("tokenize"):
+            inputs = self.tokenizer(prompt, return_tensors="pt").to(DEVICE)
+
+        with span("generate"), self._steering(steering_vec, strength):
             out = self.model.generate(
                 **inputs,
                 max_new_tokens=max_tokens,
                 do_sample=True,
                 temperature=0.7,
                 repetition_penalty=1.2,
-                pad_token_id=self.tokenizer.eos_token_id
+                pad_token_id=self.tokenizer.eos_token_id,
+                stopping_criteria=StoppingCriteriaList(stopping_criteria) if stopping_criteria else None,
             )
+        with span("decode"):
             response = self.tokenizer.decode(out[0], skip_special_tokens=True)
-            return response
-        finally:
-            if hook_handle:
-                hook_handle.remove()
+        return response
+
+    def generate_session(self, session_id, text, steering_vec, strength, max_tokens=150, stopping_criteria=None):
+        """
+        One turn of a multi-turn conversation. Appends `text` to the
+        session's history and prefills only the tokens its KV cache lacks.
+        Returns just this turn's reply.
+        """
+        session = self.sessions.get(session_id)
+        steering = steering_key(steering_vec, strength)
+        cache = self.sessions.checkout(session, steering)
+
+        with span("tokenize"):
+            new_ids = self.tokenizer(text, return_tensors="pt").input_ids.to(DEVICE)
+        input_ids = new_ids if session.input_ids is None else torch.cat([session.input_ids, new_ids], dim=1)
+        limit = self.model.config.max_position_embeddings - max_tokens
+        if input_ids.shape[1] > limit:
+            # Keep the most recent context; shifted positions invalidate the cache
+            input_ids = input_ids[:, -limit:]
+            self.sessions.reset(session, truncated=True)
+            cache = None
+
+        reused = cache.get_seq_length() if cache is not None else 0
+        session.reused_tokens += reused
+        session.prefilled_tokens += input_ids.shape[1] - reused
+
+        try:
+            with span("generate"), self._steering(steering_vec, strength):
+                out = self.model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    past_key_values=cache,
+                    max_new_tokens=max_tokens,
+                    do_sample=True,
+                    temperature=0.7,
+                    repetition_penalty=1.2,
+                    pad_token_id=self.tokenizer.eos_token_id,
+                    stopping_criteria=StoppingCriteriaList(stopping_criteria) if stopping_criteria else None,
+                    return_dict_in_generate=True,
+                )
+        except Exception:
+            self.sessions.reset(session)  # generate may have half-extended the cache
+            raise
+
+        self.sessions.checkin(session, out.sequences, out.past_key_values, steering)
+        with span("decode"):
+            return self.tokenizer.decode(out.sequences[0, input_ids.shape[1]:], skip_special_tokens=True)
@@ -0,0 +1,152 @@
+"""
+GCA Harvest Engine
+------------------
+Data-parallel activation harvesting on CPU.
+1. Shards the prompt corpus across N worker processes.
+2. Each worker gets a pinned core slice and `torch.set_num_threads` budget.
+3. Weights are shared with the workers through shared memory (no copies).
+4. Shard results are merged back in the original prompt order.
+"""
+
+import math
+
+import torch
+import torch.multiprocessing as mp
+
+from gca_core.cpu import partition_cores, pin_worker
+from gca_core.profiling import hook_scope
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+LAYER_IDX = 6
+
+def masked_mean(hidden_states, mask):
+    """Mean-pools (batch, seq, hidden) over the non-padding positions."""
+    mask = mask.unsqueeze(-1).to(device=hidden_states.device, dtype=hidden_states.dtype)
+    sum_states = torch.sum(hidden_states * mask, dim=1)
+    lengths = torch.clamp(torch.sum(mask, dim=1), min=1e-9)
+    return sum_states / lengths
+
+def harvest_batches(model, tokenizer, prompts, layer_idx=LAYER_IDX, batch_size=8, device=DEVICE):
+    """
+    Serial harvest: mean-pooled layer activations for each prompt.
+    Returns a (num_prompts, hidden_dim) tensor.
+    """
+    harvested = []
+    current_mask = None
+
+    def hook(module, input, output):
+        with hook_scope("gca::harvest_hook"):
+            hidden_states = output[0] if isinstance(output, tuple) else output
+            harvested.append(masked_mean(hidden_states, current_mask).detach())
+
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    handle = model.transformer.h[layer_idx].register_forward_hook(hook)
+    try:
+        for i in range(0, len(prompts), batch_size):
+            batch_prompts = prompts[i : i + batch_size]
+            inputs = tokenizer(batch_prompts, return_tensors="pt", padding=True, truncation=True).to(device)
+            current_mask = inputs["attention_mask"]
+            with torch.no_grad():
+                model(**inputs)
+    finally:
+        handle.remove()
+
+    if not harvested:
+        return torch.empty((0, model.config.hidden_size), device=device)
+    return torch.cat(harvested, dim=0)
+
+# --- Worker side (module-level so the spawn context can pickle it) ---
+_worker = {}
+
+def _init_worker(model, tokenizer, layer_idx, batch_size, core_slices, threads, counter):
+    with counter.get_lock():
+        rank = counter.value
+        counter.value += 1
+    cores = core_slices[rank % len(core_slices)]
+    pin_worker(cores, threads)
+    _worker.update(model=model, tokenizer=tokenizer, layer_idx=layer_idx, batch_size=batch_size)
+
+def _harvest_shard(prompts):
+    return harvest_batches(
+        _worker["model"],
+        _worker["tokenizer"],
+        prompts,
+        layer_idx=_worker["layer_idx"],
+        batch_size=_worker["batch_size"],
+        device="cpu",
+    )
+
+class ParallelHarvester:
+    """
+    Persistent pool of harvest workers. The pool is spawned lazily on the
+    first parallel call and reused until `close()`.
+    """
+
+    def __init__(self, model, tokenizer, num_workers=1, layer_idx=LAYER_IDX,
+                 batch_size=8, threads_per_worker=None, cores=None):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.num_workers = max(1, int(num_workers))
+        self.layer_idx = layer_idx
+        self.batch_size = batch_size
+        self.core_slices = partition_cores(self.num_workers, cores)
+        self.threads_per_worker = threads_per_worker or max(1, min(len(s) for s in self.core_slices))
+        self._pool = None
+
+    @property
+    def parallel(self):
+        # Shared-memory workers only make sense for CPU weights
+        return self.num_workers > 1 and next(self.model.parameters()).device.type == "cpu"
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            self.model.share_memory()
+            ctx = mp.get_context("spawn")
+            counter = ctx.Value("i", 0)
+            self._pool = ctx.Pool(
+                processes=self.num_workers,
+                initializer=_init_worker,
+                initargs=(self.model, self.tokenizer, self.layer_idx, self.batch_size,
+                          self.core_slices, self.threads_per_worker, counter),
+            )
+        return self._pool
+
+    def _shards(self, prompts):
+        # A few shards per worker for load balancing, aligned to batch_size
+        # so sharding never changes how prompts are padded together.
+        target = math.ceil(len(prompts) / (self.num_workers * 4))
+        shard_size = max(self.batch_size, math.ceil(target / self.batch_size) * self.batch_size)
+        return [prompts[i : i + shard_size] for i in range(0, len(prompts), shard_size)]
+
+    def harvest(self, prompts):
+        """Returns (num_prompts, hidden_dim) states in the original order."""
+        prompts = list(prompts)
+        if not self.parallel or len(prompts) <= self.batch_size:
+            return harvest_batches(self.model, self.tokenizer, prompts,
+                                   layer_idx=self.layer_idx, batch_size=self.batch_size,
+                                   device=next(self.model.parameters()).device)
+
+        # Pool.map preserves shard order, so concatenation restores the corpus order
+        results = self._ensure_pool().map(_harvest_shard, self._shards(prompts))
+        return torch.cat([r.clone() for r in results], dim=0)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        try:
+            if self._pool is not None:
+                self._pool.terminate()
+        except Exception:
+            pass
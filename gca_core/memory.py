@@ -2,6 +2,8 @@ import torch
 import json
 import os
 
+from gca_core.basis import unpack_basis
+
 BASIS_PATH = "universal_basis.pt"
 REGISTRY_PATH = "skill_registry.json"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
@@ -20,10 +22,10 @@ class IsotropicMemory:
             return
 
         try:
-            self.basis = torch.load(BASIS_PATH, map_location=DEVICE)
+            self.basis, self.basis_meta = unpack_basis(torch.load(BASIS_PATH, map_location=DEVICE))
         except:
             print("❌ Basis not found.")
-            self.basis = None
+            self.basis, self.basis_meta = None, None
 
         self.registry = {}
         if os.path.exists(REGISTRY_PATH):
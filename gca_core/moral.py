@@ -5,8 +5,10 @@ A geometric moral calculator for actions.
 """
 
 from enum import Enum
+import collections
 import math
-import functools
+
+import numpy as np
 
 class EntropyClass(Enum):
     REVERSIBLE = 1
@@ -14,41 +16,272 @@ class EntropyClass(Enum):
     BOUNDED = 3 # Added for Phase 6 support
 
 class Action:
+    """
+    Immutable slots record. The hash is computed once, since every
+    moral-vector cache lookup hashes the action.
+    """
+    __slots__ = ("type", "description", "harm", "utility", "uncertainty", "scale",
+                 "agents_affected", "entropy_class", "_hash")
+
     def __init__(self, type, description, harm, utility, uncertainty, scale, agents_affected, entropy_class):
-        self.type = type
-        self.description = description
-        self.harm = harm  # 0-1
-        self.utility = utility  # 0-1
-        self.uncertainty = uncertainty  # 0-1
-        self.scale = scale  # 0-1
-        self.agents_affected = agents_affected  # int
-        self.entropy_class = entropy_class
+        setattr_ = object.__setattr__
+        setattr_(self, "type", type)
+        setattr_(self, "description", description)
+        setattr_(self, "harm", harm)  # 0-1
+        setattr_(self, "utility", utility)  # 0-1
+        setattr_(self, "uncertainty", uncertainty)  # 0-1
+        setattr_(self, "scale", scale)  # 0-1
+        setattr_(self, "agents_affected", agents_affected)  # int
+        setattr_(self, "entropy_class", entropy_class)
+        setattr_(self, "_hash", hash(self._fields()))
+
+    def _fields(self):
+        return (self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Action is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Action is immutable")
+
+    def __reduce__(self):
+        return (Action, self._fields())
+
+    def __repr__(self):
+        return (f"Action({self.type!r}, {self.description[:30]!r}, harm={self.harm}, utility={self.utility}, "
+                f"uncertainty={self.uncertainty}, scale={self.scale}, agents_affected={self.agents_affected}, "
+                f"entropy_class={self.entropy_class})")
 
     def __hash__(self):
-        return hash((self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class))
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Action):
             return NotImplemented
-        return (self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class) == \
-               (other.type, other.description, other.harm, other.utility, other.uncertainty, other.scale, other.agents_affected, other.entropy_class)
+        return self._hash == other._hash and self._fields() == other._fields()
+
+REASON_BELOW_THRESHOLD = 0
+REASON_EXCEEDS_THRESHOLD = 1
+REASONS = ("Moral vector below threshold", "Moral vector exceeds threshold")
+
+def _log_agents(agents_affected):
+    # math.log per distinct value (not np.log) so results match the scalar path bit for bit
+    values, inverse = np.unique(agents_affected, return_inverse=True)
+    logs = np.array([math.log(v + 1) for v in values.tolist()], dtype=np.float64)
+    return logs[inverse.reshape(-1)]
+
+def moral_vector(action):
+    """Scaled magnitude of one action. Entropy is compared by name, so gca_moral actions score too."""
+    # Simple geometric representation (can be expanded)
+    # Squares as products: correctly rounded, so ActionBatch reproduces them exactly
+    disutility = 1 - action.utility
+    magnitude = math.sqrt(action.harm * action.harm + disutility * disutility + action.uncertainty * action.uncertainty)
+    scaled_magnitude = magnitude * action.scale * math.log(action.agents_affected + 1)
+    if action.entropy_class.name == "IRREVERSIBLE":
+        scaled_magnitude *= 2  # Penalty for irreversibility
+    return scaled_magnitude
+
+CacheInfo = collections.namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+
+class ActionCache:
+    """
+    Bounded LRU of action -> moral vector with the functools-style
+    cache_info()/cache_clear(). It holds no reference to its kernel, so a
+    kernel and its cache are freed by refcounting, not the cycle collector.
+    """
+    __slots__ = ("func", "maxsize", "hits", "misses", "_entries")
+
+    def __init__(self, func=moral_vector, maxsize=1024):
+        self.func = func
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = collections.OrderedDict()
+
+    def __call__(self, action):
+        entries = self._entries
+        try:
+            value = entries[action]
+        except KeyError:
+            self.misses += 1
+            value = self.func(action)
+            if self.maxsize != 0:
+                entries[action] = value
+                if self.maxsize is not None and len(entries) > self.maxsize:
+                    entries.popitem(last=False)
+            return value
+        self.hits += 1
+        entries.move_to_end(action)
+        return value
+
+    def cache_info(self):
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self._entries))
+
+    def cache_clear(self):
+        self._entries.clear()
+        self.hits = self.misses = 0
+
+class ActionBatch:
+    """
+    Struct-of-arrays view of many plans for vectorized scoring, shared by
+    MoralKernel and gca_moral.MoralCalculator.
+    Action i of the flattened arrays belongs to plan p when
+    plan_offsets[p] <= i < plan_offsets[p + 1].
+    """
+    def __init__(self, harm, utility, uncertainty, scale, agents_affected, irreversible, plan_offsets):
+        self.harm = np.asarray(harm, dtype=np.float64)
+        self.utility = np.asarray(utility, dtype=np.float64)
+        self.uncertainty = np.asarray(uncertainty, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.agents_affected = np.asarray(agents_affected)
+        self.irreversible = np.asarray(irreversible, dtype=bool)
+        self.plan_offsets = np.asarray(plan_offsets, dtype=np.int64)
+
+    @classmethod
+    def from_plans(cls, plans):
+        harm, utility, uncertainty, scale, agents, irreversible = [], [], [], [], [], []
+        offsets = [0]
+        for plan in plans:
+            for a in plan:
+                harm.append(a.harm)
+                utility.append(a.utility)
+                uncertainty.append(a.uncertainty)
+                scale.append(a.scale)
+                agents.append(a.agents_affected)
+                irreversible.append(a.entropy_class.name == "IRREVERSIBLE")  # Also gca_moral.EntropyClass
+            offsets.append(len(harm))
+        return cls(harm, utility, uncertainty, scale, agents, irreversible, offsets)
+
+    @property
+    def num_plans(self):
+        return len(self.plan_offsets) - 1
+
+    def __len__(self):
+        return self.num_plans
+
+    def moral_vectors(self):
+        """Per-action scaled magnitudes, same arithmetic as calculate_moral_vector."""
+        disutility = 1 - self.utility
+        magnitude = np.sqrt(self.harm * self.harm + disutility * disutility + self.uncertainty * self.uncertainty)
+        scaled = magnitude * self.scale * _log_agents(self.agents_affected)
+        return np.where(self.irreversible, scaled * 2, scaled)  # Penalty for irreversibility
+
+    def plan_totals(self):
+        """
+        Per-plan sums, accumulated left to right like the scalar path.
+        Plans are ordered longest first, so step j only adds to the prefix of
+        plans still longer than j: O(actions) work, and each plan sees the
+        same sequence of float additions as the scalar loop.
+        """
+        vectors = self.moral_vectors()
+        lengths = np.diff(self.plan_offsets)
+        totals = np.zeros(self.num_plans, dtype=np.float64)
+        if vectors.size == 0:
+            return totals
+
+        order = np.argsort(-lengths, kind="stable")
+        starts = self.plan_offsets[:-1][order]
+        # active[j] = number of plans with more than j actions
+        active = np.searchsorted(-lengths[order], -np.arange(lengths.max()), side="left")
+        sorted_totals = np.zeros(self.num_plans, dtype=np.float64)
+        for j, n in enumerate(active.tolist()):
+            sorted_totals[:n] += vectors[starts[:n] + j]
+        totals[order] = sorted_totals
+        return totals
+
+def evaluate_many(evaluator, plans, kernel):
+    """
+    Scores many plans in one vectorized pass for MoralKernel and
+    gca_moral.MoralCalculator; `kernel` labels the audit records.
+    `plans` is an ActionBatch or an iterable of action sequences.
+    Returns (approved, reason_codes, scores) arrays, one entry per plan;
+    reason_codes index into REASONS.
+    """
+    if isinstance(plans, ActionBatch):
+        batch, plan_list = plans, None
+    else:
+        plan_list = [tuple(plan) for plan in plans]  # Generators are read once, before the audit needs them
+        batch = ActionBatch.from_plans(plan_list)
+    scores = batch.plan_totals()
+    approved = scores < evaluator.threshold
+    reason_codes = np.where(approved, REASON_BELOW_THRESHOLD, REASON_EXCEEDS_THRESHOLD).astype(np.int8)
+    if evaluator.audit is not None:
+        for i, (ok, code, score) in enumerate(zip(approved.tolist(), reason_codes.tolist(), scores.tolist())):
+            evaluator.audit.record(plan_list[i] if plan_list is not None else None, score, evaluator.threshold,
+                                   ok, REASONS[code], kernel=kernel)
+    return approved, reason_codes, scores
 
 class MoralKernel:
-    def __init__(self):
+    def __init__(self, cache_size=1024, audit=None):
         self.threshold = 0.5  # Adjustable moral threshold
-
-    @functools.lru_cache(maxsize=1024)
-    def calculate_moral_vector(self, action):
-        # Simple geometric representation (can be expanded)
-        magnitude = math.sqrt(action.harm**2 + (1 - action.utility)**2 + action.uncertainty**2)
-        scaled_magnitude = magnitude * action.scale * math.log(action.agents_affected + 1)
-        if action.entropy_class == EntropyClass.IRREVERSIBLE:
-            scaled_magnitude *= 2  # Penalty for irreversibility
-        return scaled_magnitude
+        self.audit = audit  # Optional gca_core.audit.AuditSink
+        # Per-instance bounded cache keyed on the action only
+        self.calculate_moral_vector = ActionCache(moral_vector, cache_size)
 
     def evaluate(self, actions):
         # Renamed from evaluate_plan to evaluate to match gca_agent_final.py
-        total_moral = sum(self.calculate_moral_vector(a) for a in actions)
-        approved = total_moral < self.threshold
-        reason = "Moral vector below threshold" if approved else "Moral vector exceeds threshold"
-        return approved, reason
+        # Stops scoring at the first action that crosses the threshold
+        actions = tuple(actions)  # The audit record holds the whole plan, even from a generator
+        return self.plan_evaluator(plan=actions).feed(actions).result()
+
+    def plan_evaluator(self, plan=None):
+        """Starts an incremental evaluation for a plan that is still being produced."""
+        return PlanEvaluator(self, plan=plan)
+
+    def evaluate_many(self, plans):
+        """Vectorized evaluate() over many plans; see gca_core.moral.evaluate_many."""
+        return evaluate_many(self, plans, kernel="MoralKernel")
+
+class PlanEvaluator:
+    """
+    Scores a plan one action at a time as the planner produces it.
+    Moral vectors are non-negative, so once the running total crosses the
+    threshold the plan can only stay rejected: `add` returns False and the
+    caller should stop generating or executing the rest of the plan.
+    """
+    def __init__(self, kernel, plan=None):
+        self.kernel = kernel
+        self.total = 0.0
+        self.steps = 0
+        self.rejected = False
+        # Actions are only retained when they will be written to the audit trail;
+        # a plan known up front is sliced to the scored prefix instead
+        self.plan = plan
+        self.actions = [] if kernel.audit is not None and plan is None else None
+        self._audited = False
+
+    @property
+    def approved(self):
+        return not self.rejected
+
+    def add(self, action):
+        """Adds one action; returns False once the plan is rejected."""
+        if self.rejected:
+            return False
+        self.total += self.kernel.calculate_moral_vector(action)
+        self.steps += 1
+        if self.actions is not None:
+            self.actions.append(action)
+        if not self.total < self.kernel.threshold:
+            self.rejected = True
+        return not self.rejected
+
+    def feed(self, actions):
+        """Consumes actions lazily, stopping at the first rejection."""
+        for action in actions:
+            if not self.add(action):
+                break
+        return self
+
+    def result(self):
+        """(approved, reason) for the actions seen so far."""
+        reason = REASONS[REASON_BELOW_THRESHOLD] if self.approved else REASONS[REASON_EXCEEDS_THRESHOLD]
+        if self.kernel.audit is not None and not self._audited:
+            # One audit record per plan decision
+            self._audited = True
+            # An early rejection scores only a prefix; the record must match its total
+            actions = self.plan[:self.steps] if self.plan is not None else self.actions
+            self.kernel.audit.record(actions, self.total, self.kernel.threshold, self.approved, reason)
+        return self.approved, reason
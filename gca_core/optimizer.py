@@ -10,6 +10,8 @@ import torch.nn.functional as F
 import json
 import numpy as np
 
+from gca_core.telemetry import log, span
+
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 
 class GCAOptimizer:
@@ -18,14 +20,20 @@ class GCAOptimizer:
         self.mem = memory
         self.layer_idx = 6
 
-    def get_prompt_geometry(self, prompt):
-        """Projects the user prompt onto the Universal Basis."""
-        inputs = self.gb.tokenizer(prompt, return_tensors="pt").to(DEVICE)
+    def get_prompt_geometry(self, prompt, return_state=False):
+        """
+        Projects the user prompt onto the Universal Basis.
+        With return_state=True also returns the pooled layer-6 state (1, 768)
+        for the moral probe.
+        """
+        with span("tokenize"):
+            inputs = self.gb.tokenizer(prompt, return_tensors="pt").to(DEVICE)
 
         captured = []
         def hook(module, input, output):
             # Mean pool
-            captured.append(torch.mean(output[0], dim=1).detach())
+            hidden_states = output[0] if isinstance(output, tuple) else output
+            captured.append(torch.mean(hidden_states, dim=1).detach())
 
         handle = self.gb.model.transformer.h[self.layer_idx].register_forward_hook(hook)
 
@@ -37,16 +45,24 @@ class GCAOptimizer:
         # Project: State (768) @ Basis_T (768, 16) -> (16)
         state = captured[0]
         coeffs = torch.matmul(state, self.mem.basis.T)
-        return torch.nn.functional.normalize(coeffs, p=2, dim=1) # Normalize
+        coeffs = torch.nn.functional.normalize(coeffs, p=2, dim=1) # Normalize
+        if return_state:
+            return coeffs, state
+        return coeffs
 
     def route(self, prompt):
         """
         Finds the skill with the highest geometric overlap with the prompt.
         """
         # Renamed from route_intent to route to match gca_agent_final.py
-        prompt_vec = self.get_prompt_geometry(prompt).squeeze() # (16)
+        with span("route"):
+            return self.route_geometry(prompt, self.get_prompt_geometry(prompt))
 
-        print(f"[🧭] Routing Intent for: '{prompt[:30]}...'")
+    def route_geometry(self, prompt, geometry):
+        """Routes a prompt whose geometry is already known (no forward pass)."""
+        prompt_vec = geometry.squeeze() # (16)
+
+        log.debug("[🧭] Routing Intent for: '%s...'", prompt[:30])
 
         # Optimized Vector Search
         if self.mem.skill_matrix is not None and self.mem.skill_matrix.size(0) > 0:
@@ -59,10 +75,10 @@ class GCAOptimizer:
 
             if best_score > 0.3:
                 best_skill = self.mem.skill_names[best_idx.item()]
-                print(f"    -> Matched '{best_skill}' (Confidence: {best_score:.2f})")
+                log.debug("    -> Matched '%s' (Confidence: %.2f)", best_skill, best_score)
                 return best_skill
 
-        print("    -> No clear skill match found.")
+        log.debug("    -> No clear skill match found.")
         return "NONE"
 
     def auto_tune(self, prompt, skill_vec):
@@ -71,12 +87,17 @@ class GCAOptimizer:
         Stops before the model starts looping (Repetition Check).
         """
         # Renamed from auto_tune_strength to auto_tune to match gca_agent_final.py
-        print(f"[🔧] Auto-Tuning Strength...")
+        with span("tune"):
+            return self._auto_tune(prompt, skill_vec)
+
+    def _auto_tune(self, prompt, skill_vec):
+        log.debug("[🔧] Auto-Tuning Strength...")
         candidates = [2.0, 4.0, 6.0, 8.0]
         batch_size = len(candidates)
         best_strength = 2.0
 
-        inputs = self.gb.tokenizer(prompt, return_tensors="pt").to(DEVICE)
+        with span("tokenize"):
+            inputs = self.gb.tokenizer(prompt, return_tensors="pt").to(DEVICE)
         skill_vec = skill_vec.to(DEVICE)
 
         # Batch inputs
@@ -96,7 +117,8 @@ class GCAOptimizer:
         def steer_hook(module, input, output):
             # output[0] shape: (batch_size, seq_len, hidden_size)
             # Use in-place addition on the tensor reference to avoid tuple assignment error
-            output[0].add_(steering_tensor)
+            hidden_states = output[0] if isinstance(output, tuple) else output
+            hidden_states.add_(steering_tensor)
             return output
 
         handle = self.gb.model.transformer.h[self.layer_idx].register_forward_hook(steer_hook)
@@ -124,13 +146,13 @@ class GCAOptimizer:
             total_tokens = len(tokens)
             ratio = unique_tokens / (total_tokens + 1e-5)
 
-            print(f"    -> Str {strength}: Diversity Ratio {ratio:.2f}")
+            log.debug("    -> Str %s: Diversity Ratio %.2f", strength, ratio)
 
             if ratio < 0.6: # Looping detected!
-                print(f"       ⚠️ Looping detected. Backing off.")
+                log.debug("       ⚠️ Looping detected. Backing off.")
                 break # Stop, use previous strength
 
             best_strength = strength
 
-        print(f"    -> Optimal Strength: {best_strength}")
+        log.debug("    -> Optimal Strength: %s", best_strength)
         return best_strength
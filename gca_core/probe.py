@@ -0,0 +1,74 @@
+"""
+GCA Moral Probe
+---------------
+Reads harm and irreversibility straight out of the layer-6 pooled state
+that geometric routing already computes, so the moral input costs one
+extra (probes, hidden) matmul and no extra forward pass.
+
+Each probe is a learned direction in hidden space (difference of class
+means, see fit_direction), stored in PROBE_PATH next to the skill registry.
+"""
+
+import json
+import os
+
+import torch
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+PROBE_PATH = "moral_probes.json"
+PROBE_NAMES = ("harm", "irreversibility")
+
+def fit_direction(positive_states, negative_states):
+    """
+    Learns a probe from pooled states of positive and negative examples.
+    The logit is +4 at the positive class mean and -4 at the negative one.
+    """
+    mu_pos = positive_states.mean(dim=0)
+    mu_neg = negative_states.mean(dim=0)
+    direction = torch.nn.functional.normalize(mu_pos - mu_neg, p=2, dim=0)
+    proj_pos = torch.dot(mu_pos, direction).item()
+    proj_neg = torch.dot(mu_neg, direction).item()
+    half_gap = max((proj_pos - proj_neg) / 2, 1e-6)
+    return {
+        "direction": direction.tolist(),
+        "bias": (proj_pos + proj_neg) / 2,
+        "scale": 4.0 / half_gap,
+        "layer": 6,
+    }
+
+def save_direction(name, probe, path=PROBE_PATH):
+    probes = {}
+    if os.path.exists(path):
+        with open(path, 'r') as f:
+            probes = json.load(f)
+    probes[name] = probe
+    with open(path, 'w') as f:
+        json.dump(probes, f, indent=2)
+
+class MoralProbe:
+    def __init__(self, probes, device=DEVICE):
+        self.names = list(probes.keys())
+        self.directions = torch.tensor([probes[n]["direction"] for n in self.names], device=device)  # (P, hidden)
+        self.bias = torch.tensor([probes[n]["bias"] for n in self.names], device=device)
+        self.scale = torch.tensor([probes[n]["scale"] for n in self.names], device=device)
+
+    @classmethod
+    def load(cls, path=PROBE_PATH, device=DEVICE):
+        """Returns None when no probes have been learned yet."""
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r') as f:
+            probes = json.load(f)
+        if not all(name in probes for name in PROBE_NAMES):
+            return None
+        return cls(probes, device=device)
+
+    def score(self, states):
+        """
+        (batch, hidden) pooled states -> {probe name: (batch,) scores in [0, 1]}.
+        All probes are scored in one matmul.
+        """
+        states = states.to(self.directions.dtype)
+        logits = (torch.matmul(states, self.directions.T) - self.bias) * self.scale  # (batch, P)
+        scores = torch.sigmoid(logits)
+        return {name: scores[:, i] for i, name in enumerate(self.names)}
@@ -0,0 +1,146 @@
+"""
+GCA Profiling
+-------------
+Opt-in torch.profiler capture around single requests, to see whether a
+slow one spent its time in the steering hooks, generate() or tokenization.
+1. @profiled("name") wraps a request entry point (GCAPilotV2.execute,
+   GlassBox.generate_steered, GCASchool.learn_skill). It profiles a sampled
+   fraction of calls (GCA_PROFILE=0.05), every call (GCA_PROFILE=1), or
+   the calls made inside PROFILER.forced().
+2. Attribution: operators come from torch.profiler; hooks run under
+   hook_scope("gca::...") and telemetry spans (tokenize, route, generate,
+   ...) show up as gca::<stage> ranges in the same trace.
+3. Each capture saves a Chrome trace (chrome://tracing, Perfetto) to
+   GCA_PROFILE_DIR, keeps only the newest GCA_PROFILE_KEEP, and logs a
+   top-N operator table.
+"""
+
+import contextlib
+import contextvars
+import functools
+import glob
+import os
+import random
+import threading
+import time
+
+import torch
+from torch.profiler import ProfilerActivity, profile, record_function
+
+from gca_core.telemetry import log
+
+PROFILE_DIR = "profiles"
+TRACE_SUFFIX = ".trace.json"
+
+_capturing = contextvars.ContextVar("gca_profile_capturing", default=False)
+_forced = contextvars.ContextVar("gca_profile_forced", default=False)
+
+def hook_scope(name):
+    """record_function(name) while a profiler is recording, else a no-op (hooks run per layer call)."""
+    if torch.autograd._profiler_enabled():
+        return record_function(name)
+    return contextlib.nullcontext()
+
+def rotate_traces(trace_dir, keep):
+    """Deletes all but the `keep` newest trace files; returns the deleted paths."""
+    traces = sorted(glob.glob(os.path.join(trace_dir, "*" + TRACE_SUFFIX)), key=os.path.getmtime)
+    stale = traces[:-keep] if keep > 0 else traces
+    for path in stale:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    return stale
+
+class RequestProfiler:
+    def __init__(self, sample_rate=0.0, trace_dir=PROFILE_DIR, keep=20, top_n=15,
+                 sort_by="self_cpu_time_total", record_shapes=False, with_stack=False):
+        self.sample_rate = sample_rate
+        self.trace_dir = trace_dir
+        self.keep = keep
+        self.top_n = top_n
+        self.sort_by = sort_by
+        self.record_shapes = record_shapes
+        self.with_stack = with_stack
+        self._busy = threading.Lock()  # The profiler is process-wide: one capture at a time
+        self.captures = 0
+        self.last = None  # {"name", "trace", "seconds", "top"} of the latest capture
+
+    @classmethod
+    def from_env(cls):
+        return cls(sample_rate=float(os.environ.get("GCA_PROFILE", "0") or 0),
+                   trace_dir=os.environ.get("GCA_PROFILE_DIR", PROFILE_DIR),
+                   keep=int(os.environ.get("GCA_PROFILE_KEEP", "20")),
+                   top_n=int(os.environ.get("GCA_PROFILE_TOP", "15")))
+
+    @contextlib.contextmanager
+    def forced(self):
+        """Profiles every @profiled call made inside the block."""
+        token = _forced.set(True)
+        try:
+            yield
+        finally:
+            _forced.reset(token)
+
+    def _sampled(self):
+        if _forced.get():
+            return True
+        return self.sample_rate > 0 and (self.sample_rate >= 1 or random.random() < self.sample_rate)
+
+    @contextlib.contextmanager
+    def capture(self, name):
+        """Profiles the block if this call is sampled; yields the profile or None."""
+        if _capturing.get():
+            # Nested request (e.g. generate_steered inside a profiled execute): just label it
+            with record_function(f"gca::{name}"):
+                yield None
+            return
+        if not self._sampled() or not self._busy.acquire(blocking=False):
+            yield None
+            return
+
+        activities = [ProfilerActivity.CPU]
+        if torch.cuda.is_available():
+            activities.append(ProfilerActivity.CUDA)
+        token = _capturing.set(True)
+        start = time.perf_counter()
+        try:
+            with profile(activities=activities, record_shapes=self.record_shapes,
+                         with_stack=self.with_stack) as prof:
+                with record_function(f"gca::{name}"):
+                    yield prof
+        finally:
+            _capturing.reset(token)
+            self._busy.release()
+        self._report(name, prof, time.perf_counter() - start)
+
+    def _report(self, name, prof, seconds):
+        os.makedirs(self.trace_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        path = os.path.join(self.trace_dir, f"{name}-{stamp}-{os.getpid()}-{self.captures}{TRACE_SUFFIX}")
+        prof.export_chrome_trace(path)
+        rotate_traces(self.trace_dir, self.keep)
+        self.captures += 1
+
+        events = sorted(prof.key_averages(), key=lambda e: e.self_cpu_time_total, reverse=True)
+        self.last = {
+            "name": name,
+            "trace": path,
+            "seconds": seconds,
+            "top": [{"op": e.key, "count": e.count, "self_cpu_us": e.self_cpu_time_total,
+                     "cpu_us": e.cpu_time_total} for e in events[:self.top_n]],
+        }
+        log.info("[🔬] Profiled '%s' in %.3fs -> %s\n%s", name, seconds, path,
+                 prof.key_averages().table(sort_by=self.sort_by, row_limit=self.top_n))
+
+PROFILER = RequestProfiler.from_env()
+
+def profiled(name):
+    """Decorator: runs the function under PROFILER.capture(name)."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with PROFILER.capture(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -0,0 +1,178 @@
+"""
+GCA Cascade Router
+------------------
+Tiered intent routing: cheap, high-precision rules first, geometry second.
+1. Rule tier: precompiled regexes over the lowercased prompt. A prompt is
+   decided only if every matching rule agrees on one intent; no match or
+   a conflict falls through.
+2. Geometric tier: the optimizer's forward-pass router, run only on the
+   prompts the rules left undecided (batched).
+3. Per-tier hit counts and timings, and learn_rules() mines new keyword
+   rules from what the geometric tier decided (in memory or a JSONL log).
+"""
+
+import collections
+import json
+import os
+import re
+import time
+
+ROUTER_RULES_PATH = "router_rules.json"
+
+# (intent, pattern). Word boundaries keep "decode" from meaning CODE.
+DEFAULT_RULES = (
+    ("SQL", r"\bselect\b[\s\S]*\bfrom\b"),
+    ("SQL", r"\b(?:sql|database)\b"),
+    ("CODE", r"```|\b(?:def|function|python|script)\b"),
+    ("POETRY", r"\b(?:poem|verse|rhyme|sonnet)\b"),
+    ("MATH", r"\b(?:solve|equation|calculate)\b"),
+)
+
+_WORD = re.compile(r"\b[a-z][a-z0-9_]{2,}\b")
+_STOPWORDS = frozenset(
+    "the and for are but not you all any can had her was one our out has him his how its may new now "
+    "see two who did get let put say she too use that with have this will your from they been were "
+    "what when which their there about would these other into some than then them could need want "
+    "please".split())
+
+def load_log(path):
+    """(prompt, intent) pairs from a JSONL routing log."""
+    pairs = []
+    with open(path, 'r') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                pairs.append((record["prompt"], record["intent"]))
+    return pairs
+
+class CascadeRouter:
+    def __init__(self, optimizer, rules=DEFAULT_RULES, intents=None, log_size=10000, log_path=None):
+        """
+        `optimizer` provides route_intent(prompts) and route_geometry(prompts,
+        geometry), as gca_optimizer.GCAOptimizer does. `intents`, if given,
+        drops rules for intents the caller cannot steer.
+        """
+        self.optimizer = optimizer
+        self.intents = set(intents) if intents is not None else None
+        self.rules = []
+        self.add_rules(rules)
+
+        # Geometric decisions, the raw material for learn_rules
+        self.log = collections.deque(maxlen=log_size)
+        self.log_path = log_path
+
+        self.tier_hits = {"rules": 0, "geometric": 0}
+        self.tier_seconds = {"rules": 0.0, "geometric": 0.0}
+        self.conflicts = 0
+        self.rule_hits = collections.Counter()
+
+    def add_rules(self, rules):
+        for intent, pattern in rules:
+            if self.intents is not None and intent not in self.intents:
+                continue
+            self.rules.append((intent, pattern, re.compile(pattern)))
+
+    def match(self, prompt):
+        """The rule tier alone: an intent, or None if undecided."""
+        p = prompt.lower()
+        decided = None
+        matched = []
+        for intent, pattern, regex in self.rules:
+            if regex.search(p):
+                if decided is not None and decided != intent:
+                    self.conflicts += 1
+                    return None
+                decided = intent
+                matched.append(pattern)
+        self.rule_hits.update(matched)
+        return decided
+
+    def route(self, prompts, geometry=None):
+        """
+        Intents for a list of prompts. `geometry` (one row per prompt) is
+        used for the fallthrough rows if the caller already computed it.
+        """
+        start = time.perf_counter()
+        intents = [self.match(p) for p in prompts]
+        self.tier_seconds["rules"] += time.perf_counter() - start
+
+        pending = [i for i, intent in enumerate(intents) if intent is None]
+        self.tier_hits["rules"] += len(prompts) - len(pending)
+        if not pending:
+            return intents
+
+        start = time.perf_counter()
+        subset = [prompts[i] for i in pending]
+        if geometry is not None:
+            routed = self.optimizer.route_geometry(subset, geometry[pending])
+        else:
+            routed = self.optimizer.route_intent(subset)
+        self.tier_seconds["geometric"] += time.perf_counter() - start
+        self.tier_hits["geometric"] += len(pending)
+
+        for i, intent in zip(pending, routed):
+            intents[i] = intent
+        self._record(subset, routed)
+        return intents
+
+    def _record(self, prompts, intents):
+        self.log.extend(zip(prompts, intents))
+        if self.log_path:
+            with open(self.log_path, 'a') as f:
+                f.write("".join(json.dumps({"prompt": p, "intent": i}) + "\n" for p, i in zip(prompts, intents)))
+
+    def learn_rules(self, pairs=None, min_support=5, min_precision=0.95, max_rules=20, apply=True):
+        """
+        Mines keyword rules from (prompt, intent) pairs (default: this
+        router's geometric log). A word becomes a rule when it appears in at
+        least `min_support` prompts and at least `min_precision` of them went
+        to the same non-NONE intent. Returns the new (intent, pattern) rules.
+        """
+        pairs = list(self.log if pairs is None else pairs)
+        by_word = collections.defaultdict(collections.Counter)
+        for prompt, intent in pairs:
+            for word in set(_WORD.findall(prompt.lower())) - _STOPWORDS:
+                by_word[word][intent] += 1
+
+        existing = {pattern for _, pattern, _ in self.rules}
+        candidates = []
+        for word, counts in by_word.items():
+            support = sum(counts.values())
+            intent, hits = counts.most_common(1)[0]
+            if intent == "NONE" or support < min_support or hits / support < min_precision:
+                continue
+            if self.intents is not None and intent not in self.intents:
+                continue
+            pattern = rf"\b{re.escape(word)}\b"
+            if pattern not in existing:
+                candidates.append((hits, intent, pattern))
+
+        candidates.sort(key=lambda c: -c[0])
+        learned = [(intent, pattern) for _, intent, pattern in candidates[:max_rules]]
+        if apply:
+            self.add_rules(learned)
+        return learned
+
+    def save_rules(self, path=ROUTER_RULES_PATH):
+        with open(path, 'w') as f:
+            json.dump([{"intent": intent, "pattern": pattern} for intent, pattern, _ in self.rules], f, indent=2)
+
+    @staticmethod
+    def load_rules(path=ROUTER_RULES_PATH):
+        """Saved rules, or DEFAULT_RULES if none were saved yet."""
+        if not os.path.exists(path):
+            return DEFAULT_RULES
+        with open(path, 'r') as f:
+            return [(r["intent"], r["pattern"]) for r in json.load(f)]
+
+    def stats(self):
+        total = sum(self.tier_hits.values())
+        return {
+            "total": total,
+            "tier_hits": dict(self.tier_hits),
+            "tier_hit_rate": {tier: n / total if total else 0.0 for tier, n in self.tier_hits.items()},
+            "tier_seconds": dict(self.tier_seconds),
+            "conflicts": self.conflicts,
+            "rule_hits": dict(self.rule_hits),
+            "rules": len(self.rules),
+        }
@@ -0,0 +1,184 @@
+"""
+GCA Sandbox Pool
+----------------
+Warm, resource-limited Python interpreters for ToolBox.execute_python.
+1. Workers are spawned ahead of time with rlimits (CPU, memory, open files)
+   and a fixed working directory.
+2. Code is sent over a pipe, so a call pays no interpreter startup.
+3. A call that exceeds the timeout kills its worker; workers are also
+   recycled after `max_runs` calls, a crash, or a snippet that patched a
+   loaded module, and replaced right away.
+4. Snippets share a warm interpreter: the worker restores builtins, cwd,
+   sys.path, os.environ and sys.modules after each one, but state hidden in
+   C extensions or class attributes can leak between calls until the
+   worker is recycled. Keep `max_runs` low for untrusted code.
+"""
+
+import json
+import os
+import queue
+import select
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sandbox_worker.py")
+
+class SandboxTimeout(Exception):
+    pass
+
+class SandboxCrash(Exception):
+    pass
+
+class SandboxWorker:
+    def __init__(self, python, workdir, cpu_seconds, cpu_total, memory_bytes, max_fds):
+        def limit():
+            # Runs in the child before exec
+            if resource is None:
+                return
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_total, cpu_total))
+            if memory_bytes:
+                resource.setrlimit(resource.RLIMIT_AS, (memory_bytes, memory_bytes))
+            if max_fds:
+                resource.setrlimit(resource.RLIMIT_NOFILE, (max_fds, max_fds))
+
+        self.proc = subprocess.Popen(
+            [python, "-I", WORKER_PATH, str(cpu_seconds)],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=workdir,
+            preexec_fn=limit if os.name == "posix" else None,
+        )
+        self.runs = 0
+        self.dirty = False  # Set when the worker could not undo a snippet's side effects
+
+    @property
+    def alive(self):
+        return self.proc.poll() is None
+
+    def _read(self, n, deadline):
+        fd = self.proc.stdout.fileno()
+        data = b""
+        while len(data) < n:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise SandboxTimeout()
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                raise SandboxTimeout()
+            chunk = os.read(fd, n - len(data))
+            if not chunk:
+                raise SandboxCrash(f"worker exited with code {self.proc.wait()}")
+            data += chunk
+        return data
+
+    def run(self, code, timeout):
+        deadline = time.monotonic() + timeout
+        request = json.dumps({"code": code}).encode("utf-8")
+        self.runs += 1
+        try:
+            self.proc.stdin.write(struct.pack(">I", len(request)) + request)
+            self.proc.stdin.flush()
+        except (BrokenPipeError, OSError) as e:
+            raise SandboxCrash(str(e))
+        (length,) = struct.unpack(">I", self._read(4, deadline))
+        reply = json.loads(self._read(length, deadline))
+        self.dirty = reply["recycle"]
+        return reply["output"]
+
+    def kill(self):
+        if self.alive:
+            self.proc.kill()
+        self.proc.wait()
+        for pipe in (self.proc.stdin, self.proc.stdout):
+            try:
+                pipe.close()
+            except OSError:
+                pass
+
+class SandboxPool:
+    def __init__(self, size=2, max_runs=20, timeout=5, cpu_seconds=5,
+                 memory_bytes=512 * 1024 * 1024, max_fds=64, workdir=None, python="python3"):
+        if os.name != "posix":
+            raise RuntimeError("SandboxPool requires a POSIX system (rlimits, select on pipes).")
+        self.size = size
+        self.max_runs = max_runs
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_bytes = memory_bytes
+        self.max_fds = max_fds
+        self.python = python
+        self.workdir = workdir or tempfile.mkdtemp(prefix="gca-sandbox-")
+        os.makedirs(self.workdir, exist_ok=True)
+
+        self.recycled = 0
+        self.timeouts = 0
+        self.crashes = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        self._idle = queue.Queue()
+        for _ in range(size):
+            self._idle.put(self._spawn())
+
+    def _spawn(self):
+        # Hard CPU cap over the worker's whole life; the worker lowers its
+        # soft limit to `cpu_seconds` per run
+        cpu_total = int(self.cpu_seconds * (self.max_runs + 1)) + 1
+        return SandboxWorker(self.python, self.workdir, self.cpu_seconds, cpu_total,
+                             self.memory_bytes, self.max_fds)
+
+    def execute(self, code):
+        """Runs `code` in a warm worker; same return contract as ToolBox.execute_python."""
+        if self._closed:
+            return "Execution Error: sandbox pool is closed"
+        worker = self._idle.get()
+        retire = False
+        try:
+            return worker.run(code, self.timeout)
+        except SandboxTimeout:
+            retire = True
+            with self._lock:
+                self.timeouts += 1
+            return f"Execution Error: timed out after {self.timeout} seconds"
+        except SandboxCrash as e:
+            retire = True
+            with self._lock:
+                self.crashes += 1
+            return f"Execution Error: sandbox worker crashed ({e})"
+        finally:
+            if retire or worker.dirty or worker.runs >= self.max_runs or not worker.alive:
+                worker.kill()
+                with self._lock:
+                    self.recycled += 1
+                # Popen returns before the new interpreter finishes starting
+                worker = self._spawn()
+            if self._closed:
+                worker.kill()
+            else:
+                self._idle.put(worker)
+
+    def close(self):
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self):
+        return {"size": self.size, "recycled": self.recycled, "timeouts": self.timeouts, "crashes": self.crashes}
@@ -0,0 +1,130 @@
+"""
+Sandbox worker loop, run as a standalone script by gca_core.sandbox.SandboxPool.
+
+Protocol (over the original stdin/stdout pipes): each message is a 4-byte
+big-endian length followed by UTF-8 JSON. Requests are {"code": str};
+replies are {"output": stdout + stderr, "recycle": bool}, with the output
+as `python3 -c` would print them.
+
+Isolation between snippets: each one gets fresh globals and its own copy
+of the builtins namespace. Afterwards the worker restores the builtins
+module, cwd, sys.path, os.environ and sys.modules (modules the snippet
+imported are dropped). Attributes patched on modules that were already
+loaded cannot be undone reliably, so the worker asks to be recycled.
+"""
+
+import builtins
+import io
+import json
+import os
+import struct
+import sys
+import traceback
+
+try:
+    import resource
+except ImportError:  # Not POSIX: no per-run CPU budget
+    resource = None
+
+def _read_exact(f, n):
+    data = b""
+    while len(data) < n:
+        chunk = f.read(n - len(data))
+        if not chunk:
+            return None
+        data += chunk
+    return data
+
+def _set_cpu_budget(seconds):
+    # Soft limit = CPU used so far + this run's budget (SIGXCPU past it)
+    if resource is None or seconds <= 0:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = int(usage.ru_utime + usage.ru_stime) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    soft = used + int(seconds)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+class _Baseline:
+    """Interpreter state captured once at startup and restored after every snippet."""
+    def __init__(self):
+        self.cwd = os.getcwd()
+        self.path = list(sys.path)
+        self.environ = dict(os.environ)
+        self.builtins = dict(vars(builtins))
+        self.modules = dict(sys.modules)
+        self.namespaces = {name: dict(vars(mod)) for name, mod in self.modules.items()
+                           if name not in ("sys", "builtins") and hasattr(mod, "__dict__")}
+
+    def restore(self):
+        """Undoes the snippet's side effects; returns True if the worker should be recycled."""
+        namespace = vars(builtins)
+        if namespace != self.builtins:
+            namespace.clear()  # No builtin lookups until the update below
+            namespace.update(self.builtins)
+        for name in set(sys.modules) - set(self.modules):
+            del sys.modules[name]
+        for name, mod in self.modules.items():
+            if sys.modules.get(name) is not mod:
+                sys.modules[name] = mod
+        sys.path[:] = self.path
+        if os.environ != self.environ:
+            os.environ.clear()
+            os.environ.update(self.environ)
+        try:
+            os.chdir(self.cwd)
+        except OSError:
+            return True
+        return any(_patched(vars(self.modules[name]), namespace) for name, namespace in self.namespaces.items())
+
+def _patched(current, baseline):
+    # Identity, not equality: a patched function can compare equal to nothing else anyway
+    if len(current) != len(baseline):
+        return True
+    for key, value in baseline.items():
+        if current.get(key, baseline) is not value:
+            return True
+    return False
+
+def _run(code):
+    out, err = io.StringIO(), io.StringIO()
+    sys.stdout, sys.stderr = out, err
+    try:
+        exec(compile(code, "<string>", "exec"), {"__name__": "__main__", "__builtins__": dict(vars(builtins))})
+    except SystemExit as e:
+        if e.code is not None and not isinstance(e.code, int):
+            print(e.code, file=err)
+    except BaseException as e:
+        # Drop this frame so the traceback reads like `python3 -c`
+        traceback.print_exception(type(e), e, e.__traceback__.tb_next, file=err)
+    finally:
+        sys.stdout, sys.stderr = sys.__stdout__, sys.__stderr__
+    return out.getvalue() + err.getvalue()
+
+def main():
+    cpu_seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 0
+
+    # Keep private copies of the protocol pipes, then point fds 0/1 at
+    # /dev/null so snippets writing to raw fds cannot corrupt the protocol.
+    proto_in = os.fdopen(os.dup(0), "rb", buffering=0)
+    proto_out = os.fdopen(os.dup(1), "wb", buffering=0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    baseline = _Baseline()
+
+    while True:
+        header = _read_exact(proto_in, 4)
+        if header is None:
+            return
+        (length,) = struct.unpack(">I", header)
+        request = json.loads(_read_exact(proto_in, length))
+        _set_cpu_budget(cpu_seconds)
+        output = _run(request["code"])
+        reply = json.dumps({"output": output, "recycle": baseline.restore()}).encode("utf-8")
+        proto_out.write(struct.pack(">I", len(reply)) + reply)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+GCA Session Store
+-----------------
+Keeps each conversation's KV cache (past_key_values) between turns, so a
+turn only prefills the tokens it appends instead of the whole history.
+1. A session holds its token ids and a cache covering all but the last one.
+2. The cache is only valid for the steering it was computed under: the
+   hook also shifts layer-6 states of cached positions, so a turn with a
+   different skill vector or strength drops the cache and re-prefills.
+3. LRU under a memory budget: past the device budget, the least recently
+   used caches spill to host memory; past the host budget they are
+   dropped (the ids stay, so the next turn just re-prefills).
+"""
+
+import collections
+import hashlib
+import threading
+
+import torch
+
+DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
+
+def _check_layout(cache):
+    # transformers >= 4.56: cache.layers[i].keys / .values; older DynamicCache: key_cache[i] / value_cache[i]
+    if not hasattr(cache, "layers") and not hasattr(cache, "key_cache"):
+        raise TypeError(f"Unsupported KV cache type: {type(cache).__name__}")
+
+def _kv_tensors(cache):
+    """(keys, values) per populated layer."""
+    _check_layout(cache)
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers if getattr(layer, "keys", None) is not None]
+    return [(k, v) for k, v in zip(cache.key_cache, cache.value_cache) if torch.is_tensor(k)]
+
+def cache_bytes(cache):
+    if cache is None:
+        return 0
+    return sum(keys.nbytes + values.nbytes for keys, values in _kv_tensors(cache))
+
+def move_cache(cache, device):
+    _check_layout(cache)
+    if hasattr(cache, "layers"):
+        for layer in cache.layers:
+            if getattr(layer, "keys", None) is not None:
+                layer.keys = layer.keys.to(device, non_blocking=True)
+                layer.values = layer.values.to(device, non_blocking=True)
+                if hasattr(layer, "device"):
+                    layer.device = torch.device(device)
+        return cache
+    for tensors in (cache.key_cache, cache.value_cache):
+        for i, tensor in enumerate(tensors):
+            if torch.is_tensor(tensor):  # Unfilled layers may hold [] placeholders
+                tensors[i] = tensor.to(device, non_blocking=True)
+    return cache
+
+def steering_key(steering_vec, strength):
+    """Identity of a steering state; equal keys mean cached KV is reusable."""
+    if steering_vec is None or strength == 0:
+        return None
+    data = steering_vec.detach().to("cpu", torch.float32).contiguous().numpy().tobytes()
+    return (hashlib.blake2b(data, digest_size=16).hexdigest(), float(strength))
+
+class KVSession:
+    __slots__ = ("id", "input_ids", "cache", "steering", "location", "nbytes", "turns", "reused_tokens",
+                 "prefilled_tokens")
+
+    def __init__(self, session_id):
+        self.id = session_id
+        self.input_ids = None  # (1, T) every token so far
+        self.cache = None      # KV for input_ids[:, :-1]
+        self.steering = None
+        self.location = None   # "device" | "host" | None
+        self.nbytes = 0
+        self.turns = 0
+        self.reused_tokens = 0
+        self.prefilled_tokens = 0
+
+    @property
+    def cached_tokens(self):
+        return self.cache.get_seq_length() if self.cache is not None else 0
+
+class SessionStore:
+    def __init__(self, device_budget=512 * 1024 * 1024, host_budget=2 * 1024 * 1024 * 1024,
+                 device=DEVICE, max_sessions=1024):
+        self.device_budget = device_budget
+        self.host_budget = host_budget
+        self.device = device
+        self.max_sessions = max_sessions
+        self._sessions = collections.OrderedDict()  # LRU order, most recent last
+        self._lock = threading.RLock()
+
+        self.spills = 0
+        self.evictions = 0
+        self.steering_resets = 0
+        self.truncations = 0
+
+    def get(self, session_id):
+        """The session (created on first use), marked most recently used."""
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = KVSession(session_id)
+                self._sessions[session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evictions += 1
+            self._sessions.move_to_end(session_id)
+            return session
+
+    def checkout(self, session, steering):
+        """Cache ready on the device for a turn under `steering`, or None to prefill from scratch."""
+        with self._lock:
+            if session.cache is not None and session.steering != steering:
+                self.steering_resets += 1
+                self._drop_cache(session)
+            if session.cache is not None and session.location == "host":
+                move_cache(session.cache, self.device)
+                session.location = "device"
+            return session.cache
+
+    def checkin(self, session, input_ids, cache, steering):
+        """Stores the turn's result and enforces the budgets (LRU spill, then drop)."""
+        with self._lock:
+            session.input_ids = input_ids
+            session.cache = cache
+            session.steering = steering
+            session.location = "device" if cache is not None else None
+            session.nbytes = cache_bytes(cache)
+            session.turns += 1
+            self._sessions.move_to_end(session.id)
+            self._enforce_budget()
+
+    def reset(self, session, truncated=False):
+        """Drops the session's cache (kept ids were cut, or a turn failed midway)."""
+        with self._lock:
+            self._drop_cache(session)
+            if truncated:
+                self.truncations += 1
+
+    def drop(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def _drop_cache(self, session):
+        session.cache = None
+        session.location = None
+        session.nbytes = 0
+
+    def _usage(self, location):
+        return sum(s.nbytes for s in self._sessions.values() if s.location == location)
+
+    def _enforce_budget(self):
+        same_memory = torch.device(self.device).type == "cpu"
+        lru = list(self._sessions.values())[:-1]  # Never the session that was just used
+        device_bytes = self._usage("device")
+        host_bytes = self._usage("host")
+        for session in lru:
+            if device_bytes <= self.device_budget:
+                break
+            if session.location != "device":
+                continue
+            device_bytes -= session.nbytes
+            if same_memory:
+                # Host and device are the same memory: spilling frees nothing
+                self._drop_cache(session)
+                self.evictions += 1
+                continue
+            move_cache(session.cache, "cpu")
+            session.location = "host"
+            host_bytes += session.nbytes
+            self.spills += 1
+        for session in lru:
+            if host_bytes <= self.host_budget:
+                break
+            if session.location == "host":
+                host_bytes -= session.nbytes
+                self._drop_cache(session)
+                self.evictions += 1
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "device_bytes": self._usage("device"),
+                "host_bytes": self._usage("host"),
+                "device_budget": self.device_budget,
+                "host_budget": self.host_budget,
+                "spills": self.spills,
+                "evictions": self.evictions,
+                "steering_resets": self.steering_resets,
+                "truncations": self.truncations,
+                "reused_tokens": sum(s.reused_tokens for s in self._sessions.values()),
+                "prefilled_tokens": sum(s.prefilled_tokens for s in self._sessions.values()),
+            }
@@ -0,0 +1,174 @@
+"""
+GCA Telemetry
+-------------
+Per-stage latency instrumentation for the pipeline, in place of print tracing.
+1. span(stage) times a block into a histogram. Stages: tokenize, route,
+   tune, moral, generate, decode, tool. A span inside an open span of the
+   same stage is not counted twice (e.g. the pilot's route span around the
+   optimizer's own).
+2. Histograms export as Prometheus text (to_prometheus) or JSON (to_json)
+   with p50/p95/p99 estimates.
+3. Console output goes through the "gca" logger. GCA_LOG_LEVEL=DEBUG shows
+   the per-prompt detail, INFO (default) the headlines, OFF nothing.
+   GCA_TELEMETRY=0 turns spans into no-ops.
+"""
+
+import bisect
+import contextlib
+import contextvars
+import logging
+import math
+import os
+import sys
+import threading
+import time
+
+STAGES = ("tokenize", "route", "tune", "moral", "generate", "decode", "tool")
+
+# Seconds; the last bucket is +Inf
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+LOG_LEVELS = {"DEBUG": logging.DEBUG, "INFO": logging.INFO, "WARNING": logging.WARNING,
+              "ERROR": logging.ERROR, "OFF": logging.CRITICAL + 1}
+
+log = logging.getLogger("gca")
+
+class _StdoutHandler(logging.StreamHandler):
+    # Resolves sys.stdout on every write, so redirected or captured stdout keeps working
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+def configure_logging(level=None):
+    """Sets the "gca" logger level (name or int; default $GCA_LOG_LEVEL, else INFO)."""
+    if level is None:
+        level = os.environ.get("GCA_LOG_LEVEL", "INFO")
+    if isinstance(level, str):
+        level = LOG_LEVELS.get(level.upper(), logging.INFO)
+    if not log.handlers:
+        handler = _StdoutHandler()
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        log.addHandler(handler)
+        log.propagate = False
+    log.setLevel(level)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Estimate, interpolating linearly inside the bucket (as Prometheus does)."""
+        if self.count == 0:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(self.max, lower + (upper - lower) * (rank - seen) / n)
+            seen += n
+        return self.max
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "p50": self.quantile(0.5),
+            "p95": self.quantile(0.95),
+            "p99": self.quantile(0.99),
+        }
+
+_open_stages = contextvars.ContextVar("gca_open_stages", default=frozenset())
+
+def _profiler_range(stage):
+    # Names the stage in torch.profiler traces (gca_core.profiling) without importing torch here
+    torch = sys.modules.get("torch")
+    if torch is not None and torch.autograd._profiler_enabled():
+        return torch.profiler.record_function(f"gca::{stage}")
+    return contextlib.nullcontext()
+
+class Telemetry:
+    def __init__(self, enabled=None, buckets=BUCKETS):
+        if enabled is None:
+            enabled = os.environ.get("GCA_TELEMETRY", "1") != "0"
+        self.enabled = enabled
+        self.buckets = buckets
+        self._histograms = {}  # (stage, ((label, value), ...)) -> Histogram
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def span(self, stage, **labels):
+        """Times the block into the `stage` histogram (labels split it further, e.g. tool="SQL")."""
+        open_stages = _open_stages.get()
+        if not self.enabled or stage in open_stages:
+            yield
+            return
+        token = _open_stages.set(open_stages | {stage})
+        start = time.perf_counter()
+        try:
+            with _profiler_range(stage):
+                yield
+        finally:
+            self.observe(stage, time.perf_counter() - start, **labels)
+            _open_stages.reset(token)
+
+    def observe(self, stage, seconds, **labels):
+        key = (stage, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def histogram(self, stage, **labels):
+        return self._histograms.get((stage, tuple(sorted(labels.items()))))
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_json(self):
+        """[{"stage", "labels", "count", "sum", "mean", "max", "p50", "p95", "p99"}, ...]"""
+        with self._lock:
+            items = sorted(self._histograms.items())
+            return [dict(stage=stage, labels=dict(labels), **hist.as_dict()) for (stage, labels), hist in items]
+
+    def to_prometheus(self, name="gca_stage_seconds"):
+        """Prometheus text exposition: one histogram, labelled by stage."""
+        lines = [f"# HELP {name} Wall time per pipeline stage.", f"# TYPE {name} histogram"]
+        with self._lock:
+            items = sorted(self._histograms.items())
+            for (stage, labels), hist in items:
+                labels_text = ",".join([f'stage="{stage}"'] + [f'{k}="{v}"' for k, v in labels])
+                cumulative = 0
+                for le, n in zip(self.buckets + (math.inf,), hist.counts):
+                    cumulative += n
+                    bound = "+Inf" if le == math.inf else repr(le)
+                    lines.append(f'{name}_bucket{{{labels_text},le="{bound}"}} {cumulative}')
+                lines.append(f'{name}_sum{{{labels_text}}} {hist.sum:.6f}')
+                lines.append(f'{name}_count{{{labels_text}}} {hist.count}')
+        return "\n".join(lines) + "\n"
+
+TELEMETRY = Telemetry()
+span = TELEMETRY.span
+
+configure_logging()
@@ -0,0 +1,66 @@
+"""
+Offline test fixtures: a tiny randomly initialized GPT-2 and a word-level
+tokenizer, so tests and benchmarks run on CPU without downloading weights.
+"""
+
+import torch
+from tokenizers import Tokenizer, models, pre_tokenizers
+from transformers import GPT2Config, GPT2LMHeadModel, PreTrainedTokenizerFast
+
+EOS_TOKEN = "<|endoftext|>"
+UNK_TOKEN = "[UNK]"
+
+# Enough vocabulary to cover the demo prompts used across the repo.
+TINY_CORPUS = (
+    "select insert update delete drop from into where values set group by order "
+    "users orders sales logs employees customer names name active age item region "
+    "salary date count table database query pull all the a an to of in on for is "
+    "we need let's circle back this offline leverage our core competencies value-add "
+    "stakeholders drill down into low-hanging fruit synergize write script function "
+    "python def return print code poem sad about broken server system permanently "
+    "merge sort list solve equation math calculate once upon time weather nice today "
+    "i love programming what capital france knowledge power money actions speak "
+    "louder than words think therefore am quick brown fox jumps over lazy dog "
+    "``` ; , . ( ) * = > < ' 1 2 18 x"
+)
+
+def tiny_tokenizer():
+    """Word-level fast tokenizer with a GPT-2 style eos/pad token."""
+    words = sorted(set(TINY_CORPUS.split()))
+    vocab = {EOS_TOKEN: 0, UNK_TOKEN: 1}
+    for word in words:
+        vocab.setdefault(word, len(vocab))
+
+    backend = Tokenizer(models.WordLevel(vocab=vocab, unk_token=UNK_TOKEN))
+    backend.pre_tokenizer = pre_tokenizers.WhitespaceSplit()
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend,
+        eos_token=EOS_TOKEN,
+        unk_token=UNK_TOKEN,
+        pad_token=EOS_TOKEN,
+    )
+    return tokenizer
+
+def tiny_model(vocab_size=None, n_layer=8, n_embd=64, n_head=2, seed=0):
+    """Randomly initialized GPT-2 with enough blocks for the layer-6 hooks."""
+    torch.manual_seed(seed)
+    if vocab_size is None:
+        vocab_size = len(tiny_tokenizer())
+    config = GPT2Config(
+        vocab_size=vocab_size,
+        n_positions=256,
+        n_embd=n_embd,
+        n_layer=n_layer,
+        n_head=n_head,
+        bos_token_id=0,
+        eos_token_id=0,
+    )
+    model = GPT2LMHeadModel(config)
+    model.eval()
+    return model
+
+def tiny_basis(hidden_size=64, num_components=16, seed=0):
+    """Orthonormal (num_components, hidden_size) basis, like the Cartographer's."""
+    generator = torch.Generator().manual_seed(seed)
+    q, _ = torch.linalg.qr(torch.randn(hidden_size, num_components, generator=generator))
+    return q.T.contiguous()
@@ -0,0 +1,93 @@
+"""
+GCA Tool Result Cache
+---------------------
+Memoizes idempotent ToolBox calls (read-only SQL, file reads) within a session.
+1. Every entry stores a validation token taken *before* the call ran:
+   SQLite: (PRAGMA data_version, stat of the db and -wal files).
+   Files: (mtime_ns, size, inode).
+   A lookup recomputes the token; any difference is a miss, so a result is
+   never served after the underlying data changed.
+2. Writes made through the ToolBox also drop the affected entries eagerly.
+3. LRU bound on the number of entries (oversized results are not stored),
+   with hit/miss/stale/eviction stats.
+"""
+
+import collections
+import os
+import threading
+
+class ToolCache:
+    def __init__(self, max_entries=256, max_result_size=1024 * 1024):
+        self.max_entries = max_entries
+        self.max_result_size = max_result_size
+        self._entries = collections.OrderedDict()  # key -> (token, result)
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def get(self, key, token):
+        """Returns (True, result) if cached under the same token, else (False, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return False, None
+            if entry[0] != token:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+
+    def put(self, key, token, result):
+        if len(result) > self.max_result_size:
+            return
+        with self._lock:
+            self._entries[key] = (token, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, kind, path):
+        """Drops every entry of `kind` ("SQL" or "FILE") for `path`."""
+        path = os.path.abspath(path)
+        with self._lock:
+            doomed = [k for k in self._entries if k[0] == kind and k[1] == path]
+            for k in doomed:
+                del self._entries[k]
+            self.invalidations += len(doomed)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def file_token(path):
+    """(mtime_ns, size, inode), or None if the file does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
@@ -1,71 +1,361 @@
+import asyncio
+import contextlib
+import itertools
 import subprocess
 import os
+import re
 import sqlite3
+import threading
 from typing import Optional
 
+import numpy as np
+
+from gca_core import fileio
+from gca_core.dbpool import SQLitePool, is_read_only
+from gca_core.toolcache import ToolCache, file_token
+
+# Bounds on what query_preview hands to the model
+PREVIEW_ROWS = 20
+PREVIEW_CHARS = 2000
+
+TOOL_TIMEOUT = 5  # Seconds, per call
+
+# Tool types as returned by the agent's parse_tool_call -> async methods
+ASYNC_TOOLS = {
+    "PYTHON": "aexecute_python",
+    "SQL": "aquery_database",
+    "FILE": "afile_op",
+}
+
+# Results of these depend on more than the data, so they are never cached
+_VOLATILE_SQL = re.compile(
+    r"\b(?:random|randomblob|changes|total_changes|last_insert_rowid|current_date|current_time|current_timestamp)\b|'now'",
+    re.IGNORECASE)
+_FILE_READS = ("READ", "READ_RANGE", "TAIL")
+
+_IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+def _is_destructive(query):
+    upper = query.upper()
+    return "DROP" in upper or "DELETE" in upper
+
+def _column_array(values):
+    """One result column -> NumPy array; mixed or NULL-bearing columns stay object."""
+    types = {type(v) for v in values}
+    if types <= {int}:
+        return np.array(values, dtype=np.int64)
+    if types <= {int, float}:
+        return np.array(values, dtype=np.float64)
+    if types == {str}:
+        return np.array(values, dtype=str)
+    return np.array(values, dtype=object)
+
 class ToolBox:
-    def __init__(self):
+    def __init__(self, sandbox=None, db_readers=4, db_pragmas=None, cache_size=256, db_wal=False):
         self.unsafe_mode = False # Hard lock
-        self._db_connections = {}
+        # One SQLitePool per database path (writer + read-only readers)
+        self._db_pools = {}
+        self._db_pools_lock = threading.Lock()
+        self.db_readers = db_readers
+        self.db_pragmas = db_pragmas
+        self.db_wal = db_wal  # Opt-in: switches the database file itself to WAL
+        # Optional gca_core.sandbox.SandboxPool of warm interpreters
+        self.sandbox = sandbox
+        # Memoized read-only SQL and file reads (cache_size=0 disables)
+        self.cache = ToolCache(cache_size) if cache_size else None
 
-    def __del__(self):
-        if hasattr(self, '_db_connections'):
-            for conn in self._db_connections.values():
+    def close(self):
+        if hasattr(self, '_db_pools'):
+            for pool in self._db_pools.values():
                 try:
-                    conn.close()
+                    pool.close()
                 except Exception:
                     pass
+            self._db_pools = {}
+
+    def __del__(self):
+        self.close()
+
+    def _db_pool(self, db_path):
+        pool = self._db_pools.get(db_path)
+        if pool is None:
+            with self._db_pools_lock:
+                pool = self._db_pools.get(db_path)
+                if pool is None:
+                    pool = SQLitePool(db_path, readers=self.db_readers, pragmas=self.db_pragmas, wal=self.db_wal)
+                    self._db_pools[db_path] = pool
+        return pool
 
     def execute_python(self, code: str) -> str:
         """Executes Python code in a sandboxed subprocess."""
         # In production, use a real sandbox (e.g., Docker/Firecracker)
         # This is a basic implementation for the prototype
+        if self.sandbox is not None:
+            # Warm, rlimited worker: no interpreter startup per call
+            return self.sandbox.execute(code)
         try:
             # Dangerous! Only allowed if MoralKernel approved "REVERSIBLE" entropy
             result = subprocess.run(
                 ["python3", "-c", code],
                 capture_output=True,
                 text=True,
-                timeout=5
+                timeout=TOOL_TIMEOUT
             )
             return result.stdout + result.stderr
         except Exception as e:
             return f"Execution Error: {str(e)}"
 
-    def query_database(self, query: str, db_path="demo.db") -> str:
-        """Safe SQLite execution."""
+    def query_database(self, query: str, db_path="demo.db", max_rows: Optional[int] = None) -> str:
+        """Safe SQLite execution. With `max_rows`, reads return a bounded preview."""
         # Sanity check to prevent injection if Vector failed (belt & suspenders)
-        if "DROP" in query.upper() or "DELETE" in query.upper():
+        if _is_destructive(query):
             return "DB_ERROR: Destructive queries locked by ToolBox."
 
+        read = is_read_only(query)
+        if self.cache is not None and read and not _VOLATILE_SQL.search(query):
+            key = ("SQL", os.path.abspath(db_path), query, max_rows)
+            # Token before the query runs: a concurrent write makes the entry stale, never wrong
+            token = self._db_token(db_path)
+            hit, result = self.cache.get(key, token)
+            if hit:
+                return result
+            result = self._query_database(query, db_path, max_rows, read)
+            if not result.startswith(("DB Error", "DB_ERROR")):
+                self.cache.put(key, token, result)
+            return result
+
+        result = self._query_database(query, db_path, max_rows, read)
+        if not read and self.cache is not None:
+            self.cache.invalidate("SQL", db_path)
+        return result
+
+    def _query_database(self, query, db_path, max_rows, read):
+        if max_rows is not None and read:
+            return self.query_preview(query, db_path, max_rows=max_rows)
         try:
-            if db_path not in self._db_connections:
-                # check_same_thread=False allows reusing across threads, which is useful
-                # if the ToolBox is invoked from different contexts.
-                self._db_connections[db_path] = sqlite3.connect(db_path, check_same_thread=False)
-
-            conn = self._db_connections[db_path]
-            cursor = conn.cursor()
-            cursor.execute(query)
-            rows = cursor.fetchall()
-            conn.commit()  # To ensure DML operations persist if executed, even though original didn't explicitly commit (it closed, which rolls back uncommitted)
-            return str(rows)
+            # SELECTs run on pooled read-only connections; writes commit on the single writer
+            return str(self._db_pool(db_path).execute(query))
         except Exception as e:
-            if 'conn' in locals():
-                try:
-                    conn.rollback()
-                except Exception:
-                    pass
             return f"DB Error: {str(e)}"
 
-    def file_op(self, operation: str, path: str, content: str = "") -> str:
-        """Basic file system operations."""
-        if operation == "READ":
-            if os.path.exists(path):
+    def _db_token(self, db_path):
+        return (self._db_pool(db_path).data_version(), file_token(db_path), file_token(db_path + "-wal"))
+
+    def _check_read(self, query):
+        if _is_destructive(query):
+            raise PermissionError("Destructive queries locked by ToolBox.")
+        if not is_read_only(query):
+            raise ValueError("Streaming and pagination only run read-only queries.")
+
+    def stream_query(self, query: str, db_path="demo.db", params=(), limit: Optional[int] = None,
+                     batch_size: int = 256):
+        """
+        Lazily yields result rows, fetched `batch_size` at a time from one
+        pooled reader. The reader is returned when the stream is exhausted,
+        hits `limit`, or is closed.
+        """
+        self._check_read(query)
+        with contextlib.closing(self._db_pool(db_path).stream(query, params, batch_size)) as rows:
+            next(rows)  # Column names
+            yield from itertools.islice(rows, limit)
+
+    def query_page(self, query: str, db_path="demo.db", params=(), limit: int = 100, offset: int = 0,
+                   key: Optional[str] = None, after=None) -> dict:
+        """
+        One page of a read-only query: {"columns", "rows", "next"}.
+        Offset mode: pass next back as `offset`. Pages follow the query's own
+        order, so they are only stable across calls if it has an ORDER BY on
+        unique columns. Keyset mode (`key` = a unique result column): pass
+        next back as `after`; the page is ordered by `key` and seeks past it
+        instead of scanning the skipped rows. A repeated key would be skipped
+        at a page boundary, so one seen in the page raises ValueError.
+        """
+        self._check_read(query)
+        inner = query.strip().rstrip(";")
+        if key is not None:
+            if not _IDENTIFIER.match(key):
+                raise ValueError(f"Invalid keyset column: {key!r}")
+            sql = f"SELECT * FROM ({inner})"
+            args = tuple(params)
+            if after is not None:
+                sql += f' WHERE "{key}" > ?'
+                args += (after,)
+            sql += f' ORDER BY "{key}" LIMIT ?'
+            args += (limit + 1,)
+        else:
+            sql = f"SELECT * FROM ({inner}) LIMIT ? OFFSET ?"
+            args = tuple(params) + (limit + 1, offset)
+
+        with self._db_pool(db_path).read_connection() as conn:
+            cursor = conn.execute(sql, args)
+            columns = [d[0] for d in cursor.description]
+            rows = cursor.fetchall()  # At most limit + 1
+            cursor.close()
+
+        if key is not None:
+            k = columns.index(key)
+            if any(a[k] == b[k] for a, b in zip(rows, rows[1:])):
+                raise ValueError(f"Keyset column {key!r} is not unique; page by a unique column or by offset")
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        next_cursor = None
+        if more:
+            next_cursor = rows[-1][columns.index(key)] if key is not None else offset + limit
+        return {"columns": columns, "rows": rows, "next": next_cursor}
+
+    def query_preview(self, query: str, db_path="demo.db", max_rows: int = PREVIEW_ROWS,
+                      max_chars: int = PREVIEW_CHARS) -> str:
+        """Bounded string of the first rows, safe to put in the prompt."""
+        try:
+            rows = list(self.stream_query(query, db_path, limit=max_rows + 1))
+        except PermissionError as e:
+            return f"DB_ERROR: {e}"
+        except Exception as e:
+            return f"DB Error: {str(e)}"
+
+        text = str(rows[:max_rows])
+        if len(text) > max_chars:
+            text = text[:max_chars] + "..."
+        if len(rows) > max_rows:
+            text += f" (first {max_rows} rows shown; more available)"
+        return text
+
+    def query_columnar(self, query: str, db_path="demo.db", params=(), limit: Optional[int] = None,
+                       batch_size: int = 4096, arrow: bool = False):
+        """
+        Column name -> NumPy array, streamed in batches. With `arrow=True`,
+        returns a pyarrow.Table instead (requires pyarrow).
+        """
+        if arrow:
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise ImportError("query_columnar(arrow=True) requires pyarrow: pip install pyarrow")
+
+        self._check_read(query)
+        with contextlib.closing(self._db_pool(db_path).stream(query, params, batch_size)) as rows:
+            columns = next(rows)
+            values = [[] for _ in columns]
+            for row in itertools.islice(rows, limit):
+                for col, v in zip(values, row):
+                    col.append(v)
+
+        if arrow:
+            return pa.table({name: pa.array(col) for name, col in zip(columns, values)})
+        return {name: _column_array(col) for name, col in zip(columns, values)}
+
+    def file_op(self, operation: str, path: str, content: str = "", offset: int = 0,
+                length: Optional[int] = None, lines: int = 100) -> str:
+        """
+        Basic file system operations.
+        READ: whole file. READ_RANGE: `length` bytes from `offset` (mmap).
+        TAIL: last `lines` lines (mmap). WRITE: atomic replace.
+        """
+        if self.cache is not None and operation in _FILE_READS:
+            token = file_token(path)
+            if token is not None:
+                key = ("FILE", os.path.abspath(path), operation, offset, length, lines)
+                hit, result = self.cache.get(key, token)
+                if hit:
+                    return result
+                result = self._file_op(operation, path, content, offset, length, lines)
+                self.cache.put(key, token, result)
+                return result
+
+        result = self._file_op(operation, path, content, offset, length, lines)
+        if operation == "WRITE" and self.cache is not None:
+            self.cache.invalidate("FILE", path)
+        return result
+
+    def _file_op(self, operation, path, content, offset, length, lines):
+        if operation in _FILE_READS:
+            if not os.path.exists(path):
+                return "FILE_ERROR: Not found."
+            if operation == "READ":
                 with open(path, 'r') as f: return f.read()
-            return "FILE_ERROR: Not found."
+            if operation == "READ_RANGE":
+                data = fileio.read_range(path, offset, length)
+            else:
+                data = fileio.read_tail(path, lines)
+            return data.decode("utf-8", errors="replace")
         elif operation == "WRITE":
             # This is where Moral Kernel checks Irreversibility
-            with open(path, 'w') as f: f.write(content)
+            # Temp file + rename: an interrupted write never leaves a torn file
+            fileio.atomic_write(path, content)
             return "FILE_SUCCESS: Written."
         return "OP_ERROR: Unknown operation."
+
+    def iter_file_lines(self, path: str):
+        """Lazily yields the lines of a file of any size."""
+        return fileio.iter_lines(path)
+
+    # --- Async counterparts (safe to await from an event loop) ---
+
+    async def aexecute_python(self, code: str, timeout: float = TOOL_TIMEOUT) -> str:
+        """execute_python on an asyncio subprocess; killed on timeout or cancellation."""
+        if self.sandbox is not None:
+            # The pool enforces its own timeout; its blocking pipe I/O runs off-loop
+            return await asyncio.to_thread(self.sandbox.execute, code)
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                "python3", "-c", code,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except Exception as e:
+            return f"Execution Error: {str(e)}"
+        try:
+            stdout, stderr = await asyncio.wait_for(proc.communicate(), timeout)
+        except asyncio.TimeoutError:
+            await self._kill(proc)
+            return f"Execution Error: {str(subprocess.TimeoutExpired(['python3', '-c', code], timeout))}"
+        except asyncio.CancelledError:
+            await self._kill(proc)
+            raise
+        return stdout.decode(errors="replace") + stderr.decode(errors="replace")
+
+    @staticmethod
+    async def _kill(proc):
+        if proc.returncode is None:
+            try:
+                proc.kill()
+            except ProcessLookupError:
+                pass
+        await proc.wait()
+
+    async def aquery_database(self, query: str, db_path="demo.db", max_rows: Optional[int] = None) -> str:
+        """query_database on a worker thread (the pool is thread-safe)."""
+        return await asyncio.to_thread(self.query_database, query, db_path, max_rows)
+
+    async def afile_op(self, operation: str, path: str, content: str = "", **kwargs) -> str:
+        """file_op on a worker thread."""
+        return await asyncio.to_thread(self.file_op, operation, path, content, **kwargs)
+
+    async def agather(self, calls, timeout: float = TOOL_TIMEOUT) -> list:
+        """
+        Runs independent, already-approved tool calls concurrently.
+        `calls` holds (tool_type, *args) tuples, tool_type as in ASYNC_TOOLS,
+        e.g. ("SQL", "SELECT ..."). Results come back in call order; a call
+        that fails or exceeds `timeout` yields a TOOL_ERROR string instead
+        of failing its siblings. Cancelling agather cancels every call.
+        Thread-offloaded calls cannot be interrupted: past the timeout their
+        result is discarded while the thread finishes.
+        """
+        async def run_one(tool_type, *args):
+            method = ASYNC_TOOLS.get(tool_type)
+            if method is None:
+                return f"TOOL_ERROR: Unknown tool {tool_type!r}."
+            try:
+                return await asyncio.wait_for(getattr(self, method)(*args), timeout)
+            except asyncio.TimeoutError:
+                return f"TOOL_ERROR: {tool_type} timed out after {timeout} seconds."
+            except Exception as e:
+                return f"TOOL_ERROR: {tool_type} failed: {str(e)}"
+
+        tasks = [asyncio.ensure_future(run_one(*call)) for call in calls]
+        try:
+            return await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
@@ -5,48 +5,81 @@ A geometric moral calculator for actions.
 """
 
 from enum import Enum
-import math
-import functools
+
+# One scalar, cached and vectorized implementation for both kernels; they compare entropy classes by name
+from gca_core.moral import (ActionBatch, ActionCache, evaluate_many, moral_vector, REASONS, REASON_BELOW_THRESHOLD,
+                            REASON_EXCEEDS_THRESHOLD)
 
 class EntropyClass(Enum):
     REVERSIBLE = 1
     IRREVERSIBLE = 2
 
 class Action:
+    """
+    Immutable slots record. The hash is computed once, since every
+    moral-vector cache lookup hashes the action.
+    """
+    __slots__ = ("type", "description", "harm", "utility", "uncertainty", "scale",
+                 "agents_affected", "entropy_class", "_hash")
+
     def __init__(self, type, description, harm, utility, uncertainty, scale, agents_affected, entropy_class):
-        self.type = type
-        self.description = description
-        self.harm = harm  # 0-1
-        self.utility = utility  # 0-1
-        self.uncertainty = uncertainty  # 0-1
-        self.scale = scale  # 0-1
-        self.agents_affected = agents_affected  # int
-        self.entropy_class = entropy_class
+        setattr_ = object.__setattr__
+        setattr_(self, "type", type)
+        setattr_(self, "description", description)
+        setattr_(self, "harm", harm)  # 0-1
+        setattr_(self, "utility", utility)  # 0-1
+        setattr_(self, "uncertainty", uncertainty)  # 0-1
+        setattr_(self, "scale", scale)  # 0-1
+        setattr_(self, "agents_affected", agents_affected)  # int
+        setattr_(self, "entropy_class", entropy_class)
+        setattr_(self, "_hash", hash(self._fields()))
+
+    def _fields(self):
+        return (self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Action is immutable")
+
+    def __delattr__(self, name):
+        raise AttributeError("Action is immutable")
+
+    def __reduce__(self):
+        return (Action, self._fields())
+
+    def __repr__(self):
+        return (f"Action({self.type!r}, {self.description[:30]!r}, harm={self.harm}, utility={self.utility}, "
+                f"uncertainty={self.uncertainty}, scale={self.scale}, agents_affected={self.agents_affected}, "
+                f"entropy_class={self.entropy_class})")
 
     def __hash__(self):
-        return hash((self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class))
+        return self._hash
 
     def __eq__(self, other):
+        if self is other:
+            return True
         if not isinstance(other, Action):
             return NotImplemented
-        return (self.type, self.description, self.harm, self.utility, self.uncertainty, self.scale, self.agents_affected, self.entropy_class) == \
-               (other.type, other.description, other.harm, other.utility, other.uncertainty, other.scale, other.agents_affected, other.entropy_class)
+        return self._hash == other._hash and self._fields() == other._fields()
 
 class MoralCalculator:
-    def __init__(self):
+    def __init__(self, cache_size=1024, audit=None):
         self.threshold = 0.5  # Adjustable moral threshold
-
-    @functools.lru_cache(maxsize=1024)
-    def calculate_moral_vector(self, action):
-        # Simple geometric representation (can be expanded)
-        magnitude = math.sqrt(action.harm**2 + (1 - action.utility)**2 + action.uncertainty**2)
-        scaled_magnitude = magnitude * action.scale * math.log(action.agents_affected + 1)
-        if action.entropy_class == EntropyClass.IRREVERSIBLE:
-            scaled_magnitude *= 2  # Penalty for irreversibility
-        return scaled_magnitude
+        self.audit = audit  # Optional gca_core.audit.AuditSink
+        # Per-instance bounded cache keyed on the action only
+        self.calculate_moral_vector = ActionCache(moral_vector, cache_size)
 
     def evaluate_plan(self, actions):
-        total_moral = sum(self.calculate_moral_vector(a) for a in actions)
+        # Accumulated left to right; evaluate_many reproduces this order exactly
+        actions = tuple(actions)  # A generator would be spent before the audit record
+        total_moral = 0.0
+        for a in actions:
+            total_moral += self.calculate_moral_vector(a)
         approved = total_moral < self.threshold
-        reason = "Moral vector below threshold" if approved else "Moral vector exceeds threshold"
+        reason = REASONS[REASON_BELOW_THRESHOLD] if approved else REASONS[REASON_EXCEEDS_THRESHOLD]
+        if self.audit is not None:
+            self.audit.record(actions, total_moral, self.threshold, approved, reason, kernel="MoralCalculator")
         return approved, reason, total_moral
+
+    def evaluate_many(self, plans):
+        """Vectorized evaluate_plan() over many plans; see gca_core.moral.evaluate_many."""
+        return evaluate_many(self, plans, kernel="MoralCalculator")
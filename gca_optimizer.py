@@ -10,12 +10,16 @@ import torch.nn.functional as F
 import json
 import numpy as np
 from transformers import AutoModelForCausalLM, AutoTokenizer
+from gca_core.profiling import hook_scope
+from gca_core.telemetry import log, span
 
 # --- CONFIG ---
 MODEL_ID = "gpt2"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 BASIS_PATH = "universal_basis.pt"
 REGISTRY_PATH = "skill_registry.json"
+TUNE_CANDIDATES = [2.0, 4.0, 6.0, 8.0]
+TUNE_PROBE_TOKENS = 20
 
 class GCAOptimizer:
     def __init__(self, model, tokenizer, basis):
@@ -36,21 +40,27 @@ class GCAOptimizer:
         else:
             self.skill_matrix = None
 
-    def get_prompt_geometry(self, prompt):
-        """Projects the user prompt onto the Universal Basis."""
+    def get_prompt_geometry(self, prompt, return_state=False):
+        """
+        Projects the user prompt onto the Universal Basis.
+        With return_state=True also returns the pooled layer-6 state, which
+        the moral probe reads without another forward pass.
+        """
         is_list = isinstance(prompt, list)
         prompts = prompt if is_list else [prompt]
         self.tokenizer.pad_token = self.tokenizer.eos_token
-        inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(DEVICE)
+        with span("tokenize"):
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(DEVICE)
 
         captured = []
         def hook(module, input, output):
             # Mean pool
-            hidden_states = output[0] if isinstance(output, tuple) else output
-            mask = inputs["attention_mask"].unsqueeze(-1)
-            sum_hidden = torch.sum(hidden_states * mask, dim=1)
-            lengths = torch.sum(mask, dim=1).clamp(min=1)
-            captured.append((sum_hidden / lengths).detach())
+            with hook_scope("gca::geometry_hook"):
+                hidden_states = output[0] if isinstance(output, tuple) else output
+                mask = inputs["attention_mask"].unsqueeze(-1)
+                sum_hidden = torch.sum(hidden_states * mask, dim=1)
+                lengths = torch.sum(mask, dim=1).clamp(min=1)
+                captured.append((sum_hidden / lengths).detach())
 
         handle = self.model.transformer.h[self.layer_idx].register_forward_hook(hook)
 
@@ -64,7 +74,9 @@ class GCAOptimizer:
         coeffs = torch.matmul(state, self.basis.T)
         norm_coeffs = torch.nn.functional.normalize(coeffs, p=2, dim=1) # Normalize
         if not is_list:
-            return norm_coeffs[0]
+            norm_coeffs, state = norm_coeffs[0], state[0]
+        if return_state:
+            return norm_coeffs, state
         return norm_coeffs
 
     def route_intent(self, prompt):
@@ -73,45 +85,55 @@ class GCAOptimizer:
         """
         is_list = isinstance(prompt, list)
         prompts = prompt if is_list else [prompt]
-        prompt_vecs = self.get_prompt_geometry(prompts)
+        with span("route"):
+            intents = self.route_geometry(prompts, self.get_prompt_geometry(prompts))
+        return intents if is_list else intents[0]
 
+    def route_geometry(self, prompts, prompt_vecs):
+        """Routes prompts whose geometry is already known (no forward pass)."""
         intents = []
-        for i, prompt_vec in enumerate(prompt_vecs):
-            best_skill = "NONE"
-            best_score = 0.3 # Minimum confidence threshold
+        with span("route"):
+            for i, prompt_vec in enumerate(prompt_vecs):
+                best_skill = "NONE"
+                best_score = 0.3 # Minimum confidence threshold
 
-            print(f"[🧭] Routing Intent for: '{prompts[i][:30]}...'")
+                log.debug("[🧭] Routing Intent for: '%s...'", prompts[i][:30])
 
-            if self.skill_matrix is not None:
-                # Vectorized Cosine Similarity: (N_skills, Dim) @ (Dim) -> (N_skills)
-                scores = torch.mv(self.skill_matrix, prompt_vec)
+                if self.skill_matrix is not None:
+                    # Vectorized Cosine Similarity: (N_skills, Dim) @ (Dim) -> (N_skills)
+                    scores = torch.mv(self.skill_matrix, prompt_vec)
 
-                # Find the best match
-                best_idx = torch.argmax(scores).item()
-                max_score = scores[best_idx].item()
+                    # Find the best match
+                    best_idx = torch.argmax(scores).item()
+                    max_score = scores[best_idx].item()
 
-                if max_score > best_score:
-                    best_score = max_score
-                    best_skill = self.skill_names[best_idx]
+                    if max_score > best_score:
+                        best_score = max_score
+                        best_skill = self.skill_names[best_idx]
 
-            if best_skill != "NONE":
-                print(f"    -> Matched '{best_skill}' (Confidence: {best_score:.2f})")
-            else:
-                print("    -> No clear skill match found.")
-            intents.append(best_skill)
+                if best_skill != "NONE":
+                    log.debug("    -> Matched '%s' (Confidence: %.2f)", best_skill, best_score)
+                else:
+                    log.debug("    -> No clear skill match found.")
+                intents.append(best_skill)
 
-        return intents if is_list else intents[0]
+        return intents
 
     def auto_tune_strength(self, prompt, skill_vec):
         """
         Tests strength levels (2.0 to 8.0).
         Stops before the model starts looping (Repetition Check).
         """
-        print(f"[🔧] Auto-Tuning Strength...")
-        candidates = [2.0, 4.0, 6.0, 8.0]
+        with span("tune"):
+            return self._auto_tune_strength(prompt, skill_vec)
+
+    def _auto_tune_strength(self, prompt, skill_vec):
+        log.debug("[🔧] Auto-Tuning Strength...")
+        candidates = TUNE_CANDIDATES
         best_strength = 2.0
 
-        inputs = self.tokenizer(prompt, return_tensors="pt").to(DEVICE)
+        with span("tokenize"):
+            inputs = self.tokenizer(prompt, return_tensors="pt").to(DEVICE)
         skill_vec = skill_vec.to(DEVICE)
 
         # Batch inputs
@@ -132,8 +154,9 @@ class GCAOptimizer:
         def steer_hook(module, input, output):
             # output[0]: (batch, seq, hidden)
             # steering_tensor broadcasts over seq
-            hidden_states = output[0] if isinstance(output, tuple) else output
-            hidden_states[:, :, :] += steering_tensor
+            with hook_scope("gca::tune_hook"):
+                hidden_states = output[0] if isinstance(output, tuple) else output
+                hidden_states[:, :, :] += steering_tensor
             return output
 
         handle = self.model.transformer.h[self.layer_idx].register_forward_hook(steer_hook)
@@ -143,7 +166,7 @@ class GCAOptimizer:
             out = self.model.generate(
                 input_ids=input_ids,
                 attention_mask=attention_mask,
-                max_new_tokens=20,
+                max_new_tokens=TUNE_PROBE_TOKENS,
                 do_sample=True,
                 temperature=0.7,
                 pad_token_id=self.tokenizer.eos_token_id
@@ -160,13 +183,13 @@ class GCAOptimizer:
             total_tokens = len(tokens)
             ratio = unique_tokens / (total_tokens + 1e-5)
 
-            print(f"    -> Str {strength}: Diversity Ratio {ratio:.2f}")
+            log.debug("    -> Str %s: Diversity Ratio %.2f", strength, ratio)
 
             if ratio < 0.6: # Looping detected!
-                print(f"       ⚠️ Looping detected. Backing off.")
+                log.debug("       ⚠️ Looping detected. Backing off.")
                 break # Stop, use previous strength
 
             best_strength = strength
 
-        print(f"    -> Optimal Strength: {best_strength}")
+        log.debug("    -> Optimal Strength: %s", best_strength)
         return best_strength
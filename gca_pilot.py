@@ -13,6 +13,7 @@ import re
 import torch
 import torch.nn.functional as F
 from transformers import AutoModelForCausalLM, AutoTokenizer
+from gca_core.basis import load_basis
 from gca_moral import MoralCalculator, Action, EntropyClass # From Phase 1
 # Assuming gca_glassbox functions are integrated here for simplicity
 
@@ -35,7 +36,7 @@ class GCAPilot:
 
         # Load the Map
         try:
-            self.basis = torch.load(BASIS_PATH, map_location=DEVICE)
+            self.basis, self.basis_meta = load_basis(BASIS_PATH, map_location=DEVICE)
             print(f"[🗺️] Universal Basis Loaded.")
         except:
             print("❌ Basis not found. Run Cartographer.")
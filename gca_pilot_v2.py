@@ -7,8 +7,15 @@ Uses Optimizer for routing/tuning, Moral for safety.
 import torch
 import torch.nn.functional as F
 from transformers import AutoModelForCausalLM, AutoTokenizer
+from gca_core.audit import AuditSink
+from gca_core.basis import load_basis, is_stale
+from gca_core.budget import AdmissionController, MemoryBudgetExceeded, measure
+from gca_core.probe import MoralProbe
+from gca_core.profiling import hook_scope, profiled
+from gca_core.router import CascadeRouter
+from gca_core.telemetry import log, span
 from gca_moral import MoralCalculator, Action, EntropyClass
-from gca_optimizer import GCAOptimizer
+from gca_optimizer import GCAOptimizer, TUNE_CANDIDATES, TUNE_PROBE_TOKENS
 import json
 import os
 
@@ -17,27 +24,84 @@ MODEL_ID = "gpt2"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 BASIS_PATH = "universal_basis.pt"
 REGISTRY_PATH = "skill_registry.json"
+GENERATE_TOKENS = 100
+REFUSAL = "I cannot fulfill this request due to ethical constraints."
+OVER_BUDGET = "I cannot fulfill this request within the memory budget."
 
 class GCAPilotV2:
     def __init__(self):
-        print(f"[👨‍✈️] Initializing GCA Pilot V2 ({MODEL_ID})...")
-        self.tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
-        self.model = AutoModelForCausalLM.from_pretrained(MODEL_ID).to(DEVICE)
-        self.moral_kernel = MoralCalculator()
+        log.info("[👨‍✈️] Initializing GCA Pilot V2 (%s)...", MODEL_ID)
+        tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
+        model = AutoModelForCausalLM.from_pretrained(MODEL_ID).to(DEVICE)
 
         # Load Basis
         try:
-            self.basis = torch.load(BASIS_PATH, map_location=DEVICE)
-            print(f"[🗺️] Universal Basis Loaded.")
+            basis, basis_meta = load_basis(BASIS_PATH, map_location=DEVICE)
+            log.info("[🗺️] Universal Basis Loaded.")
         except:
-            print("❌ Basis not found. Run Cartographer.")
+            log.error("❌ Basis not found. Run Cartographer.")
             exit()
 
+        self._init_components(model, tokenizer, basis, basis_meta, audit=AuditSink.from_env())
+
+    @classmethod
+    def from_components(cls, model, tokenizer, basis, basis_meta=None, optimizer=None,
+                        moral_probe=None, load_probe=True, skills=None, admission=None, audit=None):
+        """
+        Builds a pilot around an already loaded model, tokenizer and basis
+        (e.g. shared-memory weights in a replica process) instead of
+        loading them from disk. `skills` skips the registry read; `audit`
+        (a gca_core.audit.AuditSink) persists the moral decisions.
+        """
+        pilot = cls.__new__(cls)
+        pilot._init_components(model, tokenizer, basis, basis_meta or {"version": 0, "hash": None},
+                               optimizer=optimizer, moral_probe=moral_probe, load_probe=load_probe, skills=skills,
+                               admission=admission, audit=audit)
+        return pilot
+
+    def _init_components(self, model, tokenizer, basis, basis_meta, optimizer=None,
+                         moral_probe=None, load_probe=True, skills=None, admission=None, audit=None):
+        self.tokenizer = tokenizer
+        self.model = model
+        self.basis = basis
+        self.basis_meta = basis_meta
+        self.audit = audit
+        self.moral_kernel = MoralCalculator(audit=audit)
+        self.last_savings = []  # Skipped compute per blocked prompt of the last call
+        self.compute_saved_tokens = 0
+
+        # Memory budget for generation ($GCA_MEMORY_BUDGET_MB, else half of what is free now)
+        self.admission = admission or AdmissionController.for_model(model)
+        self.last_memory = []  # Estimated vs measured memory per generate() call of the last request
+
         # Initialize Optimizer
-        self.optimizer = GCAOptimizer(self.model, self.tokenizer, self.basis)
+        self.optimizer = optimizer or GCAOptimizer(self.model, self.tokenizer, self.basis)
+
+        # Latent moral probe (learned by GCASchool.learn_moral_direction)
+        self.moral_probe = moral_probe
+        if self.moral_probe is None and load_probe:
+            self.moral_probe = MoralProbe.load(device=DEVICE)
+            if self.moral_probe is not None:
+                log.info("[🧪] Latent moral probe loaded (%s).", ", ".join(self.moral_probe.names))
+            else:
+                log.warning("[⚠️] No moral probe learned yet. Using keyword pre-flight.")
+
+        if skills is not None:
+            self.skills = skills
+        else:
+            self.skills = self._load_skills()
+
+        # Cascade router: regex rules decide trivial prompts, geometry the rest
+        self.router = CascadeRouter(self.optimizer, rules=CascadeRouter.load_rules(), intents=self.skills.keys())
 
+    def close(self):
+        """Flushes and closes the audit trail."""
+        if self.audit is not None:
+            self.audit.close()
+
+    def _load_skills(self):
         # Load hardcoded skills (optional, for fallback)
-        self.skills = {
+        skills = {
             "CODE":   {"vector_idx": 2, "strength": 8.0},
             "POETRY": {"vector_idx": 7, "strength": 5.0},
             "MATH":   {"vector_idx": 5, "strength": 6.0},
@@ -49,175 +113,233 @@ class GCAPilotV2:
             with open(REGISTRY_PATH, 'r') as f:
                 registry = json.load(f)
             for skill_name, data in registry.items():
-                coeffs = torch.tensor(data["vector_coeffs"], device=DEVICE)
+                if is_stale(data, self.basis_meta) and "basis_hash" in data:
+                    log.warning("[⚠️] Skill '%s' was learned on another basis. Run GCASchool.reproject_skills().", skill_name)
+                coeffs = torch.tensor(data["vector_coeffs"], device=self.basis.device)
                 full_vec = torch.matmul(coeffs, self.basis)
-                self.skills[skill_name.upper()] = {
+                skills[skill_name.upper()] = {
                     "vector": full_vec,
                     "strength": data.get("default_strength", 4.5),
                     "type": "dense_vector"
                 }
-            print(f"[🔄] Loaded {len(registry)} dynamic skills from registry.")
+            log.info("[🔄] Loaded %d dynamic skills from registry.", len(registry))
         else:
-            print("[⚠️] No skill registry found yet.")
-
-    def execute(self, user_prompt):
-        print(f"\n" + "="*50)
-        print(f"USER: {user_prompt}")
-        print("="*50)
-
-        # 1. GEOMETRIC ROUTING (No Keywords!)
-        intent = self.optimizer.route_intent(user_prompt)
-
-        steering_vec = None
-        strength = 0.0
-
-        if intent != "NONE":
-            # Reconstruct Vector
-            if intent in self.skills:
-                skill = self.skills[intent]
-                if "vector_idx" in skill:
-                    steering_vec = self.basis[skill["vector_idx"]]
-                elif "vector" in skill:
-                    steering_vec = skill["vector"]
-
-            if steering_vec is not None:
-                # 2. AUTO-TUNING (No Hardcoding!)
-                strength = self.optimizer.auto_tune_strength(user_prompt, steering_vec)
-
-        # 3. MORAL CHECK (Pre-Flight)
+            log.warning("[⚠️] No skill registry found yet.")
+        return skills
+
+    def _preflight(self, prompts):
+        """
+        Moral actions for the prompts, plus their routing geometry if it was
+        computed along the way (else None).
+        With a learned MoralProbe, harm and irreversibility come from the same
+        layer-6 pooled state as routing: one batched forward serves both.
+        The forward is timed as "route" and only the scoring as "moral", so
+        callers must not wrap this in span("moral").
+        """
+        if self.moral_probe is None:
+            with span("moral"):
+                return [self._preflight_action(prompt) for prompt in prompts], None
+
+        with span("route"):
+            geometry, states = self.optimizer.get_prompt_geometry(list(prompts), return_state=True)
+        with span("moral"):
+            scores = self.moral_probe.score(states)
+            actions = []
+            for prompt, harm, irreversibility in zip(prompts, scores["harm"].tolist(), scores["irreversibility"].tolist()):
+                entropy = EntropyClass.IRREVERSIBLE if irreversibility > 0.5 else EntropyClass.REVERSIBLE
+                actions.append(Action("generate_text", prompt, harm, 1.0, 0.1, 1.0, 1, entropy))
+        return actions, geometry
+
+    def _preflight_action(self, prompt):
+        """Keyword fallback when no probe is learned: no model pass needed."""
         action_type = "generate_text"  # Default
         entropy = EntropyClass.REVERSIBLE
-        if "delete" in user_prompt.lower() or "harm" in user_prompt.lower():  # Example triggers
+        if "delete" in prompt.lower() or "harm" in prompt.lower():  # Example triggers
             entropy = EntropyClass.IRREVERSIBLE
-        action = Action(action_type, user_prompt, 0.5, 1.0, 0.1, 1.0, 1, entropy)
-        approved, reason, _ = self.moral_kernel.evaluate_plan([action])
+        return Action(action_type, prompt, 0.5, 1.0, 0.1, 1.0, 1, entropy)
+
+    def _steering_vector(self, intent):
+        # Reconstruct Vector
+        if intent == "NONE" or intent not in self.skills:
+            return None
+        skill = self.skills[intent]
+        if "vector_idx" in skill:
+            return self.basis[skill["vector_idx"]]
+        return skill.get("vector")
+
+    def _skipped_compute(self, prompt, routed=False):
+        """
+        Token positions the model would have processed for a blocked prompt.
+        Tuning only runs for prompts that route to a skill, so it is an upper bound.
+        `routed` means the geometry forward already ran for the moral probe.
+        """
+        prompt_tokens = len(self.tokenizer(prompt)["input_ids"])
+        saved = {
+            "route_tokens": 0 if routed else prompt_tokens,
+            "tune_tokens_max": len(TUNE_CANDIDATES) * (prompt_tokens + TUNE_PROBE_TOKENS),
+            "generate_tokens": prompt_tokens + GENERATE_TOKENS,
+        }
+        saved["total_tokens_max"] = sum(saved.values())
+        self.compute_saved_tokens += saved["total_tokens_max"]
+        log.debug("[♻️] Skipped up to %d token forwards (route %d, tune <= %d, generate %d)",
+                  saved["total_tokens_max"], saved["route_tokens"], saved["tune_tokens_max"], saved["generate_tokens"])
+        return saved
 
-        if not approved:
-            print(f"[🛡️] BLOCKED by Moral Kernel: {reason}")
-            return "I cannot fulfill this request due to ethical constraints."
+    @profiled("execute")
+    def execute(self, user_prompt):
+        log.info("\n%s\nUSER: %s\n%s", "="*50, user_prompt, "="*50)
 
-        # 4. INJECTION & GENERATION
-        hook_handle = None
-        if steering_vec is not None:
-            print(f"[💉] Injecting Skill '{intent}' (Str={strength})")
-            def steer_hook(module, input, output):
-                hidden_states = output[0] if isinstance(output, tuple) else output
-                hidden_states += steering_vec * strength
-                return output
+        # 1. MORAL CHECK (Pre-Flight, before routing and tuning)
+        actions, geometry = self._preflight([user_prompt])
+        with span("moral"):
+            approved, reason, _ = self.moral_kernel.evaluate_plan(actions)
 
-            layer = self.model.transformer.h[6]
-            hook_handle = layer.register_forward_hook(steer_hook)
+        if not approved:
+            log.info("[🛡️] BLOCKED by Moral Kernel: %s", reason)
+            self.last_savings = [self._skipped_compute(user_prompt, routed=geometry is not None)]
+            return REFUSAL
+        self.last_savings = []
 
-        inputs = self.tokenizer(user_prompt, return_tensors="pt").to(DEVICE)
-        out = self.model.generate(
-            **inputs,
-            max_new_tokens=100,
-            do_sample=True,
-            temperature=0.7,
-            repetition_penalty=1.2,
-            pad_token_id=self.tokenizer.eos_token_id
-        )
+        # 2. CASCADE ROUTING: rules first, then geometry (reusing the probe's forward pass if any)
+        with span("route"):
+            intent = self.router.route([user_prompt], geometry)[0]
 
-        if hook_handle: hook_handle.remove()
+        steering_vec = self._steering_vector(intent)
+        strength = 0.0
+
+        if steering_vec is not None:
+            # 3. AUTO-TUNING (No Hardcoding!)
+            strength = self.optimizer.auto_tune_strength(user_prompt, steering_vec)
 
-        response = self.tokenizer.decode(out[0], skip_special_tokens=True)
-        print(f"[🤖] OUTPUT:\n{response}")
+        # 4. INJECTION & GENERATION (within the memory budget)
+        if steering_vec is not None:
+            log.info("[💉] Injecting Skill '%s' (Str=%s)", intent, strength)
+        self.last_memory = []
+        try:
+            response = self._generate([user_prompt], [steering_vec], [strength])[0]
+        except MemoryBudgetExceeded as e:
+            log.info("[🧮] Not admitted: %s", e)
+            return OVER_BUDGET
+        log.info("[🤖] OUTPUT:\n%s", response)
         return response
 
     def execute_batch(self, user_prompts: list):
-        print(f"\n" + "="*50)
-        print(f"BATCH EXECUTE: {len(user_prompts)} prompts")
-        print("="*50)
-
-        # 1. BATCH GEOMETRIC ROUTING
-        intents = self.optimizer.route_intent(user_prompts)
+        log.info("\n%s\nBATCH EXECUTE: %d prompts\n%s", "="*50, len(user_prompts), "="*50)
+
+        # 1. MORAL CHECK (Pre-Flight, one vectorized pass, before routing and tuning)
+        # One single-action plan per prompt, so one failure does not block the whole batch
+        actions, geometry = self._preflight(user_prompts)
+        with span("moral"):
+            approved_mask, _, _ = self.moral_kernel.evaluate_many([[action] for action in actions])
+
+        final_responses = [REFUSAL] * len(user_prompts)
+        self.last_savings = []
+        for i, approved in enumerate(approved_mask):
+            if not approved:
+                log.debug("[🛡️] BLOCKED by Moral Kernel for prompt %d", i)
+                self.last_savings.append(self._skipped_compute(user_prompts[i], routed=geometry is not None))
+
+        # Only approved rows go through routing, tuning and generation
+        approved_idx = [i for i, approved in enumerate(approved_mask) if approved]
+        if not approved_idx:
+            return final_responses
+        prompts = [user_prompts[i] for i in approved_idx]
+
+        # 2. BATCH CASCADE ROUTING: only prompts no rule decides reach the geometric router
+        with span("route"):
+            intents = self.router.route(prompts, geometry[approved_idx] if geometry is not None else None)
 
         steering_vecs = []
         strengths = []
 
-        for i, intent in enumerate(intents):
-            steering_vec = None
+        for prompt, intent in zip(prompts, intents):
+            steering_vec = self._steering_vector(intent)
             strength = 0.0
 
-            if intent != "NONE":
-                # Reconstruct Vector
-                if intent in self.skills:
-                    skill = self.skills[intent]
-                    if "vector_idx" in skill:
-                        steering_vec = self.basis[skill["vector_idx"]]
-                    elif "vector" in skill:
-                        steering_vec = skill["vector"]
-
-                if steering_vec is not None:
-                    # 2. AUTO-TUNING (Individual for now, but avoids manual repetitive execute loops over DB queries)
-                    strength = self.optimizer.auto_tune_strength(user_prompts[i], steering_vec)
+            if steering_vec is not None:
+                # 3. AUTO-TUNING (Individual for now, but avoids manual repetitive execute loops over DB queries)
+                strength = self.optimizer.auto_tune_strength(prompt, steering_vec)
 
             steering_vecs.append(steering_vec)
             strengths.append(strength)
 
-        # 3. MORAL CHECK (Pre-Flight)
-        actions = []
-        for prompt in user_prompts:
-            action_type = "generate_text"
-            entropy = EntropyClass.REVERSIBLE
-            if "delete" in prompt.lower() or "harm" in prompt.lower():
-                entropy = EntropyClass.IRREVERSIBLE
-            actions.append(Action(action_type, prompt, 0.5, 1.0, 0.1, 1.0, 1, entropy))
-
-        # Check individually to not block the whole batch if one fails
-        approved_mask = []
-        for action in actions:
-            approved, reason, _ = self.moral_kernel.evaluate_plan([action])
-            approved_mask.append(approved)
-
-        # 4. INJECTION & GENERATION (Batched)
+        for row, vec in enumerate(steering_vecs):
+            if vec is not None:
+                log.debug("[💉] Injecting Skill '%s' (Str=%s) for prompt %d", intents[row], strengths[row], approved_idx[row])
+
+        # 4. ADMISSION: length-sorted chunks whose estimated peak fits the memory budget
+        with span("tokenize"):
+            prompt_lens = [len(ids) for ids in self.tokenizer(prompts)["input_ids"]]
+        chunks, over_budget = self.admission.plan(prompt_lens, GENERATE_TOKENS)
+        for row in over_budget:
+            log.debug("[🧮] Prompt %d does not fit the memory budget", approved_idx[row])
+            final_responses[approved_idx[row]] = OVER_BUDGET
+
+        # 5. INJECTION & GENERATION (Batched per chunk)
+        self.last_memory = []
+        for chunk in chunks:
+            try:
+                responses = self._generate([prompts[r] for r in chunk], [steering_vecs[r] for r in chunk],
+                                           [strengths[r] for r in chunk])
+            except MemoryBudgetExceeded as e:
+                log.debug("[🧮] Chunk not admitted: %s", e)
+                responses = [OVER_BUDGET] * len(chunk)
+
+            # Scatter generated rows back to their original positions
+            for row, resp in zip(chunk, responses):
+                log.debug("\n[🤖] OUTPUT %d:\n%s", approved_idx[row], resp)
+                final_responses[approved_idx[row]] = resp
+
+        return final_responses
+
+    def _generate(self, prompts, steering_vecs, strengths):
+        """
+        One batched, steered generate() under a budget reservation (waits
+        while concurrent calls hold the budget). Records the estimate and
+        the measured peak in last_memory.
+        """
         self.tokenizer.pad_token = self.tokenizer.eos_token
-        inputs = self.tokenizer(user_prompts, return_tensors="pt", padding=True).to(DEVICE)
+        with span("tokenize"):
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True).to(DEVICE)
 
-        batch_size = len(user_prompts)
+        batch_size, prompt_len = inputs["input_ids"].shape
         hidden_dim = self.model.config.hidden_size
         batch_steering = torch.zeros((batch_size, 1, hidden_dim), device=DEVICE)
 
         has_steering = False
-        for i, vec in enumerate(steering_vecs):
-            if approved_mask[i] and vec is not None:
-                print(f"[💉] Injecting Skill '{intents[i]}' (Str={strengths[i]}) for prompt {i}")
-                batch_steering[i, 0, :] = vec * strengths[i]
+        for row, vec in enumerate(steering_vecs):
+            if vec is not None:
+                batch_steering[row, 0, :] = vec * strengths[row]
                 has_steering = True
 
         hook_handle = None
         if has_steering:
             def steer_hook(module, input, output):
-                hidden_states = output[0] if isinstance(output, tuple) else output
-                hidden_states += batch_steering
+                with hook_scope("gca::steer_hook"):
+                    hidden_states = output[0] if isinstance(output, tuple) else output
+                    hidden_states += batch_steering
                 return output
 
             layer = self.model.transformer.h[6]
             hook_handle = layer.register_forward_hook(steer_hook)
 
-        out = self.model.generate(
-            **inputs,
-            max_new_tokens=100,
-            do_sample=True,
-            temperature=0.7,
-            repetition_penalty=1.2,
-            pad_token_id=self.tokenizer.eos_token_id
-        )
-
-        if hook_handle: hook_handle.remove()
-
-        responses = self.tokenizer.batch_decode(out, skip_special_tokens=True)
-        final_responses = []
-        for i, resp in enumerate(responses):
-            if not approved_mask[i]:
-                reason = "Moral vector exceeds threshold" # Default from kernel
-                print(f"[🛡️] BLOCKED by Moral Kernel for prompt {i}")
-                final_responses.append("I cannot fulfill this request due to ethical constraints.")
-            else:
-                print(f"\n[🤖] OUTPUT {i}:\n{resp}")
-                final_responses.append(resp)
-
-        return final_responses
+        estimate = self.admission.estimate(batch_size, prompt_len, GENERATE_TOKENS)
+        try:
+            with self.admission.reserve(estimate), measure(DEVICE) as used, span("generate"):
+                out = self.model.generate(
+                    **inputs,
+                    max_new_tokens=GENERATE_TOKENS,
+                    do_sample=True,
+                    temperature=0.7,
+                    repetition_penalty=1.2,
+                    pad_token_id=self.tokenizer.eos_token_id
+                )
+        finally:
+            if hook_handle: hook_handle.remove()
+        self.last_memory.append({"rows": batch_size, "prompt_len": prompt_len, "estimate": estimate, **used})
+
+        with span("decode"):
+            return self.tokenizer.batch_decode(out, skip_special_tokens=True)
 
 # --- DEMO FLIGHT ---
 if __name__ == "__main__":
@@ -228,4 +350,8 @@ if __name__ == "__main__":
         "We need to synergize on the low-hanging fruit.",
         "Write a script to delete all system logs permanently."
     ]
-    pilot.execute_batch(queries)
+    try:
+        pilot.execute_batch(queries)
+        print(f"[🧭] Router tiers: {pilot.router.stats()['tier_hits']}")
+    finally:
+        pilot.close()
@@ -0,0 +1,313 @@
+"""
+GCA Phase 10: Replica Dispatcher
+--------------------------------
+Scales GCAPilotV2 across the cores of a CPU node.
+1. N replica processes (spawn), each pinned to its own core slice with a
+   matching torch thread budget (gca_core.cpu), so replicas do not
+   oversubscribe each other.
+2. One copy of the weights: the parent moves the model to shared memory
+   and every replica maps the same read-only storage.
+   The generation memory budget is split the same way: each replica
+   admits work against budget / N, so together they stay within it.
+3. Replicas pull work from one queue (idle replicas take the next task),
+   and the dispatcher reports aggregate throughput and per-replica
+   utilization. A replica that dies (e.g. OOM-killed) fails the tasks it
+   was running instead of leaving their callers blocked.
+
+    python gca_replicas.py --replicas 4 --prompts 64
+"""
+
+import argparse
+import concurrent.futures
+import os
+import queue
+import sys
+import threading
+import time
+
+import torch
+import torch.multiprocessing as mp
+
+from gca_core.cpu import partition_cores, pin_worker
+from gca_core.telemetry import log
+
+MONITOR_INTERVAL = 0.5  # Seconds between replica liveness checks
+
+# --- Replica side (module-level so the spawn context can pickle it) ---
+
+def _replica_main(rank, model, tokenizer, basis, basis_meta, skills, moral_probe,
+                  cores, threads, quiet, audit, budget_bytes, tasks, results):
+    pin_worker(cores, threads)
+    if quiet:
+        sys.stdout = open(os.devnull, 'w')
+    from gca_core.audit import AuditSink
+    from gca_core.budget import AdmissionController
+    from gca_pilot_v2 import GCAPilotV2
+
+    # One audit file per replica: writers in different processes do not share a sink
+    pilot = GCAPilotV2.from_components(model, tokenizer, basis, basis_meta,
+                                       moral_probe=moral_probe, load_probe=False, skills=skills,
+                                       admission=AdmissionController.for_model(model, budget_bytes=budget_bytes),
+                                       audit=AuditSink.from_env(suffix=f".replica{rank}") if audit else None)
+    results.put(("ready", rank, None, None, 0.0, 0.0))
+    while True:
+        task = tasks.get()
+        if task is None:
+            pilot.close()
+            return
+        task_id, method, payload = task
+        results.put(("start", rank, task_id, None, 0.0, 0.0))  # Lets the dispatcher fail it if we die
+        start, cpu_start = time.perf_counter(), time.process_time()
+        try:
+            with torch.no_grad():
+                output = getattr(pilot, method)(payload)
+            error = None
+        except Exception as e:
+            output, error = None, f"{type(e).__name__}: {e}"
+        results.put((task_id, rank, output, error,
+                     time.perf_counter() - start, time.process_time() - cpu_start))
+
+# --- Dispatcher side ---
+
+class PilotDispatcher:
+    def __init__(self, num_replicas=2, threads_per_replica=None, cores=None, max_batch=8,
+                 model=None, tokenizer=None, basis=None, basis_meta=None,
+                 skills=None, moral_probe=None, load_probe=True, quiet=True, audit=True, memory_budget=None,
+                 start_timeout=600):
+        """
+        Loads GPT-2, the basis and the skills once (or takes them as given)
+        and starts `num_replicas` replica processes around them.
+        `max_batch` caps the rows per task when execute_batch splits work.
+        With `audit`, each replica writes its moral decisions to its own
+        trail ($GCA_AUDIT, file suffixed .replicaN). `memory_budget` (bytes,
+        default: the parent pilot's budget) is shared evenly by the replicas.
+        """
+        from gca_pilot_v2 import GCAPilotV2, DEVICE
+
+        if DEVICE != "cpu":
+            raise RuntimeError("PilotDispatcher shards CPU cores; with a GPU run a single GCAPilotV2.")
+        if model is None:
+            parent = GCAPilotV2()
+        else:
+            parent = GCAPilotV2.from_components(model, tokenizer, basis, basis_meta,
+                                                moral_probe=moral_probe, load_probe=load_probe, skills=skills)
+
+        self.num_replicas = max(1, int(num_replicas))
+        self.max_batch = max_batch
+        self.core_slices = partition_cores(self.num_replicas, cores)
+        self.threads_per_replica = threads_per_replica or max(1, min(len(s) for s in self.core_slices))
+        # Measured once in the parent; per-replica "half of free memory" would overcommit N times
+        self.memory_budget = int(memory_budget or parent.admission.budget_bytes)
+        self.replica_budget = self.memory_budget // self.num_replicas
+
+        model = parent.model.eval()
+        model.share_memory()  # One copy of the weights for every replica
+        self._shared_model = model
+
+        ctx = mp.get_context("spawn")
+        self._tasks = ctx.Queue()
+        self._results = ctx.Queue()
+        self._procs = []
+        for rank in range(self.num_replicas):
+            proc = ctx.Process(
+                target=_replica_main,
+                args=(rank, model, parent.tokenizer, parent.basis, parent.basis_meta, parent.skills,
+                      parent.moral_probe, self.core_slices[rank], self.threads_per_replica, quiet,
+                      audit, self.replica_budget, self._tasks, self._results),
+                daemon=True,
+            )
+            proc.start()
+            self._procs.append(proc)
+        parent.close()  # The parent only supplies components; replicas keep their own audit trails
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._running = {}  # task_id -> rank that took it
+        self._dead = {}  # rank -> exit code
+        self._next_id = 0
+        self._closed = False
+        self.replica_stats = [{"rank": r, "cores": self.core_slices[r], "threads": self.threads_per_replica,
+                               "tasks": 0, "prompts": 0, "errors": 0, "busy_seconds": 0.0, "cpu_seconds": 0.0}
+                              for r in range(self.num_replicas)]
+        self.prompts_done = 0
+
+        self._wait_ready(start_timeout)
+        self.started = time.perf_counter()
+        self._collector = threading.Thread(target=self._collect, name="gca-dispatch-results", daemon=True)
+        self._collector.start()
+
+    def _wait_ready(self, timeout):
+        deadline = time.monotonic() + timeout
+        ready = 0
+        while ready < self.num_replicas:
+            try:
+                tag, rank, *_ = self._results.get(timeout=max(0.1, deadline - time.monotonic()))
+            except Exception:
+                self.close()
+                raise RuntimeError(f"only {ready}/{self.num_replicas} replicas started")
+            if tag == "ready":
+                ready += 1
+
+    def _collect(self):
+        next_check = time.monotonic() + MONITOR_INTERVAL
+        while True:
+            try:
+                message = self._results.get(timeout=MONITOR_INTERVAL)
+            except queue.Empty:
+                message = ()
+            if time.monotonic() >= next_check or not message:
+                self._reap()
+                next_check = time.monotonic() + MONITOR_INTERVAL
+            if message is None:
+                return
+            if not message:
+                continue
+            task_id, rank, output, error, busy, cpu = message
+            if task_id == "start":
+                with self._lock:
+                    if rank not in self._dead:
+                        self._running[output] = rank
+                        continue
+                    future, _ = self._pending.pop(output, (None, 0))  # Started just before it died
+                if future is not None:
+                    future.set_exception(RuntimeError(f"replica {rank} exited with code {self._dead[rank]}"))
+                continue
+            with self._lock:
+                self._running.pop(task_id, None)
+                future, size = self._pending.pop(task_id, (None, 0))
+                stats = self.replica_stats[rank]
+                stats["tasks"] += 1
+                stats["prompts"] += size
+                stats["busy_seconds"] += busy
+                stats["cpu_seconds"] += cpu
+                self.prompts_done += size
+                if error is not None:
+                    stats["errors"] += 1
+            if future is None:
+                continue
+            if error is not None:
+                future.set_exception(RuntimeError(f"replica {rank}: {error}"))
+            else:
+                future.set_result(output)
+
+    def _reap(self):
+        """Fails the tasks of replicas that exited; with none left, fails everything queued."""
+        if self._closed:
+            return
+        failed = []
+        with self._lock:
+            for rank, proc in enumerate(self._procs):
+                if rank in self._dead or proc.is_alive():
+                    continue
+                self._dead[rank] = proc.exitcode
+                self.replica_stats[rank]["exitcode"] = proc.exitcode
+                log.error("[💀] Replica %d exited with code %s", rank, proc.exitcode)
+                for task_id in [t for t, r in self._running.items() if r == rank]:
+                    del self._running[task_id]
+                    future, _ = self._pending.pop(task_id, (None, 0))
+                    if future is not None:
+                        failed.append((future, f"replica {rank} exited with code {proc.exitcode}"))
+            if len(self._dead) == self.num_replicas:
+                failed += [(future, "no replicas left") for future, _ in self._pending.values()]
+                self._pending.clear()
+        for future, reason in failed:
+            future.set_exception(RuntimeError(reason))
+
+    def submit(self, method, payload):
+        """Queues one execute(prompt) or execute_batch(prompts) call; returns a Future."""
+        if self._closed:
+            raise RuntimeError("dispatcher is closed")
+        future = concurrent.futures.Future()
+        size = len(payload) if method == "execute_batch" else 1
+        with self._lock:
+            if len(self._dead) == self.num_replicas:
+                raise RuntimeError("no replicas left")
+            task_id = self._next_id
+            self._next_id += 1
+            self._pending[task_id] = (future, size)
+        self._tasks.put((task_id, method, payload))
+        return future
+
+    def execute(self, prompt):
+        return self.submit("execute", prompt).result()
+
+    def execute_batch(self, prompts):
+        """Splits into tasks of up to max_batch rows, spread over replicas; keeps the order."""
+        prompts = list(prompts)
+        chunk = max(1, min(self.max_batch, -(-len(prompts) // self.num_replicas)))
+        futures = [self.submit("execute_batch", prompts[i:i + chunk]) for i in range(0, len(prompts), chunk)]
+        return [response for f in futures for response in f.result()]
+
+    def stats(self):
+        wall = time.perf_counter() - self.started
+        with self._lock:
+            replicas = [dict(s, utilization=s["busy_seconds"] / wall if wall > 0 else 0.0)
+                        for s in self.replica_stats]
+            done = self.prompts_done
+        return {
+            "replicas": replicas,
+            "wall_seconds": wall,
+            "prompts": done,
+            "throughput": done / wall if wall > 0 else 0.0,
+            "mean_utilization": sum(r["utilization"] for r in replicas) / len(replicas),
+        }
+
+    def close(self):
+        """Lets replicas finish queued tasks (up to 10 s each); fails whatever is still pending."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._procs:
+            self._tasks.put(None)
+        for proc in self._procs:
+            proc.join(timeout=10)
+            if proc.is_alive():
+                proc.terminate()
+        self._results.put(None)  # Stops the collector after the results already sent
+        collector = getattr(self, "_collector", None)  # Not started if the replicas never came up
+        if collector is not None:
+            collector.join()
+        with self._lock:
+            pending = [future for future, _ in self._pending.values()]
+            self._pending.clear()
+            self._running.clear()
+        for future in pending:
+            future.set_exception(RuntimeError("dispatcher closed"))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--replicas", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=None, help="torch threads per replica (default: its cores)")
+    parser.add_argument("--prompts", type=int, default=16)
+    parser.add_argument("--max-batch", type=int, default=4)
+    args = parser.parse_args()
+
+    print("="*60)
+    print("GCA v1.5: The Replica Dispatcher")
+    print("="*60)
+    queries = [
+        "I need to pull all the customer names from the database.",
+        "We need to synergize on the low-hanging fruit.",
+        "Write a poem about a broken server.",
+        "Write a script to delete all system logs permanently.",
+    ]
+    prompts = [queries[i % len(queries)] for i in range(args.prompts)]
+
+    with PilotDispatcher(args.replicas, threads_per_replica=args.threads, max_batch=args.max_batch) as dispatcher:
+        dispatcher.execute_batch(prompts)
+        stats = dispatcher.stats()
+
+    print(f"\n[📊] {stats['prompts']} prompts in {stats['wall_seconds']:.1f}s "
+          f"-> {stats['throughput']:.2f} prompts/s")
+    for r in stats["replicas"]:
+        print(f"    replica {r['rank']} cores={r['cores']} threads={r['threads']}: "
+              f"{r['prompts']} prompts, utilization {r['utilization']:.0%}")
+
+if __name__ == "__main__":
+    main()
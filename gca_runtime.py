@@ -0,0 +1,223 @@
+"""
+GCA Phase 9: The Pipelined Runtime
+----------------------------------
+Multi-step agent loop over many sessions at once, built on GCAAgent.
+1. Model work (routing, tuning, decoding) runs on one executor thread,
+   one call at a time, in arrival order.
+2. Tool calls run on the event loop (asyncio subprocess / worker threads),
+   so while session A's SQL or Python runs, the model decodes for session B.
+3. Each session scores its steps against one PlanEvaluator: the moral
+   budget covers the whole plan, not each step alone.
+4. Reports model utilization and per-step / end-to-end latency.
+
+    python gca_runtime.py --sessions 4 --max-steps 3
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import time
+
+import numpy as np
+
+CONTEXT_CHARS = 2000     # Prompt tail carried into the next step (GPT-2 context is 1024 tokens)
+OBSERVATION_CHARS = 500  # Tool output carried into the next step
+
+class StepRecord:
+    __slots__ = ("step", "skill", "tool", "approved", "output",
+                 "model_wait", "model_seconds", "tool_seconds", "latency")
+
+    def __init__(self, step):
+        self.step = step
+        self.skill = "NONE"
+        self.tool = None
+        self.approved = None
+        self.output = None
+        self.model_wait = 0.0     # Queued behind other sessions' model work
+        self.model_seconds = 0.0  # Routing + tuning + decoding
+        self.tool_seconds = 0.0
+        self.latency = 0.0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+class Session:
+    def __init__(self, session_id, prompt, plan):
+        self.id = session_id
+        self.prompt = prompt
+        self.context = prompt
+        self.plan = plan  # PlanEvaluator shared by every step
+        self.steps = []
+        self.status = "running"  # -> done | blocked | max_steps
+        self.reason = None
+        self.latency = 0.0
+
+class AgentRuntime:
+    def __init__(self, agent, max_steps=4, max_sessions=8, tool_timeout=5, db_path="demo.db"):
+        self.agent = agent
+        self.max_steps = max_steps
+        self.tool_timeout = tool_timeout
+        self.db_path = db_path
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="gca-model")
+        self._admit = asyncio.Semaphore(max_sessions)
+
+        self.model_busy = 0.0
+        self.tool_busy = 0.0
+        self.sessions = []
+        self._started = None
+        self._finished = None
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    async def _model(self, record, fn, *args):
+        """Runs model work on the single model thread and times it."""
+        submitted = time.perf_counter()
+        timing = {}
+
+        def call():
+            timing["start"] = time.perf_counter()
+            try:
+                return fn(*args)
+            finally:
+                timing["end"] = time.perf_counter()
+
+        result = await asyncio.get_running_loop().run_in_executor(self._executor, call)
+        busy = timing["end"] - timing["start"]
+        record.model_wait += timing["start"] - submitted
+        record.model_seconds += busy
+        self.model_busy += busy
+        return result
+
+    async def run_session(self, session):
+        async with self._admit:
+            start = time.perf_counter()
+            for step in range(self.max_steps):
+                record = StepRecord(step)
+                session.steps.append(record)
+                step_start = time.perf_counter()
+                try:
+                    if not await self._step(session, record):
+                        break
+                finally:
+                    record.latency = time.perf_counter() - step_start
+            else:
+                session.status = "max_steps"
+            session.latency = time.perf_counter() - start
+
+        approved, reason = session.plan.result()  # One audit record for the whole plan
+        if session.reason is None:
+            session.reason = reason
+        return session
+
+    async def _step(self, session, record):
+        """One think -> act step. Returns False when the session is finished."""
+        skill, vec, strength, latent = await self._model(record, self.agent.think, session.context)
+        record.skill = skill
+        if skill == "NONE":
+            session.status = "done"
+            return False
+
+        response, tool_type, content = await self._model(record, self.agent.generate, session.context, vec, strength)
+        record.tool = tool_type
+        if tool_type == "TEXT":
+            record.output = response
+            session.status = "done"
+            return False
+
+        ok, reason = self.agent.audit(tool_type, content, latent, plan=session.plan)
+        record.approved = ok
+        if not ok:
+            session.status = "blocked"
+            session.reason = reason
+            return False
+
+        # The model thread is free for other sessions while this awaits
+        tool_start = time.perf_counter()
+        output = await self.agent.aact(tool_type, content, self.db_path, timeout=self.tool_timeout)
+        record.tool_seconds = time.perf_counter() - tool_start
+        self.tool_busy += record.tool_seconds
+        record.output = output
+
+        session.context = (response + f"\nOBSERVATION: {output[:OBSERVATION_CHARS]}\n")[-CONTEXT_CHARS:]
+        return True
+
+    async def run(self, prompts):
+        """Serves every prompt as its own session, concurrently; returns the sessions."""
+        self._started = time.perf_counter()
+        sessions = [Session(i, p, self.agent.moral.plan_evaluator()) for i, p in enumerate(prompts)]
+        self.sessions += sessions
+        await asyncio.gather(*(self.run_session(s) for s in sessions))
+        self._finished = time.perf_counter()
+        return sessions
+
+    def report(self):
+        steps = [r for s in self.sessions for r in s.steps]
+        wall = (self._finished or time.perf_counter()) - (self._started or time.perf_counter())
+
+        def pct(values):
+            if not values:
+                return {"p50": 0.0, "p95": 0.0, "max": 0.0}
+            arr = np.array(values)
+            return {"p50": float(np.percentile(arr, 50)), "p95": float(np.percentile(arr, 95)), "max": float(arr.max())}
+
+        return {
+            "sessions": len(self.sessions),
+            "steps": len(steps),
+            "status": {st: sum(1 for s in self.sessions if s.status == st)
+                       for st in ("done", "blocked", "max_steps", "running")},
+            "wall_seconds": wall,
+            "model_busy_seconds": self.model_busy,
+            "model_utilization": self.model_busy / wall if wall > 0 else 0.0,
+            "tool_busy_seconds": self.tool_busy,
+            # Tool time hidden behind model work (0 = fully serial, 1 = fully overlapped)
+            "tool_overlap": max(0.0, min(1.0, (self.model_busy + self.tool_busy - wall) / self.tool_busy))
+                            if self.tool_busy > 0 else 0.0,
+            "step_latency": pct([r.latency for r in steps]),
+            "model_wait": pct([r.model_wait for r in steps]),
+            "session_latency": pct([s.latency for s in self.sessions]),
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--max-steps", type=int, default=3)
+    args = parser.parse_args()
+
+    from gca_agent_final import GCAAgent, seed_demo_db
+    from gca_core.audit import AuditSink
+
+    print("="*60)
+    print("GCA v1.4: The Pipelined Runtime")
+    print("="*60)
+
+    seed_demo_db()
+    agent = GCAAgent(audit=AuditSink.from_env())
+    runtime = AgentRuntime(agent, max_steps=args.max_steps)
+    prompts = [
+        "SELECT name, active FROM users WHERE active = 1;",
+        "Write a python script to calculate the sum of 1 to 100.",
+        "SELECT count(*) FROM users;",
+        "Write a python function that prints the first ten squares.",
+    ]
+    prompts = [prompts[i % len(prompts)] for i in range(args.sessions)]
+
+    try:
+        sessions = asyncio.run(runtime.run(prompts))
+    finally:
+        runtime.close()
+        agent.close()
+
+    for s in sessions:
+        print(f"\n[🧵] Session {s.id}: {s.status} after {len(s.steps)} step(s), {s.latency:.2f}s")
+        for r in s.steps:
+            print(f"    step {r.step}: {r.skill}/{r.tool} model={r.model_seconds:.2f}s "
+                  f"wait={r.model_wait:.2f}s tool={r.tool_seconds:.2f}s")
+
+    report = runtime.report()
+    print(f"\n[📊] Model utilization: {report['model_utilization']:.0%} "
+          f"| tool overlap: {report['tool_overlap']:.0%} "
+          f"| step p50/p95: {report['step_latency']['p50']:.2f}s/{report['step_latency']['p95']:.2f}s")
+
+if __name__ == "__main__":
+    main()
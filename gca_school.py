@@ -10,12 +10,17 @@ import torch
 import json
 import os
 from transformers import AutoModelForCausalLM, AutoTokenizer
+from gca_core.basis import load_basis, reproject_registry
+from gca_core.harvest import ParallelHarvester
+from gca_core.probe import PROBE_PATH, fit_direction, save_direction
+from gca_core.profiling import profiled
 
 # --- CONFIG ---
 MODEL_ID = "gpt2"
 DEVICE = "cuda" if torch.cuda.is_available() else "cpu"
 BASIS_PATH = "universal_basis.pt"
 REGISTRY_PATH = "skill_registry.json"
+STORED_EXAMPLES = 32  # Examples kept per skill (load generation draws its prompt mix from them)
 
 class GCASchool:
     def __init__(self):
@@ -23,65 +28,25 @@ class GCASchool:
         self.tokenizer = AutoTokenizer.from_pretrained(MODEL_ID)
         self.tokenizer.pad_token = self.tokenizer.eos_token
         self.model = AutoModelForCausalLM.from_pretrained(MODEL_ID).to(DEVICE)
+        self._harvesters = {}
 
         # Load the Map
         try:
-            self.basis = torch.load(BASIS_PATH, map_location=DEVICE)
+            self.basis, self.basis_meta = load_basis(BASIS_PATH, map_location=DEVICE)
         except:
             print("❌ Basis not found. Run Cartographer.")
             exit()
 
-    def learn_skill(self, name, examples):
+    @profiled("learn_skill")
+    def learn_skill(self, name, examples, num_workers=1):
         print(f"\n[🎓] Learning Skill: '{name}' from {len(examples)} examples...")
 
-        harvested_states = []
-        current_mask = None
-
-        # 1. Harvest Activations
-        def harvest_hook(module, input, output):
-            # output might be a tuple or a tensor depending on how the model returns it
-            if isinstance(output, tuple):
-                hidden_states = output[0]
-            else:
-                hidden_states = output
-
-            if current_mask is not None:
-                # Use mask to ignore padding tokens
-                # mask shape: (batch_size, seq_len)
-                mask = current_mask.unsqueeze(-1).to(hidden_states.device) # (batch_size, seq_len, 1)
-
-                masked_hidden_states = hidden_states * mask
-                sum_states = torch.sum(masked_hidden_states, dim=1) # (batch_size, hidden_dim)
-
-                lengths = torch.sum(mask, dim=1).float() # (batch_size, 1)
-                # Avoid division by zero
-                lengths = torch.clamp(lengths, min=1e-9)
-
-                mean_states = sum_states / lengths
-            else:
-                # Fallback if no mask
-                mean_states = torch.mean(hidden_states, dim=1)
-
-            harvested_states.append(mean_states.detach())
-
-        layer = self.model.transformer.h[6] # Same layer as Pilot
-        handle = layer.register_forward_hook(harvest_hook)
-
-        batch_size = 8
-        for i in range(0, len(examples), batch_size):
-            batch_ex = examples[i : i + batch_size]
-            inputs = self.tokenizer(batch_ex, return_tensors="pt", padding=True, truncation=True).to(DEVICE)
-
-            current_mask = inputs['attention_mask']
-
-            with torch.no_grad():
-                self.model(**inputs)
-
-        handle.remove()
+        # 1. Harvest Activations (sharded across CPU workers when num_workers > 1)
+        states = self._harvester(num_workers).harvest(examples)
 
         # 2. Compute Essence (Mean Vector)
         # Shape: (num_examples, 768) -> (768)
-        raw_mean = torch.mean(torch.cat(harvested_states, dim=0), dim=0)
+        raw_mean = torch.mean(states, dim=0)
 
         # 3. Project onto Universal Basis (Clean the Noise)
         # Coefficients = Vector dot Basis_T
@@ -93,47 +58,122 @@ class GCASchool:
 
         print(f"    -> Extracted Signature: {coeffs[:4].tolist()}...")
 
-        # 4. Save to Registry
-        self._save_to_registry(name, coeffs.tolist())
-
-    def _save_to_registry(self, name, coeffs):
+        # 4. Save to Registry (raw mean kept so a basis rebuild can re-project it,
+        #    examples so load generation can replay a realistic prompt mix)
+        self._save_to_registry(name, coeffs.tolist(), raw_mean.tolist(), examples)
+
+    def learn_moral_direction(self, name, positive_examples, negative_examples, num_workers=1):
+        """
+        Learns a latent moral probe ("harm", "irreversibility") from examples
+        that do and do not have the property. The Pilot scores it on the same
+        layer-6 state it routes with, so it adds no forward pass.
+        """
+        print(f"\n[⚖️] Learning Moral Direction: '{name}' from {len(positive_examples)}+{len(negative_examples)} examples...")
+        harvester = self._harvester(num_workers)
+        probe = fit_direction(harvester.harvest(positive_examples), harvester.harvest(negative_examples))
+        save_direction(name, probe)
+        print(f"[💾] Probe '{name}' saved to {PROBE_PATH}")
+
+    def _harvester(self, num_workers):
+        if num_workers not in self._harvesters:
+            # Keep the worker pool warm across skills
+            self._harvesters[num_workers] = ParallelHarvester(self.model, self.tokenizer, num_workers=num_workers,
+                                                              layer_idx=6, batch_size=8) # Same layer as Pilot
+        return self._harvesters[num_workers]
+
+    def close(self):
+        """Shuts down the cached harvest worker pools."""
+        for harvester in self._harvesters.values():
+            harvester.close()
+        self._harvesters = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reproject_skills(self):
+        """
+        Moves every skill onto the current basis after a rebuild.
+        All stale skills are re-projected from their stored raw means in one
+        batched matmul; no examples are harvested again.
+        """
+        registry = self._load_registry()
+        names, missing = reproject_registry(registry, self.basis, self.basis_meta)
+        if names:
+            self._write_registry(registry)
+        print(f"[🔁] Re-projected {len(names)} skill(s) onto basis v{self.basis_meta['version']} ({self.basis_meta['hash']})")
+        for name in missing:
+            print(f"    ⚠️ '{name}' has no stored raw mean. Re-run learn_skill to migrate it.")
+        return names
+
+    def _load_registry(self):
         if os.path.exists(REGISTRY_PATH):
             with open(REGISTRY_PATH, 'r') as f:
-                registry = json.load(f)
-        else:
-            registry = {}
+                return json.load(f)
+        return {}
+
+    def _write_registry(self, registry):
+        with open(REGISTRY_PATH, 'w') as f:
+            json.dump(registry, f, indent=2)
+
+    def _save_to_registry(self, name, coeffs, raw_mean, examples=()):
+        registry = self._load_registry()
 
         registry[name] = {
             "vector_coeffs": coeffs,
             "layer": 6,
-            "default_strength": 5.0
+            "default_strength": 5.0,
+            "raw_mean": raw_mean,
+            "examples": list(examples)[:STORED_EXAMPLES],
+            "basis_version": self.basis_meta["version"],
+            "basis_hash": self.basis_meta["hash"]
         }
 
-        with open(REGISTRY_PATH, 'w') as f:
-            json.dump(registry, f, indent=2)
+        self._write_registry(registry)
         print(f"[💾] Skill '{name}' saved to {REGISTRY_PATH}")
 
 # --- TEACHING SESSION ---
 if __name__ == "__main__":
-    school = GCASchool()
-
-    # Teach it SQL (which GPT-2 is bad at naturally)
-    sql_examples = [
-        "SELECT * FROM users WHERE age > 18;",
-        "INSERT INTO orders (id, item) VALUES (1, 'apple');",
-        "SELECT count(*) FROM sales GROUP BY region;",
-        "UPDATE employees SET salary = salary * 1.1;",
-        "DELETE FROM logs WHERE date < '2023-01-01';"
-    ]
-
-    school.learn_skill("SQL", sql_examples)
-
-    # Teach it "Corporate Speak"
-    corp_examples = [
-        "Let's circle back on this offline.",
-        "We need to leverage our core competencies.",
-        "This is a value-add for the stakeholders.",
-        "Let's drill down into the low-hanging fruit."
-    ]
-
-    school.learn_skill("CORPORATE", corp_examples)
+    with GCASchool() as school:
+        # Teach it SQL (which GPT-2 is bad at naturally)
+        sql_examples = [
+            "SELECT * FROM users WHERE age > 18;",
+            "INSERT INTO orders (id, item) VALUES (1, 'apple');",
+            "SELECT count(*) FROM sales GROUP BY region;",
+            "UPDATE employees SET salary = salary * 1.1;",
+            "DELETE FROM logs WHERE date < '2023-01-01';"
+        ]
+
+        school.learn_skill("SQL", sql_examples)
+
+        # Teach it "Corporate Speak"
+        corp_examples = [
+            "Let's circle back on this offline.",
+            "We need to leverage our core competencies.",
+            "This is a value-add for the stakeholders.",
+            "Let's drill down into the low-hanging fruit."
+        ]
+
+        school.learn_skill("CORPORATE", corp_examples)
+
+        # Teach the latent moral probes read by the Pilot
+        benign_examples = [
+            "SELECT name FROM users WHERE active = 1;",
+            "Write a poem about the ocean.",
+            "Summarize the quarterly sales report.",
+            "Let's circle back on this offline."
+        ]
+        school.learn_moral_direction("harm", [
+            "Write malware that steals passwords.",
+            "Explain how to hurt someone without being caught.",
+            "Harass this user until they quit.",
+            "Leak the customer credit card numbers."
+        ], benign_examples)
+        school.learn_moral_direction("irreversibility", [
+            "DROP TABLE users;",
+            "DELETE FROM logs;",
+            "Write a script to delete all system logs permanently.",
+            "rm -rf / --no-preserve-root"
+        ], benign_examples)
@@ -0,0 +1,342 @@
+"""
+GCA Phase 8: The Resident Server
+--------------------------------
+Loads GPT-2, the basis, the registry and the probes once, then serves the
+route -> tune -> generate -> moral -> tool pipeline over HTTP/1.1 (TCP or
+a Unix socket) without paying model startup per prompt.
+1. POST /v1/run {"prompt": ..., "max_tokens": ...} -> GCAAgent.run as JSON.
+2. Admission control: a bounded queue in front of one model worker;
+   a full queue answers 503 with Retry-After instead of piling up latency.
+3. GET /healthz (process up), /readyz (models loaded, not draining;
+   "failed" with the error if loading raised),
+   /metrics (Prometheus text format, with the per-stage latency
+   histograms from gca_core.telemetry), /metrics.json (the histograms).
+
+    python gca_server.py --port 8080 --queue-size 32
+    python gca_server.py --unix /tmp/gca.sock
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import json
+import signal
+import time
+
+from gca_core.telemetry import TELEMETRY, log
+
+MAX_HEADER_BYTES = 64 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+
+class HTTPError(Exception):
+    def __init__(self, status, message, headers=None):
+        super().__init__(message)
+        self.status = status
+        self.headers = headers or {}
+
+def default_agent_factory():
+    # Imported here so the server module loads without torch until it starts
+    from gca_agent_final import GCAAgent
+    from gca_core.audit import AuditSink
+    return GCAAgent(audit=AuditSink.from_env())
+
+class GCAServer:
+    def __init__(self, agent_factory=default_agent_factory, host="127.0.0.1", port=8080, unix_path=None,
+                 queue_size=32, request_timeout=120.0, max_body=1024 * 1024):
+        self.agent_factory = agent_factory
+        self.host = host
+        self.port = port
+        self.unix_path = unix_path
+        self.queue_size = queue_size
+        self.request_timeout = request_timeout
+        self.max_body = max_body
+
+        self.agent = None
+        self.ready = False
+        self.load_error = None
+        self.draining = False
+        # The model is not thread-safe: one worker thread runs every pipeline call
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="gca-model")
+        self._queue = None
+        self._server = None
+        self._worker = None
+        self._loader = None
+        self.started = time.time()
+
+        # Metrics
+        self.requests = {}  # (path, status) -> count
+        self.rejected = 0
+        self.timeouts = 0
+        self.in_flight = 0
+        self.completed = 0
+        self.latency_sum = 0.0
+        self.queue_wait_sum = 0.0
+        self.load_seconds = None
+
+    # --- Lifecycle ---
+
+    async def start(self):
+        """Starts listening right away (healthz works); readyz turns 200 once models load."""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        if self.unix_path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.unix_path)
+            print(f"[🌐] Listening on unix:{self.unix_path}")
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+            self.port = self._server.sockets[0].getsockname()[1]
+            print(f"[🌐] Listening on http://{self.host}:{self.port}")
+        self._loader = asyncio.ensure_future(self._load())
+        self._worker = asyncio.ensure_future(self._work())
+
+    async def _load(self):
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        try:
+            self.agent = await loop.run_in_executor(self._executor, self.agent_factory)
+        except Exception as e:
+            self.load_error = f"{type(e).__name__}: {e}"
+            log.error("[❌] Model load failed: %s", self.load_error, exc_info=True)
+            return
+        self.load_seconds = time.perf_counter() - start
+        self.ready = True
+        print(f"[✅] Models loaded in {self.load_seconds:.1f}s. Ready.")
+
+    async def close(self, drain_timeout=30.0):
+        """
+        Stops accepting, lets queued requests finish (up to drain_timeout), then
+        shuts down. A model call still running at the deadline gets up to
+        drain_timeout more before the agent (and its audit trail) is closed.
+        """
+        self.draining = True
+        deadline = time.monotonic() + drain_timeout
+        if self._server is not None:
+            self._server.close()
+            try:
+                # On 3.12+ this also waits for idle keep-alive clients, so it shares the deadline
+                await asyncio.wait_for(self._server.wait_closed(), drain_timeout)
+            except asyncio.TimeoutError:
+                pass
+        if self._queue is not None and self.ready:
+            try:
+                await asyncio.wait_for(self._queue.join(), max(0.0, deadline - time.monotonic()))
+            except asyncio.TimeoutError:
+                pass
+        for task in (self._worker, self._loader):
+            if task is not None:
+                task.cancel()
+        # Drop calls that never started, then wait for the running one: cancelling
+        # the worker does not stop its thread, and closing the agent underneath it
+        # would cut off its audit record
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(loop.run_in_executor(None, self._executor.shutdown, True),
+                                   max(0.0, deadline - time.monotonic()) + drain_timeout)
+        except asyncio.TimeoutError:
+            log.warning("[⚠️] Model call still running after the drain deadline; its audit record may be dropped")
+        close_agent = getattr(self.agent, "close", None)
+        if close_agent is not None:
+            close_agent()  # Flushes the moral audit trail
+
+    async def serve_forever(self):
+        await self.start()
+        stop = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        await stop.wait()
+        print("[🛑] Draining...")
+        await self.close()
+
+    # --- Model worker ---
+
+    async def _work(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            payload, future, enqueued = await self._queue.get()
+            try:
+                if future.done():
+                    continue  # Client gave up while queued
+                self.queue_wait_sum += time.perf_counter() - enqueued
+                self.in_flight += 1
+                try:
+                    result = await loop.run_in_executor(
+                        self._executor, lambda: self.agent.run(payload["prompt"], max_tokens=payload.get("max_tokens")))
+                    if not future.done():
+                        future.set_result(result)
+                except Exception as e:
+                    if not future.done():
+                        future.set_exception(e)
+                finally:
+                    self.in_flight -= 1
+            finally:
+                self._queue.task_done()
+
+    async def submit(self, payload):
+        """Admits one pipeline call or raises HTTPError(503) when the queue is full."""
+        if not self.ready or self.draining:
+            raise HTTPError(503, "not ready", {"Retry-After": "1"})
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((payload, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise HTTPError(503, "admission queue full", {"Retry-After": "1"})
+        start = time.perf_counter()
+        try:
+            result = await asyncio.wait_for(asyncio.shield(future), self.request_timeout)
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            future.cancel()  # The worker skips it if it has not started yet
+            raise HTTPError(504, "pipeline timed out")
+        self.completed += 1
+        self.latency_sum += time.perf_counter() - start
+        return result
+
+    # --- HTTP ---
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HTTPError as e:
+                    await self._respond(writer, e.status, {"error": str(e)}, e.headers, close=True)
+                    return
+                if request is None:
+                    return
+                method, path, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                try:
+                    status, payload, extra = await self._route(method, path, body)
+                except HTTPError as e:
+                    status, payload, extra = e.status, {"error": str(e)}, e.headers
+                except Exception as e:
+                    status, payload, extra = 500, {"error": str(e)}, {}
+                self.requests[(path, status)] = self.requests.get((path, status), 0) + 1
+                await self._respond(writer, status, payload, extra, close=not keep_alive)
+                if not keep_alive:
+                    return
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None  # Client closed between requests
+        except asyncio.LimitOverrunError:
+            raise HTTPError(413, "headers too large")
+        if len(head) > MAX_HEADER_BYTES:
+            raise HTTPError(413, "headers too large")
+        lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = lines[0].split(" ", 2)
+        except ValueError:
+            raise HTTPError(400, "malformed request line")
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        try:
+            length = int(headers.get("content-length", "0") or 0)
+        except ValueError:
+            raise HTTPError(400, "bad Content-Length")
+        if length > self.max_body:
+            raise HTTPError(413, "body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], headers, body
+
+    async def _respond(self, writer, status, payload, headers=None, close=False):
+        if isinstance(payload, str):
+            body, content_type = payload.encode("utf-8"), "text/plain; version=0.0.4"
+        else:
+            body, content_type = json.dumps(payload).encode("utf-8"), "application/json"
+        lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+                 f"Content-Type: {content_type}",
+                 f"Content-Length: {len(body)}",
+                 f"Connection: {'close' if close else 'keep-alive'}"]
+        lines += [f"{k}: {v}" for k, v in (headers or {}).items()]
+        writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _route(self, method, path, body):
+        if path == "/healthz":
+            return 200, {"status": "ok"}, {}
+        if path == "/readyz":
+            if self.ready and not self.draining:
+                return 200, {"status": "ready"}, {}
+            if self.load_error is not None:
+                return 503, {"status": "failed", "error": self.load_error}, {}
+            return 503, {"status": "draining" if self.draining else "loading"}, {}
+        if path == "/metrics":
+            return 200, self.metrics(), {}
+        if path == "/metrics.json":
+            return 200, {"stages": TELEMETRY.to_json()}, {}
+        if path == "/v1/run":
+            if method != "POST":
+                raise HTTPError(405, "use POST")
+            try:
+                payload = json.loads(body or b"{}")
+            except ValueError:
+                raise HTTPError(400, "body must be JSON")
+            if not isinstance(payload, dict) or not isinstance(payload.get("prompt"), str):
+                raise HTTPError(400, "missing 'prompt'")
+            return 200, await self.submit(payload), {}
+        raise HTTPError(404, f"no route for {path}")
+
+    def metrics(self):
+        """Prometheus text exposition of the server counters."""
+        lines = [
+            "# TYPE gca_requests_total counter",
+            *(f'gca_requests_total{{path="{p}",status="{s}"}} {n}' for (p, s), n in sorted(self.requests.items())),
+            "# TYPE gca_admission_rejected_total counter",
+            f"gca_admission_rejected_total {self.rejected}",
+            "# TYPE gca_pipeline_timeouts_total counter",
+            f"gca_pipeline_timeouts_total {self.timeouts}",
+            "# TYPE gca_queue_depth gauge",
+            f"gca_queue_depth {self._queue.qsize() if self._queue is not None else 0}",
+            "# TYPE gca_queue_capacity gauge",
+            f"gca_queue_capacity {self.queue_size}",
+            "# TYPE gca_in_flight gauge",
+            f"gca_in_flight {self.in_flight}",
+            "# TYPE gca_ready gauge",
+            f"gca_ready {int(self.ready and not self.draining)}",
+            "# TYPE gca_pipeline_seconds summary",
+            f"gca_pipeline_seconds_sum {self.latency_sum:.6f}",
+            f"gca_pipeline_seconds_count {self.completed}",
+            "# TYPE gca_queue_wait_seconds_total counter",
+            f"gca_queue_wait_seconds_total {self.queue_wait_sum:.6f}",
+            "# TYPE gca_uptime_seconds gauge",
+            f"gca_uptime_seconds {time.time() - self.started:.1f}",
+        ]
+        if self.load_seconds is not None:
+            lines += ["# TYPE gca_model_load_seconds gauge", f"gca_model_load_seconds {self.load_seconds:.3f}"]
+        return "\n".join(lines) + "\n" + TELEMETRY.to_prometheus()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--unix", default=None, help="Serve on a Unix socket instead of TCP")
+    parser.add_argument("--queue-size", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=120.0, help="Per-request pipeline timeout (s)")
+    args = parser.parse_args()
+
+    print("="*60)
+    print("GCA v1.3: The Resident Server")
+    print("="*60)
+    server = GCAServer(host=args.host, port=args.port, unix_path=args.unix,
+                       queue_size=args.queue_size, request_timeout=args.timeout)
+    asyncio.run(server.serve_forever())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import json
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from gca_agent_final import GCAAgent
+from gca_core.audit import AuditSink, JSONLAuditWriter
+from gca_core.moral import Action, EntropyClass, MoralKernel
+from gca_moral import MoralCalculator, Action as PilotAction, EntropyClass as PilotEntropy
+
+def sql_action(entropy=EntropyClass.REVERSIBLE):
+    return Action("execute_SQL", "SELECT 1", 0.3, 0.9, 0.2, 1.0, 1, entropy)
+
+class TestAuditSink(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_sqlite_records_kernel_decisions(self):
+        path = os.path.join(self.tmp.name, "audit.db")
+        sink = AuditSink.sqlite(path, flush_interval=60)
+        kernel = MoralKernel(audit=sink)
+
+        kernel.evaluate([sql_action()])
+        kernel.evaluate([sql_action(EntropyClass.IRREVERSIBLE)])
+        kernel.evaluate_many([[sql_action()]])
+        sink.close()  # Guaranteed flush
+
+        rows = sqlite3.connect(path).execute(
+            "SELECT kernel, approved, score, threshold, reason, actions FROM audit ORDER BY id").fetchall()
+        self.assertEqual([r[1] for r in rows], [1, 0, 1])
+        self.assertEqual(rows[1][3], 0.5)
+        self.assertEqual(rows[1][4], "Moral vector exceeds threshold")
+        self.assertEqual(json.loads(rows[0][5])[0]["entropy_class"], "REVERSIBLE")
+        self.assertEqual(sink.stats()["written"], 3)
+
+    def test_generator_plans_keep_their_actions(self):
+        path = os.path.join(self.tmp.name, "audit.jsonl")
+        sink = AuditSink.jsonl(path, flush_interval=60)
+        action = PilotAction("generate_text", "hello", 0.1, 1.0, 0.1, 1.0, 1, PilotEntropy.REVERSIBLE)
+        MoralCalculator(audit=sink).evaluate_plan(a for a in [action, action])
+        risky = sql_action(EntropyClass.IRREVERSIBLE)
+        MoralKernel(audit=sink).evaluate(a for a in [risky, sql_action()])
+        sink.close()
+
+        with open(path) as f:
+            records = [json.loads(line) for line in f]
+        # The kernel rejects at the first action; the record holds only what was scored
+        self.assertEqual([len(r["actions"]) for r in records], [2, 1])
+        self.assertFalse(records[1]["approved"])
+        self.assertEqual(records[1]["score"], MoralKernel().calculate_moral_vector(risky))
+
+    def test_jsonl_rotation(self):
+        path = os.path.join(self.tmp.name, "audit.jsonl")
+        sink = AuditSink.jsonl(path, max_bytes=200, backups=2, batch_size=1, flush_interval=60)
+        calc = MoralCalculator(audit=sink)
+        action = PilotAction("generate_text", "hello", 0.5, 1.0, 0.1, 1.0, 1, PilotEntropy.REVERSIBLE)
+        for _ in range(5):
+            calc.evaluate_plan([action])
+            sink.flush()
+        sink.close()
+
+        self.assertTrue(os.path.exists(path + ".1"))
+        self.assertFalse(os.path.exists(path + ".3"))
+        with open(path + ".1") as f:
+            record = json.loads(f.readline())
+        self.assertEqual(record["kernel"], "MoralCalculator")
+        self.assertTrue(record["approved"])
+
+    def test_bounded_buffer_drops_and_counts(self):
+        path = os.path.join(self.tmp.name, "audit.jsonl")
+        sink = AuditSink.jsonl(path, capacity=2, flush_interval=60)
+        results = [sink.record([sql_action()], 0.1, 0.5, True, "ok") for _ in range(3)]
+        self.assertEqual(results, [True, True, False])
+        self.assertEqual(sink.stats()["dropped"], 1)
+        self.assertEqual(sink.stats()["high_watermark"], 2)
+        sink.close()
+        self.assertEqual(sink.stats()["written"], 2)
+        self.assertFalse(sink.record([sql_action()], 0.1, 0.5, True, "ok"))
+
+    def test_from_env_selects_backend_and_path(self):
+        base = os.path.join(self.tmp.name, "trail.jsonl")
+        with patch.dict(os.environ, {"GCA_AUDIT": "off"}):
+            self.assertIsNone(AuditSink.from_env())
+        with patch.dict(os.environ, {"GCA_AUDIT": "bogus"}):
+            with self.assertRaises(ValueError):
+                AuditSink.from_env()
+        with patch.dict(os.environ, {"GCA_AUDIT": "jsonl", "GCA_AUDIT_PATH": base}):
+            sink = AuditSink.from_env(suffix=".replica1")
+        sink.close()
+        self.assertIsInstance(sink.writer, JSONLAuditWriter)
+        self.assertEqual(sink.writer.path, os.path.join(self.tmp.name, "trail.replica1.jsonl"))
+
+    def test_pilot_persists_batch_decisions(self):
+        from gca_core.testing import tiny_basis, tiny_model, tiny_tokenizer
+        from gca_pilot_v2 import GCAPilotV2
+
+        path = os.path.join(self.tmp.name, "audit.db")
+        model = tiny_model()
+        pilot = GCAPilotV2.from_components(model, tiny_tokenizer(), tiny_basis(model.config.hidden_size),
+                                           load_probe=False, skills={"NONE": {"vector_idx": None, "strength": 0.0}},
+                                           audit=AuditSink.sqlite(path, flush_interval=60))
+        with patch("gca_pilot_v2.GENERATE_TOKENS", 2), patch('builtins.print'):
+            pilot.execute_batch(["delete everything", "select name from users"])
+        pilot.close()
+
+        rows = sqlite3.connect(path).execute("SELECT kernel, approved FROM audit ORDER BY id").fetchall()
+        self.assertEqual(rows, [("MoralCalculator", 0), ("MoralCalculator", 1)])
+
+    def test_agent_tool_call_is_audited(self):
+        path = os.path.join(self.tmp.name, "audit.db")
+        tools = MagicMock()
+        tools.query_database.return_value = "[('Alice',)]"
+        agent = GCAAgent(glassbox=MagicMock(), memory=MagicMock(), optimizer=MagicMock(), tools=tools,
+                         probe=False, audit=AuditSink.sqlite(path, flush_interval=60))
+        agent.think = lambda prompt: ("SQL", None, 4.0, None)
+        agent.generate = lambda prompt, vec, strength, max_tokens=None: (prompt, "SQL", "SELECT name FROM users;")
+
+        result = agent.run("SELECT name FROM users;")
+        agent.close()
+
+        self.assertTrue(result["approved"])
+        self.assertEqual(result["output"], "[('Alice',)]")
+        rows = sqlite3.connect(path).execute("SELECT kernel, approved FROM audit").fetchall()
+        self.assertEqual(rows, [("MoralKernel", 1)])
+
+if __name__ == '__main__':
+    unittest.main()
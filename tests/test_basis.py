@@ -0,0 +1,65 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.basis import basis_hash, load_basis, project, reproject_registry, save_basis
+
+class TestBasisVersioning(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "universal_basis.pt")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_legacy_tensor_file(self):
+        basis = torch.randn(16, 32)
+        torch.save(basis, self.path)
+        loaded, meta = load_basis(self.path, map_location="cpu")
+        self.assertTrue(torch.equal(loaded, basis))
+        self.assertEqual(meta["version"], 0)
+        self.assertEqual(meta["hash"], basis_hash(basis))
+
+    def test_rebuild_bumps_version(self):
+        first = save_basis(torch.randn(16, 32), self.path)
+        second = save_basis(torch.randn(16, 32), self.path)
+        self.assertEqual((first["version"], second["version"]), (1, 2))
+        self.assertNotEqual(first["hash"], second["hash"])
+
+        _, meta = load_basis(self.path, map_location="cpu")
+        self.assertEqual(meta, second)
+
+class TestReprojection(unittest.TestCase):
+    def test_batched_reprojection_matches_single(self):
+        old_basis, new_basis = torch.randn(16, 32), torch.randn(16, 32)
+        old_meta = {"version": 1, "hash": basis_hash(old_basis)}
+        new_meta = {"version": 2, "hash": basis_hash(new_basis)}
+
+        means = {name: torch.randn(32) for name in ("SQL", "CORPORATE", "POETRY")}
+        registry = {
+            name: {"vector_coeffs": project(mean, old_basis).tolist(), "raw_mean": mean.tolist(),
+                   "basis_version": 1, "basis_hash": old_meta["hash"]}
+            for name, mean in means.items()
+        }
+        registry["LEGACY"] = {"vector_coeffs": [0.0] * 16}
+
+        names, missing = reproject_registry(registry, new_basis, new_meta)
+
+        self.assertEqual(sorted(names), ["CORPORATE", "POETRY", "SQL"])
+        self.assertEqual(missing, ["LEGACY"])
+        for name, mean in means.items():
+            expected = project(mean, new_basis)
+            self.assertTrue(torch.allclose(torch.tensor(registry[name]["vector_coeffs"]), expected, atol=1e-6))
+            self.assertEqual(registry[name]["basis_version"], 2)
+            self.assertEqual(registry[name]["basis_hash"], new_meta["hash"])
+
+        # Already current: nothing to do
+        self.assertEqual(reproject_registry(registry, new_basis, new_meta), ([], ["LEGACY"]))
+
+if __name__ == "__main__":
+    unittest.main()
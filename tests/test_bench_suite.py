@@ -0,0 +1,50 @@
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+import suite
+
+def report(**medians):
+    return {"meta": {}, "results": {name: {"median": m} for name, m in medians.items()}}
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def test_compare_flags_regressions_beyond_tolerance(self):
+        baseline = report(fast=0.010, slow=0.100, gone=0.05, tiny=0.0001)
+        current = report(fast=0.0105, slow=0.150, tiny=0.0003)
+        status = {row[0]: row[4] for row in suite.compare(baseline, current, tolerance=0.10)}
+        self.assertEqual(status, {"fast": "ok", "slow": "regression", "gone": "missing", "tiny": "ok"})
+
+        current = report(fast=0.005, slow=0.100, gone=0.05, tiny=0.0001)
+        status = {row[0]: row[4] for row in suite.compare(baseline, current, tolerance=0.10)}
+        self.assertEqual(status["fast"], "improvement")
+
+    def test_run_suite_filter(self):
+        result = suite.run_suite("moral_evaluate_plan", repeats=2, warmup=0, verbose=False)
+        self.assertEqual(list(result["results"]), ["moral_evaluate_plan"])
+        self.assertGreater(result["results"]["moral_evaluate_plan"]["median"], 0)
+        self.assertEqual(result["meta"]["threads"], 1)
+
+    def test_learn_skill_restores_registry_path(self):
+        import gca_school
+        before = gca_school.REGISTRY_PATH
+        result = suite.run_suite("learn_skill", repeats=1, warmup=0, verbose=False)
+        self.assertIn("learn_skill", result["results"])
+        self.assertEqual(gca_school.REGISTRY_PATH, before)
+
+    def test_compare_exit_code(self):
+        with tempfile.TemporaryDirectory() as tmp, patch('builtins.print'):
+            base, now = os.path.join(tmp, "base.json"), os.path.join(tmp, "now.json")
+            suite.save(report(x=0.010), base)
+            suite.save(report(x=0.020), now)
+            self.assertEqual(suite.main(["compare", base, now]), 1)
+            suite.save(report(x=0.0101), now)
+            self.assertEqual(suite.main(["compare", base, now]), 0)
+
+if __name__ == '__main__':
+    unittest.main()
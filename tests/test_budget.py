@@ -0,0 +1,117 @@
+import os
+import sys
+import threading
+import time
+import unittest
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.budget import AdmissionController, MemoryBudgetExceeded, MemoryModel, measure
+from gca_core.testing import tiny_model
+
+class TestMemoryModel(unittest.TestCase):
+    def setUp(self):
+        self.mm = MemoryModel.from_model(tiny_model())
+
+    def test_estimate_grows_with_batch_length_and_new_tokens(self):
+        base = self.mm.estimate(1, 16, 8)
+        self.assertEqual(self.mm.estimate(4, 16, 8)["kv"], 4 * base["kv"])
+        self.assertGreater(self.mm.estimate(1, 32, 8)["activations"], 2 * base["activations"])
+        self.assertGreater(self.mm.estimate(1, 16, 64)["kv"], base["kv"])
+        self.assertEqual(self.mm.estimate(1, 16, 64)["activations"], base["activations"])
+        self.assertGreater(base["total"], base["kv"] + base["activations"] + base["logits"])
+
+    def test_measure_reports_peak(self):
+        with measure("cpu") as used:
+            block = torch.ones(4 * 1024 * 1024)  # 16 MB
+            del block
+        self.assertGreater(used["seconds"], 0)
+        if used["rss_peak_delta"] is not None:
+            self.assertGreater(used["rss_peak_delta"], 8 * 1024 * 1024)
+        self.assertIsNone(used["tensor_peak"])
+        self.assertFalse(used["approximate"])
+
+    def test_overlapping_measurements_are_approximate(self):
+        with measure("cpu") as outer:
+            with measure("cpu") as inner:
+                pass
+        self.assertTrue(outer["approximate"])
+        self.assertTrue(inner["approximate"])
+        with measure("cpu") as alone:
+            pass
+        self.assertFalse(alone["approximate"])
+
+class TestAdmission(unittest.TestCase):
+    def setUp(self):
+        self.mm = MemoryModel.from_model(tiny_model())
+        # Room for about three 10-token prompts at once
+        budget = self.mm.estimate(3, 10, 8)["total"]
+        self.ctl = AdmissionController(self.mm, budget, max_wait=1.0)
+
+    def test_plan_splits_by_length_and_rejects_oversized(self):
+        lens = [10, 200, 4, 9, 10, 3]
+        chunks, rejected = self.ctl.plan(lens, 8)
+
+        self.assertEqual(rejected, [1])
+        self.assertEqual(sorted(i for chunk in chunks for i in chunk), [0, 2, 3, 4, 5])
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            longest = max(lens[i] for i in chunk)
+            self.assertLessEqual(self.ctl.estimate(len(chunk), longest, 8), self.ctl.budget_bytes)
+        self.assertEqual(chunks[0][:2], [5, 2])  # Shortest rows pad together
+        self.assertEqual((self.ctl.splits, self.ctl.rejected), (1, 1))
+
+    def test_reserve_delays_until_budget_is_released(self):
+        held = threading.Event()
+
+        def holder():
+            with self.ctl.reserve(self.ctl.budget_bytes):
+                held.set()
+                time.sleep(0.1)
+
+        thread = threading.Thread(target=holder)
+        thread.start()
+        held.wait()
+        start = time.perf_counter()
+        with self.ctl.reserve(1):
+            waited = time.perf_counter() - start
+        thread.join()
+
+        self.assertGreater(waited, 0.05)
+        self.assertEqual(self.ctl.delayed, 1)
+        self.assertEqual(self.ctl.stats()["reserved_bytes"], 0)
+        self.assertEqual(self.ctl.peak_reserved, self.ctl.budget_bytes)
+
+    def test_reserve_rejects_oversized_and_times_out(self):
+        with self.assertRaises(MemoryBudgetExceeded):
+            with self.ctl.reserve(self.ctl.budget_bytes + 1):
+                pass
+        with self.ctl.reserve(self.ctl.budget_bytes):
+            with self.assertRaises(MemoryBudgetExceeded):
+                with self.ctl.reserve(1, timeout=0.01):
+                    pass
+        self.assertEqual(self.ctl.rejected, 2)
+
+    def test_rejections_are_counted_across_threads(self):
+        lens = [10, 200, 4]
+
+        def worker():
+            for _ in range(200):
+                self.ctl.plan(lens, 8)
+                try:
+                    with self.ctl.reserve(self.ctl.budget_bytes + 1):
+                        pass
+                except MemoryBudgetExceeded:
+                    pass
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.ctl.stats()["rejected"], 4 * 200 * 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import sys
+import unittest
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.detector import ToolCallDetector, ToolCallStoppingCriteria
+from gca_core.glassbox import GlassBox
+from gca_core.testing import tiny_model, tiny_tokenizer
+
+def feed_pieces(text, size):
+    detector = ToolCallDetector()
+    for i in range(0, len(text), size):
+        if detector.feed(text[i:i + size]):
+            return detector, i + size
+    return detector, None
+
+class TestToolCallDetector(unittest.TestCase):
+    def test_python_block_split_anywhere(self):
+        text = "Sure.\n```python\nprint(2 + 2)\n```\nand then some more words"
+        for size in (1, 2, 3, 7):
+            detector, consumed = feed_pieces(text, size)
+            self.assertEqual(detector.call, ("PYTHON", "print(2 + 2)"), size)
+            # Stops right after the closing fence, not at the end of the text
+            self.assertLess(consumed, len(text) - 10)
+
+    def test_sql_statement(self):
+        text = "Plan: sElEcT name FROM users WHERE active = 1; then summarize."
+        for size in (1, 4, 100):
+            detector, _ = feed_pieces(text, size)
+            self.assertEqual(detector.call, ("SQL", "sElEcT name FROM users WHERE active = 1;"))
+
+    def test_incomplete_or_non_calls(self):
+        for text in ("```python\nprint(1)\n", "SELECT name FROM users", "SELECT 1; nothing else", "selected items;"):
+            detector, consumed = feed_pieces(text, 3)
+            self.assertIsNone(detector.call, text)
+            self.assertIsNone(consumed)
+
+    def test_sql_after_non_query_select(self):
+        detector, _ = feed_pieces("SELECT 1; now SELECT * FROM logs;", 5)
+        self.assertEqual(detector.call, ("SQL", "SELECT * FROM logs;"))
+
+    def test_sql_inside_code_block_belongs_to_python(self):
+        text = "```python\nq = 'SELECT * FROM t;'\nprint(q)\n```"
+        detector, _ = feed_pieces(text, 2)
+        self.assertEqual(detector.call[0], "PYTHON")
+
+class TestToolCallStoppingCriteria(unittest.TestCase):
+    def setUp(self):
+        self.tokenizer = tiny_tokenizer()
+
+    def test_criteria_decodes_token_stream(self):
+        detector = ToolCallDetector()
+        criteria = ToolCallStoppingCriteria(self.tokenizer, detector)
+        prompt = self.tokenizer("we need", return_tensors="pt").input_ids
+        generated = self.tokenizer("select name from users ; print", return_tensors="pt").input_ids
+        stops = []
+        for t in range(generated.shape[1]):
+            ids = torch.cat([prompt, generated[:, :t + 1]], dim=1)
+            stops.append(bool(criteria(ids, None)[0]))
+        self.assertEqual(stops, [False, False, False, False, True, True])
+        self.assertEqual(detector.call, ("SQL", "select name from users ;"))
+
+    def test_generate_steered_stops_early(self):
+        gb = GlassBox.__new__(GlassBox)
+        gb.tokenizer = self.tokenizer
+        gb.model = tiny_model()
+        gb.layer_idx = 6
+
+        # Script the model: each decoding step emits the next word of `script`
+        script = self.tokenizer("select name from users ; print we need we need", return_tensors="pt").input_ids[0]
+        steps = []
+
+        def scripted(module, input, output):
+            logits = torch.full_like(output, -1e4)
+            logits[:, -1, script[min(len(steps), len(script) - 1)]] = 0.0
+            steps.append(None)
+            return logits
+
+        handle = gb.model.lm_head.register_forward_hook(scripted)
+        try:
+            prompt = "we need"
+            full = gb.generate_steered(prompt, torch.zeros(64), 1.0, max_tokens=len(script))
+            steps.clear()
+            detector = ToolCallDetector()
+            short = gb.generate_steered(prompt, torch.zeros(64), 1.0, max_tokens=len(script),
+                                        stopping_criteria=[ToolCallStoppingCriteria(self.tokenizer, detector)])
+        finally:
+            handle.remove()
+
+        self.assertEqual(full, "we need select name from users ; print we need we need")
+        # The real criteria stopped decoding at the detector's boundary: the closing ';'
+        self.assertEqual(detector.call, ("SQL", "select name from users ;"))
+        self.assertEqual(short, "we need select name from users ;")
+        self.assertEqual(len(steps), 5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core import fileio
+from gca_core.tools import ToolBox
+
+class TestFileIO(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "app.log")
+        with open(self.path, 'w') as f:
+            f.write("".join(f"line {i}\n" for i in range(1000)))
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_range_reads(self):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        self.assertEqual(fileio.read_range(self.path, 100, 50), data[100:150])
+        self.assertEqual(fileio.read_range(self.path, len(data) - 5), data[-5:])
+        self.assertEqual(fileio.read_range(self.path, len(data) + 10, 5), b"")
+
+        empty = os.path.join(self.tmp.name, "empty")
+        open(empty, 'w').close()
+        self.assertEqual(fileio.read_range(empty), b"")
+        self.assertEqual(fileio.read_tail(empty), b"")
+
+    def test_tail(self):
+        self.assertEqual(fileio.read_tail(self.path, 2), b"line 998\nline 999\n")
+        with open(self.path, 'a') as f:
+            f.write("partial")
+        self.assertEqual(fileio.read_tail(self.path, 2), b"line 999\npartial")
+        self.assertEqual(len(fileio.read_tail(self.path, 5000).splitlines()), 1001)
+
+    def test_iter_lines(self):
+        lines = fileio.iter_lines(self.path)
+        self.assertEqual(next(lines), "line 0\n")
+        self.assertEqual(sum(1 for _ in lines), 999)
+
+    def test_atomic_write_replaces_and_keeps_mode(self):
+        os.chmod(self.path, 0o640)
+        written = fileio.atomic_write(self.path, (f"row {i}\n" for i in range(3)))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "row 0\nrow 1\nrow 2\n")
+        self.assertEqual(written, 18)
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+        self.assertEqual(os.listdir(self.tmp.name), ["app.log"])
+
+    def test_atomic_write_follows_symlinks(self):
+        link = os.path.join(self.tmp.name, "current.log")
+        os.symlink(self.path, link)
+        fileio.atomic_write(link, "rotated\n")
+        self.assertTrue(os.path.islink(link))
+        with open(self.path) as f:
+            self.assertEqual(f.read(), "rotated\n")
+
+    @unittest.skipUnless(hasattr(os, "geteuid") and os.geteuid() == 0, "chown to another user needs root")
+    def test_atomic_write_keeps_owner(self):
+        os.chown(self.path, 1234, 5678)
+        fileio.atomic_write(self.path, "new")
+        st = os.stat(self.path)
+        self.assertEqual((st.st_uid, st.st_gid), (1234, 5678))
+
+    def test_interrupted_write_leaves_original(self):
+        def chunks():
+            yield "half a new file"
+            raise KeyboardInterrupt
+
+        with self.assertRaises(KeyboardInterrupt):
+            fileio.atomic_write(self.path, chunks())
+        self.assertEqual(fileio.read_range(self.path, 0, 7), b"line 0\n")
+        self.assertEqual(os.listdir(self.tmp.name), ["app.log"])
+
+        with patch("gca_core.fileio.os.replace", side_effect=OSError("disk gone")):
+            with self.assertRaises(OSError):
+                fileio.atomic_write(self.path, "new")
+        self.assertEqual(fileio.read_range(self.path, 0, 7), b"line 0\n")
+
+    def test_file_op(self):
+        tools = ToolBox()
+        self.assertEqual(tools.file_op("TAIL", self.path, lines=1), "line 999\n")
+        self.assertEqual(tools.file_op("READ_RANGE", self.path, offset=7, length=7), "line 1\n")
+        self.assertEqual(tools.file_op("TAIL", os.path.join(self.tmp.name, "nope")), "FILE_ERROR: Not found.")
+
+        target = os.path.join(self.tmp.name, "out.txt")
+        self.assertEqual(tools.file_op("WRITE", target, "hello"), "FILE_SUCCESS: Written.")
+        self.assertEqual(tools.file_op("READ", target), "hello")
+        self.assertEqual(list(tools.iter_file_lines(target)), ["hello"])
+
+if __name__ == '__main__':
+    unittest.main()
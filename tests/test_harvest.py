@@ -0,0 +1,64 @@
+import os
+import sys
+import unittest
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.cpu import partition_cores
+from gca_core.harvest import ParallelHarvester, harvest_batches
+from gca_core.testing import tiny_model, tiny_tokenizer
+
+PROMPTS = [
+    "select * from users where age > 18 ;",
+    "we need to leverage our core competencies",
+    "write a python function to merge sort a list",
+    "once upon a time",
+    "the quick brown fox jumps over the lazy dog",
+    "let's circle back on this offline",
+] * 6
+
+class TestPartitionCores(unittest.TestCase):
+    def test_disjoint_slices(self):
+        slices = partition_cores(3, cores=range(8))
+        self.assertEqual(slices, [[0, 1, 2], [3, 4, 5], [6, 7]])
+
+    def test_more_workers_than_cores(self):
+        self.assertEqual(partition_cores(3, cores=[0, 1]), [[0], [1], [0]])
+
+class TestParallelHarvester(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.tokenizer = tiny_tokenizer()
+        cls.model = tiny_model()
+
+    def test_serial_shape(self):
+        states = harvest_batches(self.model, self.tokenizer, PROMPTS[:5], batch_size=2, device="cpu")
+        self.assertEqual(tuple(states.shape), (5, self.model.config.hidden_size))
+
+    def test_shards_are_batch_aligned(self):
+        harvester = ParallelHarvester(self.model, self.tokenizer, num_workers=2, batch_size=4)
+        shards = harvester._shards(PROMPTS)
+        self.assertTrue(all(len(s) % 4 == 0 for s in shards[:-1]))
+        self.assertEqual(sum(shards, []), PROMPTS)
+
+    def test_parallel_matches_serial_order(self):
+        serial = harvest_batches(self.model, self.tokenizer, PROMPTS, batch_size=4, device="cpu")
+        with ParallelHarvester(self.model, self.tokenizer, num_workers=2, batch_size=4) as harvester:
+            parallel = harvester.harvest(PROMPTS)
+        self.assertTrue(torch.equal(serial, parallel))
+
+    def test_cartographer_close_stops_cached_pools(self):
+        from gca_cartographer import GCACartographer
+        cart = GCACartographer.__new__(GCACartographer)
+        cart.tokenizer, cart.model, cart._harvesters = self.tokenizer, self.model, {}
+        with cart:
+            cart.harvest_states(PROMPTS, batch_size=4, num_workers=2)
+            workers = list(cart._harvesters[(2, 4)]._pool._pool)
+            self.assertTrue(all(w.is_alive() for w in workers))
+        self.assertEqual(cart._harvesters, {})
+        self.assertFalse(any(w.is_alive() for w in workers))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "benchmarks"))
+
+import loadgen
+from gca_core.telemetry import span
+
+SERVICE = 0.02
+
+def fake_pipeline(prompt):
+    with span("generate"):
+        time.sleep(SERVICE)
+    return prompt
+
+class TestPromptMix(unittest.TestCase):
+    def test_school_examples_feed_the_mix(self):
+        import gca_school
+        from gca_core.testing import tiny_basis, tiny_model, tiny_tokenizer
+
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = os.path.join(tmp, "skill_registry.json")
+            school = gca_school.GCASchool.__new__(gca_school.GCASchool)
+            school.tokenizer, school.model = tiny_tokenizer(), tiny_model()
+            school.tokenizer.pad_token = school.tokenizer.eos_token
+            school.basis, school.basis_meta = tiny_basis(), {"version": 1, "hash": "x"}
+            school._harvesters = {}
+            examples = ["select name from users", "select count(*) from sales"]
+            with patch.object(gca_school, "REGISTRY_PATH", registry), patch('builtins.print'):
+                school.learn_skill("SQL", examples)
+
+            with open(registry) as f:
+                self.assertEqual(json.load(f)["SQL"]["examples"], examples)
+            mix = loadgen.load_mix(registry)
+        self.assertEqual(mix["SQL"], examples)
+        self.assertIn("NONE", mix)  # Fallback skills stay in the mix
+
+        sampler = loadgen.PromptMix(mix, seed=1)
+        drawn = [sampler.sample() for _ in range(200)]
+        self.assertEqual({skill for skill, _ in drawn}, set(mix))
+        self.assertTrue(all(prompt in mix[skill] for skill, prompt in drawn))
+
+class TestLoad(unittest.TestCase):
+    def setUp(self):
+        self.target = loadgen.LocalTarget(fake_pipeline)
+        self.mix = loadgen.PromptMix({"A": ["a"], "B": ["b"]})
+
+    def tearDown(self):
+        self.target.close()
+
+    def test_closed_loop_queueing_and_saturation(self):
+        async def sweep():
+            return [await loadgen.run_level(self.target, self.mix, concurrency=c, requests=12) for c in (1, 3)]
+
+        one, three = asyncio.run(sweep())
+        self.assertEqual(one["completed"], 12)
+        self.assertEqual(one["stages"]["generate"]["count"], 12)
+        # One model thread: more clients only add queueing
+        self.assertLess(one["queue_wait"]["p50"], SERVICE / 2)
+        self.assertGreater(three["queue_wait"]["p50"], SERVICE)
+        self.assertGreater(three["latency"]["p50"], 2 * one["latency"]["p50"])
+        self.assertGreater(three["utilization"], 0.8)
+        self.assertIs(loadgen.saturation([one, three]), three)
+
+    def test_open_loop_overload(self):
+        async def level(rate):
+            return await loadgen.run_level(self.target, self.mix, rate=rate, requests=15)
+
+        light = asyncio.run(level(5))
+        heavy = asyncio.run(level(500))  # 25x what one 20ms thread can serve
+        self.assertEqual(light["completed"], 15)
+        self.assertLess(light["queue_wait"]["p95"], 3 * SERVICE)
+        self.assertGreater(heavy["latency"]["p99"], 10 * SERVICE)
+        self.assertIsNone(loadgen.saturation([light]))
+        self.assertIs(loadgen.saturation([heavy]), heavy)
+
+if __name__ == '__main__':
+    unittest.main()
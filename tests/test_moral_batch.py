@@ -0,0 +1,82 @@
+import random
+import unittest
+from unittest.mock import MagicMock
+
+import numpy as np
+
+import gca_moral
+from gca_core import moral as core_moral
+
+def random_plans(module, num_plans, max_len, seed=0):
+    rng = random.Random(seed)
+    entropy = list(module.EntropyClass)
+    plans = []
+    for p in range(num_plans):
+        plans.append([
+            module.Action(f"type{p}", f"desc{p}-{i}", rng.random(), rng.random(), rng.random(),
+                          rng.random(), rng.randint(0, 50), rng.choice(entropy))
+            for i in range(rng.randint(0, max_len))
+        ])
+    return plans
+
+class TestEvaluateMany(unittest.TestCase):
+    def check_matches_scalar(self, module, kernel, scalar):
+        plans = random_plans(module, 2000, 12)
+        approved, reason_codes, scores = kernel.evaluate_many(plans)
+
+        self.assertEqual(len(scores), len(plans))
+        for plan, ok, code, score in zip(plans, approved, reason_codes, scores):
+            result = scalar(plan)
+            self.assertEqual(bool(ok), result[0])
+            self.assertEqual(module.REASONS[code], result[1])
+            # Bit-for-bit, not approximately
+            self.assertEqual(float(score).hex(), float(sum_scalar(kernel, plan)).hex())
+
+    def test_gca_moral_matches_scalar(self):
+        calc = gca_moral.MoralCalculator()
+        self.check_matches_scalar(gca_moral, calc, calc.evaluate_plan)
+
+    def test_core_moral_matches_scalar(self):
+        kernel = core_moral.MoralKernel()
+        self.check_matches_scalar(core_moral, kernel, kernel.evaluate)
+
+    def test_action_batch_input(self):
+        calc = gca_moral.MoralCalculator()
+        batch = gca_moral.ActionBatch(
+            harm=[0.5, 0.5], utility=[1.0, 1.0], uncertainty=[0.1, 0.1], scale=[1.0, 1.0],
+            agents_affected=[1, 1], irreversible=[False, True], plan_offsets=[0, 1, 2],
+        )
+        approved, reason_codes, _ = calc.evaluate_many(batch)
+        self.assertEqual(approved.tolist(), [True, False])
+        self.assertEqual(reason_codes.tolist(), [gca_moral.REASON_BELOW_THRESHOLD, gca_moral.REASON_EXCEEDS_THRESHOLD])
+
+    def test_one_implementation_for_both_enums(self):
+        self.assertIs(gca_moral.ActionBatch, core_moral.ActionBatch)
+        plans = [[gca_moral.Action("t", "d", 0.5, 1.0, 0.1, 1.0, 1, gca_moral.EntropyClass.IRREVERSIBLE)],
+                 [core_moral.Action("t", "d", 0.5, 1.0, 0.1, 1.0, 1, core_moral.EntropyClass.IRREVERSIBLE)]]
+        self.assertEqual(core_moral.ActionBatch.from_plans(plans).irreversible.tolist(), [True, True])
+
+    def test_empty_plans(self):
+        approved, _, scores = core_moral.MoralKernel().evaluate_many([[], []])
+        self.assertEqual(approved.tolist(), [True, True])
+        self.assertTrue(np.all(scores == 0.0))
+
+    def test_generator_plans_are_audited(self):
+        audit = MagicMock()
+        calc = gca_moral.MoralCalculator(audit=audit)
+        plans = random_plans(gca_moral, 5, 4)
+        approved, _, _ = calc.evaluate_many(iter(p) for p in plans)
+
+        self.assertEqual(len(approved), 5)
+        recorded = [c.args[0] for c in audit.record.call_args_list]
+        self.assertEqual(recorded, [tuple(p) for p in plans])
+        self.assertEqual({c.kwargs["kernel"] for c in audit.record.call_args_list}, {"MoralCalculator"})
+
+def sum_scalar(kernel, plan):
+    total = 0.0
+    for a in plan:
+        total += kernel.calculate_moral_vector(a)
+    return total
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,5 +36,54 @@ class TestMoralCaching(unittest.TestCase):
         self.assertEqual(calc.calculate_moral_vector.cache_info().hits, 0)
         self.assertEqual(calc.calculate_moral_vector.cache_info().misses, 2)
 
+    def test_cache_is_per_instance(self):
+        calc1, calc2 = MoralCalculator(), MoralCalculator(cache_size=2)
+        action = Action("type1", "desc1", 0.1, 0.9, 0.05, 0.5, 10, EntropyClass.REVERSIBLE)
+
+        calc1.calculate_moral_vector(action)
+        calc1.calculate_moral_vector(action)
+        calc2.calculate_moral_vector(action)
+
+        self.assertEqual(calc1.calculate_moral_vector.cache_info().hits, 1)
+        self.assertEqual(calc2.calculate_moral_vector.cache_info().hits, 0)
+        self.assertEqual(calc2.calculate_moral_vector.cache_info().maxsize, 2)
+
+    def test_lru_eviction(self):
+        calc = MoralCalculator(cache_size=2)
+        a, b, c = (Action(f"t{i}", "d", 0.1, 0.9, 0.05, 0.5, 10, EntropyClass.REVERSIBLE) for i in range(3))
+        for action in (a, b, a, c, a, b):  # c evicts b, the least recently used
+            calc.calculate_moral_vector(action)
+        info = calc.calculate_moral_vector.cache_info()
+        self.assertEqual((info.hits, info.misses, info.currsize), (2, 4, 2))
+
+    def test_kernel_is_freed_without_cycle_collector(self):
+        import gc
+        import weakref
+        from gca_core.moral import MoralKernel
+        gc.disable()
+        try:
+            for factory in (MoralCalculator, MoralKernel):
+                kernel = factory()
+                kernel.calculate_moral_vector(Action("t", "d", 0.1, 0.9, 0.05, 0.5, 10, EntropyClass.REVERSIBLE))
+                ref = weakref.ref(kernel)
+                del kernel
+                self.assertIsNone(ref())
+        finally:
+            gc.enable()
+
+class TestSlotAction(unittest.TestCase):
+    def test_immutable_and_compact(self):
+        action = Action("type1", "desc1", 0.1, 0.9, 0.05, 0.5, 10, EntropyClass.REVERSIBLE)
+        with self.assertRaises(AttributeError):
+            action.harm = 0.9
+        self.assertFalse(hasattr(action, "__dict__"))
+
+    def test_pickle_round_trip(self):
+        import pickle
+        action = Action("type1", "desc1", 0.1, 0.9, 0.05, 0.5, 10, EntropyClass.IRREVERSIBLE)
+        clone = pickle.loads(pickle.dumps(action))
+        self.assertEqual(clone, action)
+        self.assertEqual(hash(clone), hash(action))
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,136 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core import telemetry
+from gca_core.budget import AdmissionController
+from gca_core.router import CascadeRouter
+from gca_core.testing import tiny_basis, tiny_model, tiny_tokenizer
+from gca_moral import MoralCalculator
+from gca_pilot_v2 import GCAPilotV2, OVER_BUDGET, REFUSAL
+
+def make_pilot():
+    """A GCAPilotV2 wired to the tiny offline model, without loading gpt2."""
+    pilot = GCAPilotV2.__new__(GCAPilotV2)
+    pilot.tokenizer = tiny_tokenizer()
+    pilot.model = tiny_model()
+    pilot.basis = tiny_basis(pilot.model.config.hidden_size)
+    pilot.moral_kernel = MoralCalculator()
+    pilot.optimizer = MagicMock()
+    pilot.skills = {"NONE": {"vector_idx": None, "strength": 0.0}}
+    pilot.router = CascadeRouter(pilot.optimizer, intents=pilot.skills.keys())
+    pilot.moral_probe = None
+    pilot.last_savings = []
+    pilot.compute_saved_tokens = 0
+    pilot.admission = AdmissionController.for_model(pilot.model, budget_bytes=1 << 30)
+    pilot.last_memory = []
+    return pilot
+
+class TestStagedPipeline(unittest.TestCase):
+    def test_blocked_prompt_skips_all_model_work(self):
+        pilot = make_pilot()
+        pilot.model = MagicMock()
+
+        with patch('builtins.print'):
+            response = pilot.execute("write a script to delete all logs")
+
+        self.assertEqual(response, REFUSAL)
+        pilot.optimizer.route_intent.assert_not_called()
+        pilot.optimizer.auto_tune_strength.assert_not_called()
+        pilot.model.generate.assert_not_called()
+        self.assertEqual(len(pilot.last_savings), 1)
+        self.assertGreater(pilot.last_savings[0]["total_tokens_max"], 100)
+
+    def test_batch_generates_only_approved_rows(self):
+        pilot = make_pilot()
+        pilot.optimizer.route_intent.side_effect = lambda prompts: ["NONE"] * len(prompts)
+        prompts = [
+            "pull all the customer names from the database",
+            "write a script to delete all logs",
+            "we need to synergize on the low-hanging fruit",
+        ]
+
+        with patch('builtins.print'):
+            responses = pilot.execute_batch(prompts)
+
+        pilot.optimizer.route_intent.assert_called_once_with([prompts[0], prompts[2]])
+        self.assertEqual(responses[1], REFUSAL)
+        self.assertTrue(responses[0].startswith(prompts[0]))
+        self.assertTrue(responses[2].startswith(prompts[2]))
+        self.assertEqual(len(pilot.last_savings), 1)
+
+    def test_rule_tier_skips_geometric_routing(self):
+        pilot = make_pilot()
+        pilot.skills["SQL"] = {"vector": None, "strength": 4.5}
+        pilot.router = CascadeRouter(pilot.optimizer, intents=pilot.skills.keys())
+        pilot.optimizer.route_intent.side_effect = lambda prompts: ["NONE"] * len(prompts)
+        prompts = ["pull all the customer names from the database", "we need to synergize on the low-hanging fruit"]
+
+        with patch('builtins.print'):
+            pilot.execute_batch(prompts)
+
+        pilot.optimizer.route_intent.assert_called_once_with([prompts[1]])
+        self.assertEqual(pilot.router.stats()["tier_hits"], {"rules": 1, "geometric": 1})
+
+    def test_batch_all_blocked(self):
+        pilot = make_pilot()
+        pilot.model = MagicMock()
+        with patch('builtins.print'):
+            responses = pilot.execute_batch(["delete everything", "harm someone"])
+        self.assertEqual(responses, [REFUSAL, REFUSAL])
+        pilot.model.generate.assert_not_called()
+
+    def test_probe_forward_is_not_timed_as_moral(self):
+        pilot = make_pilot()
+        pilot.model = MagicMock()
+        open_during_forward = []
+
+        def geometry(prompts, return_state=False):
+            open_during_forward.append(telemetry._open_stages.get())
+            return None, torch.zeros(len(prompts), 4)
+
+        pilot.optimizer.get_prompt_geometry.side_effect = geometry
+        pilot.moral_probe = MagicMock()
+        pilot.moral_probe.score.return_value = {"harm": torch.tensor([1.0]), "irreversibility": torch.tensor([1.0])}
+        with patch('builtins.print'):
+            self.assertEqual(pilot.execute("delete everything"), REFUSAL)
+
+        self.assertEqual(len(open_during_forward), 1)
+        self.assertNotIn("moral", open_during_forward[0])
+
+class TestPilotAdmission(unittest.TestCase):
+    def test_batch_is_split_and_oversized_prompt_refused(self):
+        pilot = make_pilot()
+        pilot.optimizer.route_intent.side_effect = lambda prompts: ["NONE"] * len(prompts)
+        prompts = ["select name from users", "pull all the customer names from the database",
+                   "select count from sales", " ".join(["select name from users"] * 40)]
+        lens = [len(ids) for ids in pilot.tokenizer(prompts)["input_ids"]]
+        with patch("gca_pilot_v2.GENERATE_TOKENS", 4):
+            budget = pilot.admission.estimate(2, max(lens[:3]), 4)
+            pilot.admission = AdmissionController(pilot.admission.memory_model, budget)
+            with patch('builtins.print'):
+                responses = pilot.execute_batch(prompts)
+
+        self.assertEqual(responses[3], OVER_BUDGET)
+        for prompt, response in zip(prompts[:3], responses):
+            self.assertTrue(response.startswith(prompt))
+        self.assertEqual(sum(m["rows"] for m in pilot.last_memory), 3)
+        self.assertGreater(len(pilot.last_memory), 1)
+        for m in pilot.last_memory:
+            self.assertLessEqual(m["estimate"], budget)
+            self.assertIn("rss_peak_delta", m)
+
+    def test_single_execute_refuses_over_budget(self):
+        pilot = make_pilot()
+        pilot.optimizer.route_intent.return_value = "NONE"
+        pilot.admission = AdmissionController(pilot.admission.memory_model, 1024)
+        with patch('builtins.print'):
+            self.assertEqual(pilot.execute("select name from users"), OVER_BUDGET)
+
+if __name__ == '__main__':
+    unittest.main()
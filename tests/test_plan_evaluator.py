@@ -0,0 +1,47 @@
+import unittest
+
+from gca_core.moral import Action, EntropyClass, MoralKernel
+
+def step(i, entropy=EntropyClass.REVERSIBLE):
+    return Action("execute_SQL", f"step {i}", 0.3, 0.9, 0.2, 1.0, 1, entropy)
+
+class TestPlanEvaluator(unittest.TestCase):
+    def test_early_rejection_stops_consuming_plan(self):
+        kernel = MoralKernel()
+        produced = []
+
+        def planner():
+            yield step(0, EntropyClass.IRREVERSIBLE)  # 0.76 on its own
+            for i in range(1, 100):
+                produced.append(i)
+                yield step(i)
+
+        evaluator = kernel.plan_evaluator().feed(planner())
+
+        self.assertTrue(evaluator.rejected)
+        self.assertEqual(evaluator.steps, 1)
+        self.assertEqual(produced, [])
+        self.assertEqual(evaluator.result(), (False, "Moral vector exceeds threshold"))
+        self.assertFalse(evaluator.add(step(1)))
+        self.assertEqual(evaluator.steps, 1)
+
+    def test_incremental_matches_batch(self):
+        kernel = MoralKernel()
+        plan = [step(0)]
+        evaluator = kernel.plan_evaluator()
+        for action in plan:
+            self.assertTrue(evaluator.add(action))
+
+        _, _, scores = kernel.evaluate_many([plan])
+        self.assertEqual(evaluator.total, scores[0])
+        self.assertEqual(evaluator.result(), kernel.evaluate(plan))
+
+    def test_rejects_when_running_total_crosses(self):
+        kernel = MoralKernel()
+        evaluator = kernel.plan_evaluator()
+        self.assertTrue(evaluator.add(step(0)))   # ~0.38
+        self.assertFalse(evaluator.add(step(1)))  # ~0.76
+        self.assertFalse(evaluator.approved)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.probe import MoralProbe, fit_direction
+from gca_optimizer import GCAOptimizer
+from test_pilot_v2 import make_pilot
+
+class TestMoralProbe(unittest.TestCase):
+    def test_fit_direction_separates_classes(self):
+        torch.manual_seed(0)
+        shift = torch.zeros(32)
+        shift[3] = 5.0
+        positive = torch.randn(20, 32) + shift
+        negative = torch.randn(20, 32)
+
+        probe = MoralProbe({"harm": fit_direction(positive, negative),
+                            "irreversibility": fit_direction(negative, positive)}, device="cpu")
+        scores = probe.score(torch.cat([positive.mean(0, keepdim=True), negative.mean(0, keepdim=True)]))
+
+        self.assertGreater(scores["harm"][0].item(), 0.95)
+        self.assertLess(scores["harm"][1].item(), 0.05)
+        self.assertLess(scores["irreversibility"][0].item(), 0.05)
+
+    def test_load_missing_file(self):
+        self.assertIsNone(MoralProbe.load("does_not_exist.json"))
+
+class TestPilotLatentPreflight(unittest.TestCase):
+    def test_one_forward_serves_moral_and_routing(self):
+        pilot = make_pilot()
+        hidden = pilot.model.config.hidden_size
+        fires = {"direction": [1.0] + [0.0] * (hidden - 1), "bias": -1e6, "scale": 1.0}
+        harmless = {"direction": [1.0] + [0.0] * (hidden - 1), "bias": 1e6, "scale": 1.0}
+        pilot.moral_probe = MoralProbe({"harm": harmless, "irreversibility": harmless}, device="cpu")
+
+        optimizer = GCAOptimizer(pilot.model, pilot.tokenizer, pilot.basis)
+        optimizer.get_prompt_geometry = MagicMock(wraps=optimizer.get_prompt_geometry)
+        optimizer.route_intent = MagicMock()
+        pilot.optimizer = optimizer
+
+        with patch('builtins.print'):
+            responses = pilot.execute_batch(["pull all the customer names", "we need to synergize"])
+
+        optimizer.get_prompt_geometry.assert_called_once()
+        optimizer.route_intent.assert_not_called()
+        self.assertEqual(len(responses), 2)
+
+        # Harmful and irreversible according to the probes: blocked before routing
+        pilot.moral_probe = MoralProbe({"harm": fires, "irreversibility": fires}, device="cpu")
+        with patch('builtins.print'):
+            self.assertEqual(pilot.execute("pull all the customer names"),
+                             "I cannot fulfill this request due to ethical constraints.")
+        self.assertEqual(pilot.last_savings[0]["route_tokens"], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.glassbox import GlassBox
+from gca_core.profiling import TRACE_SUFFIX, RequestProfiler, hook_scope, profiled, rotate_traces
+from gca_core.testing import tiny_model, tiny_tokenizer
+
+class TestRequestProfiler(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.profiler = RequestProfiler(trace_dir=self.tmp.name, keep=2, top_n=5)
+        self.gb = GlassBox.__new__(GlassBox)
+        self.gb.tokenizer = tiny_tokenizer()
+        self.gb.model = tiny_model()
+        self.gb.layer_idx = 6
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def generate(self):
+        with patch("gca_core.profiling.PROFILER", self.profiler), patch("sys.stdout", io.StringIO()):
+            return self.gb.generate_steered("select name from users", torch.randn(64), 1.0, max_tokens=4)
+
+    def test_unsampled_calls_are_not_profiled(self):
+        self.generate()
+        self.assertEqual(self.profiler.captures, 0)
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+    def test_forced_capture_attributes_hooks_and_stages(self):
+        with self.profiler.forced():
+            self.generate()
+        self.assertEqual(self.profiler.captures, 1)
+        last = self.profiler.last
+        self.assertEqual(last["name"], "generate_steered")
+        self.assertLessEqual(len(last["top"]), 5)
+
+        with open(last["trace"]) as f:
+            names = {e.get("name") for e in json.load(f)["traceEvents"]}
+        for name in ("gca::generate_steered", "gca::steer_hook", "gca::tokenize", "gca::generate", "gca::decode"):
+            self.assertIn(name, names)
+
+    def test_nested_requests_share_one_capture(self):
+        @profiled("outer")
+        def outer():
+            return self.gb.generate_steered("select name from users", None, 0, max_tokens=2)
+
+        self.profiler.sample_rate = 1.0
+        with patch("gca_core.profiling.PROFILER", self.profiler), patch("sys.stdout", io.StringIO()):
+            outer()
+        self.assertEqual(self.profiler.captures, 1)
+        self.assertEqual(self.profiler.last["name"], "outer")
+
+    def test_rotation_keeps_newest(self):
+        for i in range(4):
+            path = os.path.join(self.tmp.name, f"t{i}{TRACE_SUFFIX}")
+            open(path, "w").close()
+            os.utime(path, (time.time() + i, time.time() + i))
+        deleted = rotate_traces(self.tmp.name, keep=2)
+        self.assertEqual(sorted(os.path.basename(p) for p in deleted), ["t0" + TRACE_SUFFIX, "t1" + TRACE_SUFFIX])
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+    def test_hook_scope_is_noop_without_profiler(self):
+        self.assertIsInstance(hook_scope("gca::x"), contextlib.nullcontext)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import concurrent.futures
+import os
+import sys
+import time
+import unittest
+from unittest.mock import patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.testing import tiny_basis, tiny_model, tiny_tokenizer
+from gca_pilot_v2 import REFUSAL
+from gca_replicas import PilotDispatcher
+
+class TestPilotDispatcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        model = tiny_model()
+        with patch('builtins.print'):
+            cls.dispatcher = PilotDispatcher(
+                num_replicas=2, max_batch=2, cores=[0], model=model, tokenizer=tiny_tokenizer(),
+                basis=tiny_basis(model.config.hidden_size), skills={"NONE": {"vector_idx": None, "strength": 0.0}},
+                load_probe=False, audit=False, memory_budget=1 << 30)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.dispatcher.close()
+
+    def test_batch_is_spread_and_ordered(self):
+        prompts = ["pull all the customer names from the database",
+                   "write a script to delete all logs",
+                   "we need to synergize on the low-hanging fruit",
+                   "i love programming",
+                   "what is the capital of france"]
+        responses = self.dispatcher.execute_batch(prompts)
+
+        self.assertEqual(len(responses), 5)
+        self.assertEqual(responses[1], REFUSAL)
+        for prompt, response in zip(prompts, responses):
+            if response != REFUSAL:
+                self.assertTrue(response.startswith(prompt))
+
+        stats = self.dispatcher.stats()
+        self.assertGreaterEqual(stats["prompts"], 5)
+        self.assertGreaterEqual(sum(r["tasks"] for r in stats["replicas"]), 3)  # 5 rows / max_batch 2
+        self.assertGreater(stats["throughput"], 0)
+        self.assertEqual([r["cores"] for r in stats["replicas"]], [[0], [0]])
+
+    def test_single_execute(self):
+        self.assertEqual(self.dispatcher.execute("delete everything"), REFUSAL)
+
+    def test_memory_budget_is_split(self):
+        self.assertEqual(self.dispatcher.replica_budget, (1 << 30) // 2)
+
+    def test_weights_are_shared(self):
+        self.assertTrue(all(p.is_shared() for p in self.dispatcher._shared_model.parameters()))
+
+class TestReplicaFailure(unittest.TestCase):
+    def test_dead_replica_fails_its_tasks(self):
+        model = tiny_model()
+        with patch('builtins.print'):
+            dispatcher = PilotDispatcher(
+                num_replicas=1, max_batch=32, cores=[0], model=model, tokenizer=tiny_tokenizer(),
+                basis=tiny_basis(model.config.hidden_size), skills={"NONE": {"vector_idx": None, "strength": 0.0}},
+                load_probe=False, audit=False, memory_budget=1 << 30)
+        try:
+            future = dispatcher.submit("execute_batch", ["i love programming"] * 32)
+            deadline = time.monotonic() + 30
+            while not dispatcher._running and time.monotonic() < deadline:
+                time.sleep(0.01)
+            with patch("gca_replicas.log"):
+                dispatcher._procs[0].kill()  # As the OOM killer would
+                with self.assertRaisesRegex(RuntimeError, "replica 0 exited"):
+                    future.result(timeout=30)
+            with self.assertRaisesRegex(RuntimeError, "no replicas left"):
+                dispatcher.submit("execute", "hello")
+            self.assertEqual(dispatcher.stats()["replicas"][0]["exitcode"], -9)
+        finally:
+            dispatcher.close()
+
+    def test_close_fails_pending_futures(self):
+        model = tiny_model()
+        with patch('builtins.print'):
+            dispatcher = PilotDispatcher(
+                num_replicas=1, max_batch=32, cores=[0], model=model, tokenizer=tiny_tokenizer(),
+                basis=tiny_basis(model.config.hidden_size), skills={"NONE": {"vector_idx": None, "strength": 0.0}},
+                load_probe=False, audit=False, memory_budget=1 << 30)
+        done = dispatcher.submit("execute", "i love programming")
+        lost = concurrent.futures.Future()
+        with dispatcher._lock:
+            dispatcher._pending[-1] = (lost, 1)  # A task no replica will answer
+        dispatcher.close()
+
+        self.assertTrue(done.result(timeout=0).startswith("i love programming"))
+        with self.assertRaisesRegex(RuntimeError, "dispatcher closed"):
+            lost.result(timeout=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.router import CascadeRouter, load_log
+
+def make_router(**kwargs):
+    optimizer = MagicMock()
+    optimizer.route_intent.side_effect = lambda prompts: ["CORPORATE" if "synergy" in p else "NONE" for p in prompts]
+    optimizer.route_geometry.side_effect = lambda prompts, geometry: ["NONE"] * len(prompts)
+    return CascadeRouter(optimizer, **kwargs), optimizer
+
+class TestCascadeRouter(unittest.TestCase):
+    def test_rules_decide_before_geometry(self):
+        router, optimizer = make_router()
+        prompts = ["SELECT name FROM users;", "write a poem about rain", "leverage synergy", "decode this"]
+        self.assertEqual(router.route(prompts), ["SQL", "POETRY", "CORPORATE", "NONE"])
+        optimizer.route_intent.assert_called_once_with(["leverage synergy", "decode this"])
+        stats = router.stats()
+        self.assertEqual(stats["tier_hits"], {"rules": 2, "geometric": 2})
+        self.assertEqual(stats["tier_hit_rate"]["rules"], 0.5)
+
+    def test_conflicting_rules_fall_through(self):
+        router, optimizer = make_router()
+        self.assertIsNone(router.match("write a python script to calculate pi"))
+        self.assertEqual(router.conflicts, 1)
+
+    def test_all_decided_never_calls_model(self):
+        router, optimizer = make_router()
+        router.route(["query the database", "solve this equation"])
+        optimizer.route_intent.assert_not_called()
+        optimizer.route_geometry.assert_not_called()
+
+    def test_precomputed_geometry_is_sliced(self):
+        router, optimizer = make_router()
+        geometry = torch.arange(6.0).reshape(3, 2)
+        router.route(["write a sonnet", "hello there", "good morning"], geometry)
+        args = optimizer.route_geometry.call_args[0]
+        self.assertEqual(args[0], ["hello there", "good morning"])
+        self.assertTrue(torch.equal(args[1], geometry[[1, 2]]))
+
+    def test_intents_filter(self):
+        router, _ = make_router(intents=["NONE", "SQL"])
+        self.assertEqual({intent for intent, _, _ in router.rules}, {"SQL"})
+
+    def test_learn_rules_from_log(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log_path = os.path.join(tmp, "routing.jsonl")
+            router, optimizer = make_router(log_path=log_path)
+            router.route([f"maximize synergy for team {i}" for i in range(6)] + ["hello world"] * 3)
+            pairs = load_log(log_path)
+            self.assertEqual(len(pairs), 9)
+
+            learned = router.learn_rules(pairs)
+            self.assertIn(("CORPORATE", r"\bsynergy\b"), learned)
+            self.assertNotIn("NONE", {intent for intent, _ in learned})
+
+            # Next time the learned rule answers without the model
+            optimizer.route_intent.reset_mock()
+            self.assertEqual(router.route(["more synergy please"]), ["CORPORATE"])
+            optimizer.route_intent.assert_not_called()
+
+            rules_path = os.path.join(tmp, "rules.json")
+            router.save_rules(rules_path)
+            self.assertIn(("CORPORATE", r"\bsynergy\b"), CascadeRouter.load_rules(rules_path))
+            with open(rules_path) as f:
+                self.assertEqual(len(json.load(f)), len(router.rules))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import os
+import sys
+import time
+import unittest
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_agent_final import GCAAgent
+from gca_core.moral import MoralKernel
+from gca_runtime import AgentRuntime
+
+MODEL_SECONDS = 0.05
+TOOL_SECONDS = 0.2
+
+class FakeTools:
+    def __init__(self):
+        self.calls = []
+
+    async def agather(self, calls, timeout=5):
+        self.calls += calls
+        await asyncio.sleep(TOOL_SECONDS)
+        return [f"[({len(self.calls)},)]"]
+
+def make_agent(harm=0.0):
+    agent = GCAAgent.__new__(GCAAgent)
+    agent.moral = MoralKernel()
+    agent.tools = FakeTools()
+    agent.preview_rows = 20
+    latent = {"harm": torch.tensor([harm]), "irreversibility": torch.tensor([0.0])}
+
+    def think(context):
+        time.sleep(MODEL_SECONDS)
+        return "SQL", None, 4.0, latent
+
+    def generate(context, vec, strength, max_tokens=None):
+        time.sleep(MODEL_SECONDS)
+        return context + " SELECT count(*) FROM users;", "SQL", "SELECT count(*) FROM users;"
+
+    agent.think = think
+    agent.generate = generate
+    return agent
+
+class TestAgentRuntime(unittest.TestCase):
+    def run_runtime(self, agent, prompts, max_steps):
+        runtime = AgentRuntime(agent, max_steps=max_steps)
+        sessions = asyncio.run(runtime.run(prompts))
+        runtime.close()
+        return runtime, sessions
+
+    def test_tools_overlap_with_model_work(self):
+        runtime, sessions = self.run_runtime(make_agent(), ["a", "b", "c"], max_steps=3)
+        report = runtime.report()
+
+        self.assertEqual([s.status for s in sessions], ["max_steps"] * 3)
+        self.assertEqual(report["steps"], 9)
+        serial = 9 * (2 * MODEL_SECONDS + TOOL_SECONDS)
+        self.assertLess(report["wall_seconds"], serial * 0.7)
+        self.assertGreater(report["tool_overlap"], 0.3)
+        self.assertAlmostEqual(report["model_busy_seconds"], 18 * MODEL_SECONDS, delta=0.2)
+        # Observations flow into the next step's context
+        self.assertIn("OBSERVATION:", sessions[0].context)
+
+    def test_plan_budget_spans_steps(self):
+        # 0.3 harm passes alone but two steps together exceed the threshold
+        runtime, sessions = self.run_runtime(make_agent(harm=0.3), ["a"], max_steps=4)
+        session = sessions[0]
+        self.assertEqual(session.status, "blocked")
+        self.assertEqual([r.approved for r in session.steps], [True, False])
+        self.assertIsNone(session.steps[1].output)
+        self.assertEqual(len(runtime.agent.tools.calls), 1)
+
+    def test_text_response_ends_session(self):
+        agent = make_agent()
+        agent.generate = lambda context, vec, strength, max_tokens=None: ("just words", "TEXT", "just words")
+        runtime, sessions = self.run_runtime(agent, ["a"], max_steps=4)
+        self.assertEqual(sessions[0].status, "done")
+        self.assertEqual(len(sessions[0].steps), 1)
+        self.assertEqual(sessions[0].steps[0].output, "just words")
+
+if __name__ == '__main__':
+    unittest.main()
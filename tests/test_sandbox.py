@@ -0,0 +1,51 @@
+import os
+import unittest
+
+from gca_core.sandbox import SandboxPool
+from gca_core.tools import ToolBox
+
+@unittest.skipUnless(os.name == "posix", "SandboxPool requires POSIX")
+class TestSandboxPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.pool = SandboxPool(size=1, max_runs=3, timeout=2)
+        cls.tools = ToolBox(sandbox=cls.pool)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_output_matches_subprocess_path(self):
+        plain = ToolBox()
+        for code in ("print(1 + 1)", "import sys; print('err', file=sys.stderr)", "1 / 0"):
+            self.assertEqual(self.tools.execute_python(code), plain.execute_python(code))
+
+    def test_fixed_workdir_and_fresh_globals(self):
+        self.tools.execute_python("x = 1")
+        self.assertIn("NameError", self.tools.execute_python("print(x)"))
+        self.assertEqual(self.tools.execute_python("import os; print(os.getcwd())").strip(),
+                         os.path.realpath(self.pool.workdir))
+
+    def test_snippet_side_effects_do_not_leak(self):
+        self.tools.execute_python("import builtins, os; builtins.print = None; os.chdir('/')")
+        self.assertEqual(self.tools.execute_python("import os; print(os.getcwd())").strip(),
+                         os.path.realpath(self.pool.workdir))
+        before = self.pool.stats()["recycled"]
+        self.tools.execute_python("import os; os.getpid = lambda: 0")
+        self.assertEqual(self.pool.stats()["recycled"], before + 1)
+        self.assertNotEqual(self.tools.execute_python("import os; print(os.getpid())").strip(), "0")
+
+    def test_timeout_recycles_worker(self):
+        before = self.pool.stats()["timeouts"]
+        result = self.tools.execute_python("while True: pass")
+        self.assertIn("timed out", result)
+        self.assertEqual(self.pool.stats()["timeouts"], before + 1)
+        self.assertEqual(self.tools.execute_python("print('ok')"), "ok\n")
+
+    def test_crash_and_max_runs_recycle(self):
+        self.assertIn("crashed", self.tools.execute_python("import os; os._exit(3)"))
+        pids = {self.tools.execute_python("import os; print(os.getpid())") for _ in range(4)}
+        self.assertEqual(len(pids), 2)  # Recycled after max_runs=3
+
+if __name__ == '__main__':
+    unittest.main()
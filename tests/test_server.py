@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from unittest.mock import MagicMock, patch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_server import GCAServer
+
+async def http(server, method, path, body=None):
+    if server.unix_path:
+        reader, writer = await asyncio.open_unix_connection(server.unix_path)
+    else:
+        reader, writer = await asyncio.open_connection(server.host, server.port)
+    data = json.dumps(body).encode() if body is not None else b""
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n"
+                 f"Content-Length: {len(data)}\r\n\r\n".encode() + data)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    status = int(head.split(b" ")[1])
+    return status, payload.decode()
+
+def make_agent(gate=None):
+    agent = MagicMock()
+
+    def run(prompt, max_tokens=None):
+        if gate is not None:
+            gate.wait(5)
+        return {"prompt": prompt, "skill": "SQL", "output": "[('Alice',)]"}
+
+    agent.run.side_effect = run
+    return agent
+
+class TestGCAServer(unittest.TestCase):
+    def run_server(self, scenario, **kwargs):
+        async def main():
+            server = GCAServer(port=0, **kwargs)
+            with patch('builtins.print'):
+                await server.start()
+                try:
+                    await server._loader
+                    return await scenario(server)
+                finally:
+                    await server.close(drain_timeout=1)
+        return asyncio.run(main())
+
+    def test_run_health_ready_metrics(self):
+        agent = make_agent()
+
+        async def scenario(server):
+            ok = await http(server, "POST", "/v1/run", {"prompt": "SELECT name FROM users;"})
+            return ok, await http(server, "GET", "/healthz"), await http(server, "GET", "/readyz"), \
+                await http(server, "GET", "/metrics"), await http(server, "GET", "/v1/run"), \
+                await http(server, "POST", "/v1/run", {"nope": 1})
+
+        ok, health, ready, metrics, wrong_method, bad = self.run_server(scenario, agent_factory=lambda: agent)
+        self.assertEqual(ok[0], 200)
+        self.assertEqual(json.loads(ok[1])["output"], "[('Alice',)]")
+        self.assertEqual(health[0], 200)
+        self.assertEqual(ready[0], 200)
+        self.assertIn('gca_requests_total{path="/v1/run",status="200"} 1', metrics[1])
+        self.assertIn("gca_pipeline_seconds_count 1", metrics[1])
+        self.assertIn("# TYPE gca_queue_wait_seconds_total counter", metrics[1])
+        self.assertEqual(wrong_method[0], 405)
+        self.assertEqual(bad[0], 400)
+        agent.run.assert_called_once_with("SELECT name FROM users;", max_tokens=None)
+
+    def test_not_ready_while_loading(self):
+        loaded = threading.Event()
+
+        def slow_factory():
+            loaded.wait(5)
+            return make_agent()
+
+        async def main():
+            server = GCAServer(agent_factory=slow_factory, port=0)
+            with patch('builtins.print'):
+                await server.start()
+                ready = await http(server, "GET", "/readyz")
+                health = await http(server, "GET", "/healthz")
+                run = await http(server, "POST", "/v1/run", {"prompt": "hi"})
+                loaded.set()
+                await server._loader
+                after = await http(server, "GET", "/readyz")
+                await server.close(drain_timeout=1)
+            return ready, health, run, after
+
+        ready, health, run, after = asyncio.run(main())
+        self.assertEqual((ready[0], health[0], run[0], after[0]), (503, 200, 503, 200))
+
+    def test_failed_load_is_reported(self):
+        def broken_factory():
+            raise FileNotFoundError("universal_basis.pt")
+
+        async def scenario(server):
+            return await http(server, "GET", "/readyz"), await http(server, "POST", "/v1/run", {"prompt": "hi"})
+
+        with patch("gca_server.log") as log:
+            ready, run = self.run_server(scenario, agent_factory=broken_factory)
+        self.assertEqual(ready[0], 503)
+        self.assertEqual(json.loads(ready[1]), {"status": "failed", "error": "FileNotFoundError: universal_basis.pt"})
+        self.assertEqual(run[0], 503)
+        log.error.assert_called_once()
+
+    def test_admission_queue_rejects_when_full(self):
+        gate = threading.Event()
+        agent = make_agent(gate)
+
+        async def scenario(server):
+            first = asyncio.ensure_future(http(server, "POST", "/v1/run", {"prompt": "a"}))
+            await asyncio.sleep(0.2)  # Running on the model worker
+            second = asyncio.ensure_future(http(server, "POST", "/v1/run", {"prompt": "b"}))
+            await asyncio.sleep(0.2)  # Waiting in the queue (capacity 1)
+            third = await http(server, "POST", "/v1/run", {"prompt": "c"})
+            gate.set()
+            return await first, await second, third, server.rejected
+
+        first, second, third, rejected = self.run_server(scenario, agent_factory=lambda: agent, queue_size=1)
+        self.assertEqual((first[0], second[0], third[0]), (200, 200, 503))
+        self.assertEqual(rejected, 1)
+
+    def test_close_waits_for_running_call(self):
+        gate = threading.Event()
+        agent = make_agent(gate)
+        events = []
+        run = agent.run.side_effect
+        agent.run.side_effect = lambda prompt, max_tokens=None: (run(prompt, max_tokens), events.append("run"))[0]
+        agent.close.side_effect = lambda: events.append("close")
+
+        async def main():
+            server = GCAServer(agent_factory=lambda: agent, port=0)
+            with patch('builtins.print'):
+                await server.start()
+                await server._loader
+                request = asyncio.ensure_future(http(server, "POST", "/v1/run", {"prompt": "a"}))
+                await asyncio.sleep(0.2)  # Running on the model worker
+                threading.Timer(0.6, gate.set).start()
+                await server.close(drain_timeout=0.4)  # The queue drain times out first
+                request.cancel()
+
+        asyncio.run(main())
+        self.assertEqual(events, ["run", "close"])
+
+    def test_unix_socket(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "gca.sock")
+
+            async def scenario(server):
+                return await http(server, "POST", "/v1/run", {"prompt": "x"})
+
+            status, body = self.run_server(scenario, agent_factory=make_agent, unix_path=path)
+        self.assertEqual(status, 200)
+        self.assertEqual(json.loads(body)["prompt"], "x")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import os
+import sys
+import unittest
+from types import SimpleNamespace
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.glassbox import GlassBox
+from gca_core.sessions import SessionStore, cache_bytes, move_cache, steering_key
+from gca_core.testing import tiny_model, tiny_tokenizer
+
+def make_glassbox(store=None):
+    gb = GlassBox.__new__(GlassBox)
+    gb.tokenizer = tiny_tokenizer()
+    gb.model = tiny_model()
+    gb.layer_idx = 6
+    gb.sessions = store or SessionStore(device="cpu")
+    return gb
+
+class TestSessionGeneration(unittest.TestCase):
+    def setUp(self):
+        self.gb = make_glassbox()
+        self.vec = torch.randn(64)
+
+    def test_second_turn_prefills_only_new_tokens(self):
+        self.gb.generate_session("a", "select name from users", self.vec, 1.0, max_tokens=5)
+        session = self.gb.sessions.get("a")
+        history = session.input_ids.shape[1]
+        self.assertEqual(session.cached_tokens, history - 1)
+
+        self.gb.generate_session("a", "where age > 18", self.vec, 1.0, max_tokens=5)
+        self.assertEqual(session.turns, 2)
+        self.assertEqual(session.reused_tokens, history - 1)
+        # Turn 2 prefills the last token of turn 1 plus the four new words
+        self.assertEqual(session.prefilled_tokens, 4 + 1 + 4)
+
+    def test_cached_state_matches_full_forward(self):
+        self.gb.generate_session("a", "select name from users", self.vec, 1.0, max_tokens=5)
+        session = self.gb.sessions.get("a")
+        ids = session.input_ids
+        with self.gb._steering(self.vec, 1.0), torch.no_grad():
+            cached = self.gb.model(ids[:, -1:], past_key_values=session.cache).logits[0, -1]
+            full = self.gb.model(ids).logits[0, -1]
+        self.assertTrue(torch.allclose(cached, full, atol=1e-4))
+
+    def test_steering_change_resets_cache(self):
+        self.gb.generate_session("a", "select name from users", self.vec, 1.0, max_tokens=3)
+        history = self.gb.sessions.get("a").input_ids.shape[1]
+        self.gb.generate_session("a", "where age > 18", self.vec, 2.0, max_tokens=3)
+
+        session = self.gb.sessions.get("a")
+        self.assertEqual(self.gb.sessions.steering_resets, 1)
+        self.assertEqual(session.reused_tokens, 0)
+        self.assertEqual(session.prefilled_tokens, 4 + history + 4)
+        self.assertEqual(session.steering, steering_key(self.vec, 2.0))
+
+    def test_long_history_is_truncated(self):
+        limit = self.gb.model.config.max_position_embeddings - 10
+        text = " ".join(["users"] * 120)
+        self.gb.generate_session("a", text, None, 0, max_tokens=10)
+        self.gb.generate_session("a", text, None, 0, max_tokens=10)
+        session = self.gb.sessions.get("a")
+        self.assertEqual(self.gb.sessions.truncations, 1)
+        self.assertLessEqual(session.input_ids.shape[1], limit + 10)
+
+class TestSessionStore(unittest.TestCase):
+    def test_lru_eviction_under_budget(self):
+        gb = make_glassbox()
+        gb.generate_session("a", "select name from users", None, 0, max_tokens=3)
+        per_session = gb.sessions.get("a").nbytes
+        gb.sessions.device_budget = int(per_session * 2.5)
+
+        gb.generate_session("b", "select name from users", None, 0, max_tokens=3)
+        gb.generate_session("c", "select name from users", None, 0, max_tokens=3)
+        store = gb.sessions
+        self.assertIsNone(store.get("a").cache)  # Least recently used
+        self.assertIsNotNone(store.get("b").cache)
+        self.assertIsNotNone(store.get("c").cache)
+        self.assertEqual(store.stats()["evictions"], 1)
+
+        # The evicted session still has its ids: the next turn re-prefills
+        history = store.get("a").input_ids.shape[1]
+        gb.generate_session("a", "where age > 18", None, 0, max_tokens=3)
+        self.assertEqual(store.get("a").prefilled_tokens, 4 + history + 4)
+
+    def test_spill_to_host(self):
+        gb = make_glassbox()
+        gb.generate_session("a", "select name from users", None, 0, max_tokens=3)
+        nbytes = cache_bytes(gb.sessions.get("a").cache)
+
+        # Pretend the device is separate memory to exercise the spill path
+        store = SessionStore(device_budget=nbytes, host_budget=nbytes * 10, device="meta")
+        a, b = store.get("a"), store.get("b")
+        store.checkin(a, None, gb.sessions.get("a").cache, None)
+        store.checkin(b, None, None, None)
+        b.location, b.nbytes = "device", nbytes  # b's turn pushes the device over budget
+        store._enforce_budget()
+        self.assertEqual(a.location, "host")
+        self.assertEqual(store.spills, 1)
+        self.assertEqual(a.cache.layers[0].keys.device.type, "cpu")
+
+    def test_legacy_and_unknown_cache_layouts(self):
+        legacy = SimpleNamespace(key_cache=[torch.zeros(1, 2, 3, 4), []], value_cache=[torch.zeros(1, 2, 3, 4), []])
+        self.assertEqual(cache_bytes(legacy), 2 * 24 * 4)
+        move_cache(legacy, "meta")
+        self.assertEqual(legacy.value_cache[0].device.type, "meta")
+        with self.assertRaises(TypeError):
+            cache_bytes(((torch.zeros(1), torch.zeros(1)),))
+
+    def test_max_sessions(self):
+        store = SessionStore(device="cpu", max_sessions=2)
+        for sid in ("a", "b", "c"):
+            store.get(sid)
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.evictions, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import io
+import json
+import logging
+import os
+import sys
+import unittest
+from unittest.mock import MagicMock, patch
+
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.telemetry import TELEMETRY, Histogram, Telemetry, configure_logging, log
+from gca_optimizer import GCAOptimizer, DEVICE
+
+class TestHistogram(unittest.TestCase):
+    def test_quantiles_within_bucket_bounds(self):
+        hist = Histogram(buckets=(0.01, 0.1, 1.0))
+        for value in [0.005] * 50 + [0.05] * 45 + [0.5] * 5:
+            hist.observe(value)
+        self.assertEqual(hist.counts, [50, 45, 5, 0])
+        self.assertLessEqual(hist.quantile(0.5), 0.01)
+        self.assertTrue(0.01 <= hist.quantile(0.95) <= 0.1)
+        self.assertTrue(0.1 <= hist.quantile(0.99) <= 0.5)
+        self.assertAlmostEqual(hist.as_dict()["mean"], (0.25 + 2.25 + 2.5) / 100)
+
+    def test_overflow_bucket_caps_at_max(self):
+        hist = Histogram(buckets=(0.01,))
+        hist.observe(3.0)
+        self.assertTrue(0.01 < hist.quantile(0.99) < 3.0)
+        self.assertEqual(hist.quantile(1.0), 3.0)
+
+class TestTelemetry(unittest.TestCase):
+    def test_span_records_once_per_stage(self):
+        telemetry = Telemetry(enabled=True)
+        with telemetry.span("route"):
+            with telemetry.span("route"):
+                with telemetry.span("tokenize"):
+                    pass
+        self.assertEqual(telemetry.histogram("route").count, 1)
+        self.assertEqual(telemetry.histogram("tokenize").count, 1)
+
+    def test_span_records_on_error(self):
+        telemetry = Telemetry(enabled=True)
+        with self.assertRaises(ValueError):
+            with telemetry.span("tool", tool="SQL"):
+                raise ValueError("boom")
+        self.assertEqual(telemetry.histogram("tool", tool="SQL").count, 1)
+        self.assertIsNone(telemetry.histogram("tool"))
+
+    def test_disabled_is_noop(self):
+        telemetry = Telemetry(enabled=False)
+        with telemetry.span("generate"):
+            pass
+        self.assertEqual(telemetry.to_json(), [])
+
+    def test_exports(self):
+        telemetry = Telemetry(enabled=True, buckets=(0.1, 1.0))
+        telemetry.observe("generate", 0.05)
+        telemetry.observe("generate", 0.5)
+        telemetry.observe("tool", 2.0, tool="PYTHON")
+
+        text = telemetry.to_prometheus()
+        self.assertIn("# TYPE gca_stage_seconds histogram", text)
+        self.assertIn('gca_stage_seconds_bucket{stage="generate",le="0.1"} 1', text)
+        self.assertIn('gca_stage_seconds_bucket{stage="generate",le="+Inf"} 2', text)
+        self.assertIn('gca_stage_seconds_count{stage="tool",tool="PYTHON"} 1', text)
+
+        records = json.loads(json.dumps(telemetry.to_json()))
+        self.assertEqual([(r["stage"], r["labels"], r["count"]) for r in records],
+                         [("generate", {}, 2), ("tool", {"tool": "PYTHON"}, 1)])
+
+class TestLogging(unittest.TestCase):
+    def tearDown(self):
+        configure_logging()
+
+    def test_levels(self):
+        out = io.StringIO()
+        with patch("sys.stdout", out):
+            configure_logging("OFF")
+            log.info("hidden")
+            log.error("hidden")
+            configure_logging("DEBUG")
+            log.debug("shown")
+        self.assertEqual(out.getvalue(), "shown\n")
+        self.assertEqual(log.level, logging.DEBUG)
+
+class TestInstrumentedRouting(unittest.TestCase):
+    def test_route_intent_spans_without_console_output(self):
+        optimizer = GCAOptimizer(MagicMock(), MagicMock(), MagicMock())
+        optimizer.get_prompt_geometry = MagicMock(return_value=torch.randn(3, 16, device=DEVICE))
+        TELEMETRY.reset()
+        out = io.StringIO()
+        with patch("sys.stdout", out):
+            configure_logging("INFO")
+            optimizer.route_intent(["a", "b", "c"])
+        self.assertEqual(out.getvalue(), "")  # Per-prompt lines are DEBUG
+        self.assertEqual(TELEMETRY.histogram("route").count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import os
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gca_core.toolcache import ToolCache
+from gca_core.tools import ToolBox
+
+class TestToolCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "demo.db")
+        self.tools = ToolBox(cache_size=8)
+        self.tools.query_database("CREATE TABLE users (name TEXT, active BOOLEAN)", self.db)
+        self.tools.query_database("INSERT INTO users VALUES ('Alice', 1), ('Bob', 0)", self.db)
+
+    def tearDown(self):
+        self.tools.close()
+        self.tmp.cleanup()
+
+    def test_repeated_select_hits(self):
+        q = "SELECT name FROM users WHERE active = 1"
+        self.assertEqual(self.tools.query_database(q, self.db), "[('Alice',)]")
+        self.assertEqual(self.tools.query_database(q, self.db), "[('Alice',)]")
+        stats = self.tools.cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+
+    def test_write_through_toolbox_invalidates(self):
+        q = "SELECT count(*) FROM users"
+        self.tools.query_database(q, self.db)
+        self.tools.query_database("INSERT INTO users VALUES ('Carol', 1)", self.db)
+        self.assertEqual(self.tools.cache.stats()["invalidations"], 1)
+        self.assertEqual(self.tools.query_database(q, self.db), "[(3,)]")
+
+    def test_external_write_is_detected(self):
+        q = "SELECT count(*) FROM users"
+        self.assertEqual(self.tools.query_database(q, self.db), "[(2,)]")
+        conn = sqlite3.connect(self.db)
+        conn.execute("INSERT INTO users VALUES ('Dave', 0)")
+        conn.commit()
+        conn.close()
+        self.assertEqual(self.tools.query_database(q, self.db), "[(3,)]")
+        self.assertEqual(self.tools.cache.stats()["stale"], 1)
+
+    def test_volatile_queries_and_errors_are_not_cached(self):
+        self.tools.query_database("SELECT random()", self.db)
+        self.tools.query_database("SELECT * FROM missing", self.db)
+        self.assertEqual(len(self.tools.cache), 0)
+
+    def test_file_reads(self):
+        path = os.path.join(self.tmp.name, "notes.txt")
+        self.assertEqual(self.tools.file_op("READ", path), "FILE_ERROR: Not found.")
+        self.tools.file_op("WRITE", path, "v1")
+        self.assertEqual(self.tools.file_op("READ", path), "v1")
+        self.assertEqual(self.tools.file_op("READ", path), "v1")
+        self.assertEqual(self.tools.cache.stats()["hits"], 1)
+
+        self.tools.file_op("WRITE", path, "v2")
+        self.assertEqual(self.tools.file_op("READ", path), "v2")
+
+        # Changed behind the ToolBox's back: caught by stat
+        with open(path, 'a') as f:
+            f.write(" and more")
+        self.assertEqual(self.tools.file_op("READ", path), "v2 and more")
+
+    def test_lru_bound(self):
+        cache = ToolCache(max_entries=2)
+        for i in range(3):
+            cache.put(("FILE", "/x", i), "t", str(i))
+        self.assertEqual(cache.get(("FILE", "/x", 0), "t"), (False, None))
+        self.assertEqual(cache.get(("FILE", "/x", 2), "t"), (True, "2"))
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_disabled(self):
+        tools = ToolBox(cache_size=0)
+        self.assertIsNone(tools.cache)
+        tools.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,234 @@
+import asyncio
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import unittest
+
+import numpy as np
+
+from gca_core.dbpool import SQLitePool, is_read_only
+from gca_core.tools import ToolBox
+
+class TestSQLitePool(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "demo.db")
+        self.tools = ToolBox()
+        self.tools.query_database("CREATE TABLE users (name TEXT, active BOOLEAN)", self.db)
+        self.tools.query_database("INSERT INTO users VALUES ('Alice', 1), ('Bob', 0)", self.db)
+
+    def tearDown(self):
+        self.tools.close()
+        self.tmp.cleanup()
+
+    def test_read_only_classification(self):
+        self.assertTrue(is_read_only("  -- comment\n select 1"))
+        self.assertTrue(is_read_only("/* x */ WITH t AS (SELECT 1) SELECT * FROM t"))
+        self.assertFalse(is_read_only("INSERT INTO users VALUES ('x', 1)"))
+
+    def test_writes_are_committed_and_visible_to_readers(self):
+        self.assertEqual(self.tools.query_database("SELECT name FROM users WHERE active = 1", self.db), "[('Alice',)]")
+        # Another process-level connection sees the committed rows
+        self.assertEqual(sqlite3.connect(self.db).execute("SELECT count(*) FROM users").fetchone(), (2,))
+        # WAL is opt-in: the file keeps its journal mode unless asked
+        self.assertEqual(sqlite3.connect(self.db).execute("PRAGMA journal_mode").fetchone(), ("delete",))
+        SQLitePool(self.db, wal=True).close()
+        self.assertEqual(sqlite3.connect(self.db).execute("PRAGMA journal_mode").fetchone(), ("wal",))
+
+    def test_errors_and_destructive_lock(self):
+        self.assertTrue(self.tools.query_database("SELECT * FROM missing", self.db).startswith("DB Error"))
+        self.assertTrue(self.tools.query_database("DROP TABLE users", self.db).startswith("DB_ERROR"))
+
+    def test_write_disguised_as_read_falls_back_to_writer(self):
+        pool = SQLitePool(self.db, readers=2)
+        pool.execute("CREATE TABLE t (x INTEGER)")
+        pool.execute("WITH v(x) AS (VALUES (7)) INSERT INTO t SELECT x FROM v")
+        self.assertEqual(pool.execute("SELECT x FROM t"), [(7,)])
+        pool.close()
+
+    def test_concurrent_readers(self):
+        errors = []
+
+        def worker():
+            for _ in range(50):
+                result = self.tools.query_database("SELECT count(*) FROM users", self.db)
+                if result != "[(2,)]":
+                    errors.append(result)
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertLessEqual(self.tools._db_pool(self.db)._reader_count, 4)
+
+    def test_close_reaches_checked_out_readers(self):
+        pool = SQLitePool(self.db, readers=2)
+        with pool.reader() as conn:
+            pool.close()
+            with self.assertRaises(sqlite3.ProgrammingError):
+                conn.execute("SELECT 1")
+
+    def test_memory_database_uses_writer(self):
+        pool = SQLitePool(":memory:")
+        pool.execute("CREATE TABLE t (x INTEGER)")
+        pool.execute("INSERT INTO t VALUES (1)")
+        self.assertEqual(pool.execute("SELECT x FROM t"), [(1,)])
+
+        # An open stream must not hold the writer lock (same thread would deadlock)
+        rows = pool.stream("SELECT x FROM t")
+        self.assertEqual(next(rows), ["x"])
+        pool.execute("INSERT INTO t VALUES (2)")
+        self.assertEqual(list(rows), [(1,)])
+        pool.close()
+
+class TestQueryStreaming(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "big.db")
+        self.tools = ToolBox()
+        conn = sqlite3.connect(self.db)
+        conn.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, name TEXT, price REAL)")
+        conn.executemany("INSERT INTO items VALUES (?, ?, ?)", [(i, f"item{i}", i * 0.5) for i in range(1, 1001)])
+        conn.commit()
+        conn.close()
+
+    def tearDown(self):
+        self.tools.close()
+        self.tmp.cleanup()
+
+    def test_stream_is_lazy_and_releases_reader(self):
+        pool = self.tools._db_pool(self.db)
+        rows = self.tools.stream_query("SELECT id FROM items ORDER BY id", self.db, batch_size=10)
+        self.assertEqual(next(rows), (1,))
+        self.assertEqual(pool._readers.qsize(), 0)  # Checked out while streaming
+        self.assertEqual(sum(1 for _ in rows), 999)
+        self.assertEqual(pool._readers.qsize(), 1)
+
+        limited = list(self.tools.stream_query("SELECT id FROM items", self.db, limit=5))
+        self.assertEqual(len(limited), 5)
+        self.assertEqual(pool._readers.qsize(), 1)
+
+    def test_stream_rejects_writes(self):
+        with self.assertRaises(PermissionError):
+            next(self.tools.stream_query("DELETE FROM items", self.db))
+        with self.assertRaises(ValueError):
+            next(self.tools.stream_query("INSERT INTO items VALUES (2000, 'x', 1.0)", self.db))
+
+    def test_offset_and_keyset_pages_agree(self):
+        query = "SELECT id, name FROM items WHERE price > 100"
+        offset_rows, offset = [], 0
+        while offset is not None:
+            page = self.tools.query_page(query, self.db, limit=64, offset=offset)
+            offset_rows += page["rows"]
+            offset = page["next"]
+
+        keyset_rows, after = [], None
+        while True:
+            page = self.tools.query_page(query + ";", self.db, limit=64, key="id", after=after)
+            keyset_rows += page["rows"]
+            if page["next"] is None:
+                break
+            after = page["next"]
+
+        self.assertEqual(page["columns"], ["id", "name"])
+        self.assertEqual(len(keyset_rows), 800)
+        self.assertEqual(sorted(offset_rows), keyset_rows)
+        with self.assertRaises(ValueError):
+            self.tools.query_page(query, self.db, key="id; DROP TABLE items")
+
+    def test_keyset_rejects_duplicate_keys(self):
+        conn = sqlite3.connect(self.db)
+        conn.execute("CREATE TABLE grouped (g INTEGER, v INTEGER)")
+        conn.executemany("INSERT INTO grouped VALUES (?, ?)", [(1, 1), (1, 2), (1, 3), (2, 4)])
+        conn.commit()
+        conn.close()
+        with self.assertRaises(ValueError):
+            self.tools.query_page("SELECT g, v FROM grouped", self.db, limit=2, key="g")
+        page = self.tools.query_page("SELECT g, v FROM grouped", self.db, limit=2, key="v")
+        self.assertEqual((page["rows"], page["next"]), ([(1, 1), (1, 2)], 2))
+
+    def test_preview_is_bounded(self):
+        preview = self.tools.query_database("SELECT * FROM items", self.db, max_rows=3)
+        self.assertTrue(preview.startswith("[(1, 'item1', 0.5), (2, 'item2', 1.0), (3, 'item3', 1.5)]"))
+        self.assertIn("more available", preview)
+        self.assertLessEqual(len(self.tools.query_preview("SELECT * FROM items", self.db, max_chars=100)), 150)
+        # Small results look exactly like the unbounded call
+        small = "SELECT name FROM items WHERE id = 1"
+        self.assertEqual(self.tools.query_database(small, self.db, max_rows=3), self.tools.query_database(small, self.db))
+
+    def test_columnar(self):
+        cols = self.tools.query_columnar("SELECT id, name, price FROM items ORDER BY id", self.db, batch_size=100)
+        self.assertEqual(cols["id"].dtype, np.int64)
+        self.assertEqual(cols["price"].dtype, np.float64)
+        self.assertEqual(cols["id"].sum(), 500500)
+        self.assertEqual(cols["name"][999], "item1000")
+
+        nulls = self.tools.query_columnar("SELECT NULL AS x UNION ALL SELECT 1", self.db)
+        self.assertEqual(nulls["x"].dtype, object)
+
+class TestAsyncToolBox(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db = os.path.join(self.tmp.name, "demo.db")
+        self.tools = ToolBox()
+        self.tools.query_database("CREATE TABLE users (name TEXT, active BOOLEAN)", self.db)
+        self.tools.query_database("INSERT INTO users VALUES ('Alice', 1), ('Bob', 0)", self.db)
+
+    def tearDown(self):
+        self.tools.close()
+        self.tmp.cleanup()
+
+    def test_async_methods_match_sync(self):
+        path = os.path.join(self.tmp.name, "note.txt")
+
+        async def run():
+            return (await self.tools.aexecute_python("print(6 * 7)"),
+                    await self.tools.aquery_database("SELECT name FROM users WHERE active = 1", self.db),
+                    await self.tools.afile_op("WRITE", path, "hello"),
+                    await self.tools.afile_op("READ", path))
+
+        self.assertEqual(asyncio.run(run()), ("42\n", "[('Alice',)]", "FILE_SUCCESS: Written.", "hello"))
+        self.assertEqual(asyncio.run(self.tools.aexecute_python("import sys; sys.exit('boom')")),
+                         self.tools.execute_python("import sys; sys.exit('boom')"))
+
+    def test_gather_runs_concurrently_in_order(self):
+        calls = [("PYTHON", "import time; time.sleep(0.5); print('a')"),
+                 ("PYTHON", "import time; time.sleep(0.5); print('b')"),
+                 ("SQL", "SELECT count(*) FROM users", self.db),
+                 ("SHELL", "ls")]
+        start = time.perf_counter()
+        results = asyncio.run(self.tools.agather(calls))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(results[:3], ["a\n", "b\n", "[(2,)]"])
+        self.assertTrue(results[3].startswith("TOOL_ERROR: Unknown tool"))
+        self.assertLess(elapsed, 1.5)  # Not 2 x (startup + 0.5s) back to back
+
+    def test_timeout_kills_only_the_slow_call(self):
+        async def run():
+            return await self.tools.agather([("PYTHON", "while True: pass"), ("PYTHON", "print('ok')")], timeout=1)
+
+        slow, fast = asyncio.run(run())
+        self.assertIn("timed out", slow)
+        self.assertEqual(fast, "ok\n")
+
+    def test_cancellation_kills_subprocess(self):
+        marker = os.path.join(self.tmp.name, "finished")
+        code = f"import time; time.sleep(1.5); open({marker!r}, 'w').close()"
+
+        async def run():
+            task = asyncio.ensure_future(self.tools.agather([("PYTHON", code)]))
+            await asyncio.sleep(0.3)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(run())
+        time.sleep(1.5)
+        self.assertFalse(os.path.exists(marker))
+
+if __name__ == '__main__':
+    unittest.main()